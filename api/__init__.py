@@ -1,3 +1,15 @@
-from .live import get_live_price
+from .live import (
+    get_live_price,
+    get_live_price_async,
+    get_live_prices,
+    get_live_prices_async,
+    is_stale,
+)
 
-__all__ = ["get_live_price"]
+__all__ = [
+    "get_live_price",
+    "get_live_price_async",
+    "get_live_prices",
+    "get_live_prices_async",
+    "is_stale",
+]
@@ -0,0 +1,148 @@
+"""Per-fetcher health tracking and circuit breaking."""
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from fetchers import PriceFetcher
+
+
+class FetcherHealth:
+    """Rolling latency/error statistics and breaker state of one fetcher."""
+
+    def __init__(self, window: int) -> None:
+        self.calls: Deque[Tuple[float, bool]] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Mean latency in seconds over the window, ``None`` if unknown."""
+        if not self.calls:
+            return None
+        return sum(latency for latency, _ in self.calls) / len(self.calls)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(1 for _, ok in self.calls if not ok) / len(self.calls)
+
+
+class HealthRegistry:
+    """Track fetcher health and skip sources that keep failing.
+
+    A call counts as an error when the fetcher raises or takes longer than
+    ``slow_call_seconds`` (a source that times out costs its whole timeout on
+    every request). The breaker of a fetcher opens after
+    ``failure_threshold`` consecutive errors, or when at least half of the
+    last ``window`` calls failed, and stays open for ``cooldown_seconds``.
+    After the cool-down a single trial call is let through: success closes
+    the breaker, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 60.0,
+        slow_call_seconds: float = 5.0,
+        window: int = 50,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._health: Dict[str, FetcherHealth] = {}
+        self.configure(failure_threshold, cooldown_seconds, slow_call_seconds, window)
+
+    def configure(
+        self,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 60.0,
+        slow_call_seconds: float = 5.0,
+        window: int = 50,
+    ) -> None:
+        """Change the breaker settings; collected statistics are reset."""
+        with self._lock:
+            self.failure_threshold = failure_threshold
+            self.cooldown_seconds = cooldown_seconds
+            self.slow_call_seconds = slow_call_seconds
+            self.window = window
+            self._health.clear()
+
+    @staticmethod
+    def _name(fetcher: PriceFetcher) -> str:
+        return fetcher.__class__.__name__
+
+    def _get(self, fetcher: PriceFetcher) -> FetcherHealth:
+        name = self._name(fetcher)
+        health = self._health.get(name)
+        if health is None:
+            health = FetcherHealth(self.window)
+            self._health[name] = health
+        return health
+
+    def acquire(self, fetcher: PriceFetcher) -> bool:
+        """Return whether ``fetcher`` may be called now.
+
+        A ``True`` answer for a fetcher whose cool-down just ended reserves
+        the single trial call, which must be followed by :meth:`record`.
+        """
+        with self._lock:
+            health = self._get(fetcher)
+            if health.open_until == 0.0:
+                return True
+            if time.monotonic() < health.open_until or health.trial_in_flight:
+                return False
+            health.trial_in_flight = True
+            return True
+
+    def record(self, fetcher: PriceFetcher, latency: float, failed: bool) -> None:
+        """Record the outcome of a call to ``fetcher``."""
+        failed = failed or latency > self.slow_call_seconds
+        with self._lock:
+            health = self._get(fetcher)
+            health.calls.append((latency, not failed))
+            health.trial_in_flight = False
+            if not failed:
+                health.consecutive_failures = 0
+                health.open_until = 0.0
+                return
+            health.consecutive_failures += 1
+            mostly_failing = (
+                len(health.calls) >= min(self.window, 10) and health.error_rate >= 0.5
+            )
+            if (
+                health.consecutive_failures >= self.failure_threshold
+                or mostly_failing
+                or health.open_until
+            ):
+                health.open_until = time.monotonic() + self.cooldown_seconds
+
+    def order(self, fetchers: Iterable[PriceFetcher]) -> List[PriceFetcher]:
+        """Return ``fetchers`` sorted from fastest to slowest.
+
+        Fetchers without statistics yet come first so they get measured.
+        """
+        fetchers = list(fetchers)
+        with self._lock:
+            latencies = {self._name(f): self._get(f).latency for f in fetchers}
+        return sorted(
+            fetchers,
+            key=lambda f: -1.0 if latencies[self._name(f)] is None else latencies[self._name(f)],
+        )
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        """Return latency, error rate and breaker state per fetcher."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "calls": len(health.calls),
+                    "latency_ms": None
+                    if health.latency is None
+                    else round(health.latency * 1000, 1),
+                    "error_rate": round(health.error_rate, 3),
+                    "open": health.open_until > now,
+                }
+                for name, health in self._health.items()
+            }
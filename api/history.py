@@ -1,15 +1,121 @@
-from datetime import date
-from typing import List, Dict
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Any, Iterable, Iterator, List, Dict, Optional, Union
 
+from fetchers import PriceFetcher
 from storage import historical as historical_db
+from storage import resample
 
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - optional dependency
+    np = None
 
-def get_historical_prices(ticker: str, start: date, end: date) -> List[Dict[str, object]]:
+# Imported by the first Arrow response, see arrow_available()
+pa: Any = None
+
+#: Media type of Arrow IPC stream responses
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+#: Days after which a range every fetcher answered empty is taken as final
+#: (a market holiday, or days before the listing) and not requested again;
+#: more recent empty answers may be upstream delays
+SETTLE_DAYS = 7
+
+# Gap fills of the same ticker run one at a time, so a request waiting for
+# another one only downloads what is still missing afterwards. Each entry is
+# [lock, number of fills using it] and is dropped when the last one ends
+_fill_locks: Dict[str, List[Any]] = {}
+_fill_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _fill_lock(ticker: str) -> Iterator[None]:
+    key = ticker.upper()
+    with _fill_locks_guard:
+        entry = _fill_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _fill_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _fill_locks[key]
+
+
+def _history_fetchers(
+    fetcher: Union[PriceFetcher, Iterable[PriceFetcher], None]
+) -> List[PriceFetcher]:
+    if fetcher is None:
+        return []
+    fetchers = [fetcher] if isinstance(fetcher, PriceFetcher) else list(fetcher)
+    return [f for f in fetchers if getattr(f, "supports_history", False)]
+
+
+def _weekend_only(start: date, end: date) -> bool:
+    """Whether ``[start, end]`` only holds a Saturday and/or a Sunday."""
+    return (end - start).days < 2 and start.weekday() >= 5 and end.weekday() >= 5
+
+
+def fill_history_gaps(
+    ticker: str,
+    start: date,
+    end: date,
+    fetcher: Union[PriceFetcher, Iterable[PriceFetcher]],
+) -> int:
+    """Download and store the parts of ``[start, end]`` not yet fetched.
+
+    Covered ranges are tracked in the historical store, so each day is
+    requested from upstream only once. Only closed days (up to yesterday)
+    are fetched, since today's bar may still change. Ranges with no bars are
+    covered too when they are a weekend or older than :data:`SETTLE_DAYS`,
+    so holidays and days before the listing are not requested again.
+    Returns the number of ranges that were fetched.
+    """
+    fetchers = _history_fetchers(fetcher)
+    today = datetime.utcnow().date()
+    end = min(end, today - timedelta(days=1))
+    settled = today - timedelta(days=SETTLE_DAYS)
+    if not fetchers or start > end:
+        return 0
+
+    filled = 0
+    with _fill_lock(ticker):
+        for gap_start, gap_end in historical_db.get_missing_ranges(ticker, start, end):
+            for f in fetchers:
+                # Fetchers store what they download in the historical DB
+                if f.get_history(ticker, gap_start, gap_end):
+                    filled += 1
+                    historical_db.add_coverage(ticker, gap_start, gap_end)
+                    break
+            else:
+                # No trading session, so an empty answer is expected
+                if _weekend_only(gap_start, gap_end):
+                    historical_db.add_coverage(ticker, gap_start, gap_end)
+                # A recent empty answer may be an upstream failure or delay
+                elif gap_start <= settled:
+                    historical_db.add_coverage(ticker, gap_start, min(gap_end, settled))
+    return filled
+
+
+def get_historical_prices(
+    ticker: str,
+    start: date,
+    end: date,
+    fetcher: Optional[Union[PriceFetcher, Iterable[PriceFetcher]]] = None,
+) -> List[Dict[str, object]]:
     """Return historical prices for ``ticker`` between ``start`` and ``end``.
 
     The data is fetched from the historical storage and serialised to JSON-
-    friendly dictionaries.
+    friendly dictionaries. When ``fetcher`` is given, date ranges that were
+    never downloaded are fetched and stored first (see
+    :func:`fill_history_gaps`).
     """
+    if fetcher is not None:
+        fill_history_gaps(ticker, start, end, fetcher)
     records = historical_db.get_history(ticker, start, end)
     return [
         {
@@ -20,3 +126,100 @@ def get_historical_prices(ticker: str, start: date, end: date) -> List[Dict[str,
         }
         for d, price, adj_price, volume in records
     ]
+
+
+def get_historical_columns(
+    ticker: str,
+    start: date,
+    end: date,
+    fetcher: Optional[Union[PriceFetcher, Iterable[PriceFetcher]]] = None,
+) -> Dict[str, "np.ndarray"]:
+    """Columnar variant of :func:`get_historical_prices`.
+
+    Returns NumPy arrays as produced by
+    :func:`storage.historical.get_history_columns`.
+    """
+    if fetcher is not None:
+        fill_history_gaps(ticker, start, end, fetcher)
+    return historical_db.get_history_columns(ticker, start, end)
+
+
+def get_historical_series(
+    ticker: str,
+    start: date,
+    end: date,
+    fetcher: Optional[Union[PriceFetcher, Iterable[PriceFetcher]]] = None,
+    period: Optional[str] = None,
+    returns: bool = False,
+    moving_average: Optional[int] = None,
+) -> Dict[str, "np.ndarray"]:
+    """Return the history of ``ticker`` aggregated server side.
+
+    ``period`` (``"weekly"`` or ``"monthly"``) turns the daily series into
+    OHLC candles (see :func:`storage.resample.resample_ohlc`). ``returns``
+    adds a ``return`` column computed on adjusted closes and
+    ``moving_average`` a ``moving_average`` column with the trailing mean of
+    that many closes.
+    """
+    columns = get_historical_columns(ticker, start, end, fetcher)
+    if period is not None:
+        columns = resample.resample_ohlc(columns, period)
+        close = columns["close"]
+        adj_close = columns["adj_close"]
+    else:
+        close = columns["price"]
+        adj_close = np.where(np.isnan(columns["adj_price"]), close, columns["adj_price"])
+    if returns:
+        columns["return"] = resample.returns(adj_close)
+    if moving_average is not None:
+        columns["moving_average"] = resample.moving_average(close, moving_average)
+    return columns
+
+
+def columns_to_json(columns: Dict[str, "np.ndarray"]) -> Dict[str, list]:
+    """Serialise history columns to column-oriented JSON-friendly lists."""
+    result = {}
+    for name, values in columns.items():
+        if np.issubdtype(values.dtype, np.datetime64):
+            result[name] = np.datetime_as_string(values, unit="D").tolist()
+        elif np.issubdtype(values.dtype, np.floating):
+            # NaN is not valid JSON
+            result[name] = np.where(np.isnan(values), None, values).tolist()
+        else:
+            result[name] = values.tolist()
+    return result
+
+
+def columns_to_rows(columns: Dict[str, "np.ndarray"]) -> List[Dict[str, object]]:
+    """Serialise history columns to one JSON-friendly dictionary per row."""
+    lists = columns_to_json(columns)
+    return [dict(zip(lists, values)) for values in zip(*lists.values())]
+
+
+def arrow_available() -> bool:
+    """Import pyarrow on first call; return whether it is installed."""
+    global pa
+    if pa is None:
+        try:
+            import pyarrow
+        except Exception:  # pragma: no cover - optional dependency
+            return False
+        pa = pyarrow
+    return True
+
+
+def columns_to_arrow(columns: Dict[str, "np.ndarray"]) -> bytes:
+    """Serialise history columns as an Arrow IPC stream."""
+    if not arrow_available():
+        raise RuntimeError("pyarrow is required for Arrow responses")
+    arrays = {}
+    for name, values in columns.items():
+        if np.issubdtype(values.dtype, np.floating):
+            arrays[name] = pa.array(values, mask=np.isnan(values))
+        else:
+            arrays[name] = pa.array(values)
+    table = pa.table(arrays)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
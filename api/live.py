@@ -1,12 +1,502 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from typing import Optional, Tuple, Iterable, Union, List
+from pathlib import Path
+from typing import Awaitable, Dict, Optional, Sequence, Set, Tuple, Iterable, Union, List
 from statistics import median
 
-from config import get_lock_minutes
+from config import get_fetch_settings, get_lock_minutes
 
-from fetchers import PriceFetcher
+from fetchers import PriceFetcher, TickerNotFound
 from storage import live as live_db
 
+from .health import HealthRegistry
+from .singleflight import AsyncSingleFlight, SingleFlight
+
+#: Maximum number of concurrent fetcher calls made by :func:`get_live_prices`
+DEFAULT_MAX_WORKERS = 8
+
+# In-flight refreshes keyed by (ticker_type, ticker)
+_refreshes = SingleFlight()
+_async_refreshes = AsyncSingleFlight()
+
+#: Latency/error tracking and circuit breakers of every fetcher
+health = HealthRegistry()
+
+# Thread pools shared by every call, keyed by (purpose, max_workers):
+# "fetch" runs fetcher calls, "refresh" the refreshes of get_live_prices and
+# "revalidate" the refreshes of prices served stale. Reusing their threads
+# also reuses the per-thread database connections.
+_pools: Dict[Tuple[str, int], ThreadPoolExecutor] = {}
+_pools_lock = threading.Lock()
+# Async fetcher calls left running after a deadline and background
+# refreshes of stale prices, kept referenced
+_background_calls: Set[asyncio.Future] = set()
+# (ticker_type, ticker) pairs served stale and being refreshed in the
+# background by get_live_prices(_async)
+_revalidating: Set[Tuple[Optional[str], str]] = set()
+_revalidating_lock = threading.Lock()
+
+
+def _get_pool(purpose: str, max_workers: int = DEFAULT_MAX_WORKERS) -> ThreadPoolExecutor:
+    """Return the shared pool of at most ``max_workers`` threads for ``purpose``."""
+    key = (purpose, max(1, max_workers))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ThreadPoolExecutor(
+                max_workers=key[1], thread_name_prefix=f"live-{purpose}"
+            )
+        return pool
+
+
+def _servable_stale(
+    record: Optional[Tuple[float, datetime]], now: datetime, max_stale_minutes: int
+) -> bool:
+    """Return whether an expired ``record`` may be served while it is refreshed."""
+    return (
+        record is not None
+        and max_stale_minutes > 0
+        and now - record[1] < timedelta(minutes=max_stale_minutes)
+    )
+
+
+def _keep_background_task(task: asyncio.Future) -> None:
+    """Keep ``task`` referenced until it is done, discarding its outcome."""
+    _background_calls.add(task)
+
+    def done(task: asyncio.Future) -> None:
+        _background_calls.discard(task)
+        if not task.cancelled():
+            # Failures were already recorded in ``health``
+            task.exception()
+
+    task.add_done_callback(done)
+
+
+def is_stale(
+    updated_at: datetime,
+    ticker: str,
+    ticker_type: Optional[str] = None,
+    lock_minutes: Optional[int] = None,
+) -> bool:
+    """Return whether a price stored at ``updated_at`` is past its lock window.
+
+    Such prices are returned when every fetcher failed, or on purpose in
+    stale-while-revalidate mode (see ``max_stale_minutes`` of
+    :func:`get_live_price`).
+    """
+    if lock_minutes is None:
+        lock_minutes = get_lock_minutes(ticker_type, ticker)
+    return datetime.utcnow() - updated_at >= timedelta(minutes=lock_minutes)
+
+
+def _select_fetchers(
+    fetcher: Union[PriceFetcher, Iterable[PriceFetcher]],
+    ticker_type: Optional[str],
+) -> List[PriceFetcher]:
+    """Return the fetchers in ``fetcher`` that support ``ticker_type``."""
+    if isinstance(fetcher, PriceFetcher):
+        fetchers: List[PriceFetcher] = [fetcher]
+    else:
+        fetchers = list(fetcher)
+
+    # Only use fetchers that support the requested ticker type
+    if ticker_type is None:
+        return [
+            f
+            for f in fetchers
+            if None in getattr(f, "supported_ticker_types", (None,))
+        ]
+    return [
+        f
+        for f in fetchers
+        if ticker_type in getattr(f, "supported_ticker_types", ())
+    ]
+
+
+def _not_found_ttl() -> timedelta:
+    return timedelta(minutes=get_fetch_settings()["not_found_ttl_minutes"])
+
+
+def _known_fetchers(
+    ticker: str, fetchers: List[PriceFetcher], ticker_type: Optional[str], now: datetime
+) -> List[PriceFetcher]:
+    """Drop the fetchers that reported ``ticker`` as unknown within the TTL."""
+    ttl = _not_found_ttl()
+    if not ttl or not fetchers:
+        return fetchers
+    marks = live_db.get_not_found(ticker, db_file=live_db.get_db_file(ticker_type))
+    if not marks:
+        return fetchers
+    return [
+        f
+        for f in fetchers
+        if now - marks.get(f.__class__.__name__, datetime.min) >= ttl
+    ]
+
+
+def _mark_not_found(f: PriceFetcher, ticker: str, ticker_type: Optional[str]) -> None:
+    ttl = _not_found_ttl()
+    if not ttl:
+        return
+    now = datetime.utcnow()
+    live_db.set_not_found(
+        ticker,
+        [f.__class__.__name__],
+        now,
+        db_file=live_db.get_db_file(ticker_type),
+        expire_before=now - ttl,
+    )
+
+
+def _call_fetcher(
+    f: PriceFetcher, ticker: str, ticker_type: Optional[str]
+) -> Optional[float]:
+    """Call ``f.get_price`` recording its latency and outcome in :data:`health`.
+
+    A :class:`TickerNotFound` answer counts as a successful call, is
+    remembered for the negative cache and yields ``None``.
+    """
+    start = time.monotonic()
+    try:
+        price = f.get_price(ticker, ticker_type)
+    except TickerNotFound:
+        health.record(f, time.monotonic() - start, failed=False)
+        _mark_not_found(f, ticker, ticker_type)
+        return None
+    except Exception:
+        health.record(f, time.monotonic() - start, failed=True)
+        raise
+    health.record(f, time.monotonic() - start, failed=False)
+    return price
+
+
+async def _call_fetcher_async(
+    f: PriceFetcher,
+    ticker: str,
+    ticker_type: Optional[str],
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> Optional[float]:
+    """Coroutine counterpart of :func:`_call_fetcher`."""
+    if semaphore is not None:
+        async with semaphore:
+            return await _call_fetcher_async(f, ticker, ticker_type)
+    start = time.monotonic()
+    try:
+        price = await f.get_price_async(ticker, ticker_type)
+    except TickerNotFound:
+        health.record(f, time.monotonic() - start, failed=False)
+        await asyncio.to_thread(_mark_not_found, f, ticker, ticker_type)
+        return None
+    except Exception:
+        health.record(f, time.monotonic() - start, failed=True)
+        raise
+    health.record(f, time.monotonic() - start, failed=False)
+    return price
+
+
+def _split_batch(fetchers: List[PriceFetcher]) -> Tuple[List[PriceFetcher], List[PriceFetcher]]:
+    """Split ``fetchers`` into those pricing many tickers per call and the rest."""
+    batch = [f for f in fetchers if getattr(f, "supports_batch", False)]
+    return batch, [f for f in fetchers if f not in batch]
+
+
+def _collect_batch(
+    f: PriceFetcher,
+    outcome: Union[Dict[str, float], BaseException],
+    known: Dict[str, List[float]],
+    debug: bool,
+) -> None:
+    """Add the prices of a :meth:`PriceFetcher.get_prices` ``outcome`` to ``known``."""
+    if isinstance(outcome, BaseException):
+        if debug:
+            print(f"[DEBUG] {f.__class__.__name__} batch failed: {outcome}")
+        return
+    for symbol, price in outcome.items():
+        if price is not None:
+            known.setdefault(symbol.upper(), []).append(price)
+    if debug:
+        print(f"[DEBUG] {len(outcome)} prices from {f.__class__.__name__} in one call")
+
+
+def _fetch_batches(
+    symbols: List[str],
+    fetchers: List[PriceFetcher],
+    ticker_type: Optional[str],
+    debug: bool = False,
+) -> Dict[str, List[float]]:
+    """Ask each batch-capable fetcher for every symbol in a single call.
+
+    Returns the prices obtained for each upper-cased symbol.
+    """
+    known: Dict[str, List[float]] = {}
+    for f in health.order(fetchers):
+        if not health.acquire(f):
+            continue
+        start = time.monotonic()
+        try:
+            outcome: Union[Dict[str, float], BaseException] = f.get_prices(symbols, ticker_type)
+        except Exception as exc:  # noqa: BLE001
+            outcome = exc
+        health.record(f, time.monotonic() - start, failed=isinstance(outcome, BaseException))
+        _collect_batch(f, outcome, known, debug)
+    return known
+
+
+async def _fetch_batches_async(
+    symbols: List[str],
+    fetchers: List[PriceFetcher],
+    ticker_type: Optional[str],
+    debug: bool = False,
+) -> Dict[str, List[float]]:
+    """Coroutine counterpart of :func:`_fetch_batches`; fetchers run concurrently."""
+
+    async def call(f: PriceFetcher) -> Union[Dict[str, float], BaseException]:
+        start = time.monotonic()
+        try:
+            outcome: Union[Dict[str, float], BaseException] = await f.get_prices_async(
+                symbols, ticker_type
+            )
+        except Exception as exc:  # noqa: BLE001
+            outcome = exc
+        health.record(f, time.monotonic() - start, failed=isinstance(outcome, BaseException))
+        return outcome
+
+    ready = [f for f in health.order(fetchers) if health.acquire(f)]
+    outcomes = await asyncio.gather(*(call(f) for f in ready))
+    known: Dict[str, List[float]] = {}
+    for f, outcome in zip(ready, outcomes):
+        _collect_batch(f, outcome, known, debug)
+    return known
+
+
+def _collect(
+    ticker: str,
+    f: PriceFetcher,
+    outcome: Union[Optional[float], BaseException],
+    prices: List[float],
+    debug: bool,
+) -> None:
+    """Append the price in ``outcome`` (a result or an exception) to ``prices``."""
+    if isinstance(outcome, BaseException):
+        if debug:
+            print(f"[DEBUG] {ticker}: {f.__class__.__name__} failed: {outcome}")
+        return
+    if outcome is not None:
+        prices.append(outcome)
+        if debug:
+            print(f"[DEBUG] {ticker}: fetched price from {f.__class__.__name__}")
+
+
+def _enough(prices: List[float], min_answers: Optional[int]) -> bool:
+    return min_answers is not None and len(prices) >= min_answers
+
+
+def _fetch_prices(
+    ticker: str,
+    fetchers: List[PriceFetcher],
+    ticker_type: Optional[str],
+    debug: bool = False,
+    executor: Optional[Executor] = None,
+    min_answers: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> List[float]:
+    """Query ``fetchers`` for ``ticker`` and return every price obtained.
+
+    Fetchers whose circuit breaker is open are skipped and the rest are
+    tried fastest first. They are called one after the other unless
+    ``executor`` is given, in which case all of them are queried
+    concurrently. Collection stops once ``min_answers`` prices arrived or
+    ``deadline`` seconds elapsed; calls still running are left to finish in
+    the background so their latency is recorded.
+    """
+    ordered = health.order(fetchers)
+    prices: List[float] = []
+    end = None if deadline is None else time.monotonic() + deadline
+
+    if executor is None:
+        for f in ordered:
+            if _enough(prices, min_answers) or (end is not None and time.monotonic() >= end):
+                break
+            if not health.acquire(f):
+                continue
+            try:
+                outcome = _call_fetcher(f, ticker, ticker_type)
+            except Exception as exc:  # noqa: BLE001
+                outcome = exc
+            _collect(ticker, f, outcome, prices, debug)
+        return prices
+
+    futures = {
+        executor.submit(_call_fetcher, f, ticker, ticker_type): f
+        for f in ordered
+        if health.acquire(f)
+    }
+    pending = set(futures)
+    while pending and not _enough(prices, min_answers):
+        timeout = None if end is None else end - time.monotonic()
+        if timeout is not None and timeout <= 0:
+            break
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            outcome = future.exception() or future.result()
+            _collect(ticker, futures[future], outcome, prices, debug)
+    if pending and debug:
+        names = ", ".join(futures[future].__class__.__name__ for future in pending)
+        print(f"[DEBUG] {ticker}: not waiting for {names}")
+    return prices
+
+
+def _refresh_price(
+    ticker: str,
+    fetchers: List[PriceFetcher],
+    ticker_type: Optional[str],
+    now: datetime,
+    debug: bool = False,
+    executor: Optional[Executor] = None,
+    min_answers: Optional[int] = None,
+    deadline: Optional[float] = None,
+    known: Sequence[float] = (),
+    store: bool = True,
+) -> Optional[Tuple[float, datetime]]:
+    """Fetch ``ticker`` from ``fetchers`` and store the median price.
+
+    ``known`` are prices already obtained (e.g. from a batch call) that
+    count towards ``min_answers`` and the median. Fetchers that recently
+    reported ``ticker`` as unknown are not asked. With ``store=False`` the
+    caller writes the result. Returns ``None`` when no price was obtained.
+    """
+    prices = list(known)
+    if not _enough(prices, min_answers):
+        fetchers = _known_fetchers(ticker, fetchers, ticker_type, now)
+        prices += _fetch_prices(
+            ticker,
+            fetchers,
+            ticker_type,
+            debug,
+            executor,
+            None if min_answers is None else min_answers - len(prices),
+            deadline,
+        )
+    if not prices:
+        return None
+    new_price = median(prices)
+    if store:
+        live_db.upsert_price(
+            ticker, new_price, now, db_file=live_db.get_db_file(ticker_type)
+        )
+    return new_price, now
+
+
+def _store_refreshed(
+    symbols: List[str],
+    results: Dict[str, Optional[Tuple[float, datetime]]],
+    db_file: Union[str, Path],
+) -> None:
+    """Write the prices refreshed for ``symbols`` in a single transaction."""
+    rows = [(symbol, *results[symbol]) for symbol in symbols if results.get(symbol)]
+    if rows:
+        live_db.upsert_prices(rows, db_file=db_file)
+
+
+def _refresh_many(
+    symbols: List[str],
+    fetchers: List[PriceFetcher],
+    ticker_type: Optional[str],
+    now: datetime,
+    debug: bool,
+    max_workers: int,
+    min_answers: Optional[int],
+    deadline: Optional[float],
+) -> Dict[str, Optional[Tuple[float, datetime]]]:
+    """Refresh ``symbols`` and store their prices in a single transaction.
+
+    Batch-capable fetchers are asked for every symbol in one call; the
+    others per symbol, through :data:`_refreshes`. Returns the refreshed
+    price of each symbol, ``None`` when none was obtained.
+    """
+    batch, per_ticker = _split_batch(fetchers)
+    known = _fetch_batches(symbols, batch, ticker_type, debug)
+    fetch_pool = _get_pool("fetch", max_workers)
+    refresh_pool = _get_pool("refresh", max_workers)
+    futures = {
+        symbol: _refreshes.submit(
+            (ticker_type, symbol),
+            lambda symbol=symbol: _refresh_price(
+                symbol,
+                per_ticker,
+                ticker_type,
+                now,
+                debug,
+                fetch_pool,
+                min_answers,
+                deadline,
+                known.get(symbol, ()),
+                store=False,
+            ),
+            refresh_pool,
+        )
+        for symbol in symbols
+    }
+    results: Dict[str, Optional[Tuple[float, datetime]]] = {}
+    for symbol, future in futures.items():
+        try:
+            results[symbol] = future.result()
+        except Exception as exc:  # noqa: BLE001
+            if debug:
+                print(f"[DEBUG] {symbol}: refresh failed: {exc}")
+            results[symbol] = None
+    _store_refreshed(symbols, results, live_db.get_db_file(ticker_type))
+    return results
+
+
+def _claim_revalidation(symbols: List[str], ticker_type: Optional[str]) -> List[str]:
+    """Return the ``symbols`` not being revalidated already, marking them so."""
+    with _revalidating_lock:
+        claimed = [s for s in symbols if (ticker_type, s) not in _revalidating]
+        _revalidating.update((ticker_type, s) for s in claimed)
+    return claimed
+
+
+def _release_revalidation(symbols: List[str], ticker_type: Optional[str]) -> None:
+    with _revalidating_lock:
+        _revalidating.difference_update((ticker_type, s) for s in symbols)
+
+
+def _revalidate(
+    symbols: List[str],
+    fetchers: List[PriceFetcher],
+    ticker_type: Optional[str],
+    now: datetime,
+    debug: bool,
+    max_workers: int,
+    min_answers: Optional[int],
+    deadline: Optional[float],
+) -> None:
+    """Run :func:`_refresh_many` for prices served stale, then release them."""
+    try:
+        _refresh_many(
+            symbols, fetchers, ticker_type, now, debug, max_workers, min_answers, deadline
+        )
+    finally:
+        _release_revalidation(symbols, ticker_type)
+
+
+def get_refresh_stats() -> Dict[str, int]:
+    """Return counters about price refreshes.
+
+    ``calls`` is the number of refreshes that queried the fetchers and
+    ``coalesced`` the number of callers that waited on an in-flight refresh
+    of the same ticker instead of starting their own. Both the threaded and
+    the async code paths are counted.
+    """
+    sync_stats = _refreshes.stats()
+    async_stats = _async_refreshes.stats()
+    return {key: sync_stats[key] + async_stats[key] for key in sync_stats}
+
 
 def get_live_price(
     ticker: str,
@@ -14,14 +504,28 @@ def get_live_price(
     lock_minutes: Optional[int] = None,
     debug: bool = False,
     ticker_type: Optional[str] = None,
+    min_answers: Optional[int] = None,
+    deadline: Optional[float] = None,
+    max_stale_minutes: int = 0,
 ) -> Optional[Tuple[float, datetime]]:
     """Return up-to-date price and timestamp for ``ticker``.
 
     ``ticker_type`` selects the database to use and may influence the
-    fetcher behaviour.
+    fetcher behaviour. Concurrent calls for the same stale ticker share a
+    single refresh. Fetchers that raised :class:`TickerNotFound` for the
+    ticker are skipped for ``fetch.not_found_ttl_minutes``.
+
+    By default every healthy fetcher is asked and the median of their
+    answers is stored. With ``min_answers`` and/or ``deadline`` (seconds)
+    the fetchers are queried concurrently and the median is taken over the
+    first ``min_answers`` prices or whatever arrived before the deadline.
+
+    With ``max_stale_minutes`` (stale-while-revalidate), an expired price
+    younger than that many minutes is returned at once and refreshed in the
+    background; use :func:`is_stale` to tell such prices apart.
     """
     if lock_minutes is None:
-        lock_minutes = get_lock_minutes()
+        lock_minutes = get_lock_minutes(ticker_type, ticker)
     db_file = live_db.get_db_file(ticker_type)
     record = live_db.get_price(ticker, db_file=db_file)
     now = datetime.utcnow()
@@ -36,37 +540,25 @@ def get_live_price(
         price = None
         updated_at = None
 
-    if isinstance(fetcher, PriceFetcher):
-        fetchers: List[PriceFetcher] = [fetcher]
-    else:
-        fetchers = list(fetcher)
+    fetchers = _select_fetchers(fetcher, ticker_type)
+    executor = None
+    if min_answers is not None or deadline is not None:
+        executor = _get_pool("fetch")
 
-    # Only use fetchers that support the requested ticker type
-    if ticker_type is None:
-        fetchers = [
-            f
-            for f in fetchers
-            if None in getattr(f, "supported_ticker_types", (None,))
-        ]
-    else:
-        fetchers = [
-            f
-            for f in fetchers
-            if ticker_type in getattr(f, "supported_ticker_types", ())
-        ]
+    def refresh() -> Optional[Tuple[float, datetime]]:
+        return _refresh_price(
+            ticker, fetchers, ticker_type, now, debug, executor, min_answers, deadline
+        )
 
-    prices = []
-    for f in fetchers:
-        p = f.get_price(ticker, ticker_type)
-        if p is not None:
-            prices.append(p)
-            if debug:
-                print(f"[DEBUG] {ticker}: fetched price from {f.__class__.__name__}")
+    if _servable_stale(record, now, max_stale_minutes):
+        if debug:
+            print(f"[DEBUG] {ticker}: returning stale price, refreshing in background")
+        _refreshes.submit((ticker_type, ticker.upper()), refresh, _get_pool("revalidate"))
+        return record
 
-    if prices:
-        new_price = median(prices)
-        live_db.upsert_price(ticker, new_price, now, db_file=db_file)
-        return new_price, now
+    result = _refreshes.do((ticker_type, ticker.upper()), refresh)
+    if result is not None:
+        return result
 
     # If fetching failed and we had an old price, return it
     if debug and price is not None:
@@ -74,3 +566,355 @@ def get_live_price(
     if price is not None:
         return price, updated_at
     return None
+
+
+def get_live_prices(
+    tickers: Iterable[str],
+    fetcher: Union[PriceFetcher, Iterable[PriceFetcher]],
+    lock_minutes: Optional[int] = None,
+    debug: bool = False,
+    ticker_type: Optional[str] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    min_answers: Optional[int] = None,
+    deadline: Optional[float] = None,
+    max_stale_minutes: int = 0,
+) -> Dict[str, Optional[Tuple[float, datetime]]]:
+    """Return up-to-date prices for several ``tickers`` at once.
+
+    Stored rows are read in a single query and only tickers whose price is
+    older than ``lock_minutes`` (by default the window configured for each
+    ticker, see :func:`config.get_lock_minutes`) are fetched. Stale tickers are refreshed
+    concurrently, each querying its fetchers concurrently, on thread pools
+    of at most ``max_workers`` threads shared with the other calls.
+    Refreshes already in flight for a ticker are joined rather than
+    repeated. Fetchers with
+    :pyattr:`~fetchers.PriceFetcher.supports_batch` are first asked for every
+    stale ticker in one call, which ``deadline`` does not interrupt, and the
+    refreshed prices are written in a single transaction. ``min_answers``,
+    ``deadline`` and ``max_stale_minutes`` apply to each ticker as in
+    :func:`get_live_price`, but the prices served stale are refreshed
+    together in the background, with the same batch calls. The result is
+    keyed by the upper-cased ticker and maps to ``None`` when no price is
+    available.
+    """
+    symbols = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+    db_file = live_db.get_db_file(ticker_type)
+    records = live_db.get_prices(symbols, db_file=db_file)
+    now = datetime.utcnow()
+
+    results: Dict[str, Optional[Tuple[float, datetime]]] = {}
+    stale: List[str] = []
+    revalidate: List[str] = []
+    for symbol in symbols:
+        record = records.get(symbol)
+        lock = lock_minutes
+        if lock is None:
+            lock = get_lock_minutes(ticker_type, symbol)
+        if record and now - record[1] < timedelta(minutes=lock):
+            if debug:
+                print(f"[DEBUG] {symbol}: using cached price from DB")
+            results[symbol] = record
+        elif _servable_stale(record, now, max_stale_minutes):
+            if debug:
+                print(f"[DEBUG] {symbol}: returning stale price, refreshing in background")
+            results[symbol] = record
+            revalidate.append(symbol)
+        else:
+            stale.append(symbol)
+
+    fetchers = _select_fetchers(fetcher, ticker_type)
+    claimed = _claim_revalidation(revalidate, ticker_type) if fetchers else []
+    if claimed:
+        # A single batch refresh for every price served stale
+        _get_pool("revalidate").submit(
+            _revalidate,
+            claimed,
+            fetchers,
+            ticker_type,
+            now,
+            debug,
+            max_workers,
+            min_answers,
+            deadline,
+        )
+    if stale and fetchers:
+        results.update(
+            _refresh_many(
+                stale, fetchers, ticker_type, now, debug, max_workers, min_answers, deadline
+            )
+        )
+
+    for symbol in stale:
+        if results.get(symbol) is None:
+            # If fetching failed, fall back to the stored price (if any)
+            if debug and symbol in records:
+                print(f"[DEBUG] {symbol}: fetch failed, returning cached price")
+            results[symbol] = records.get(symbol)
+
+    return {symbol: results[symbol] for symbol in symbols}
+
+
+async def _fetch_prices_async(
+    ticker: str,
+    fetchers: List[PriceFetcher],
+    ticker_type: Optional[str],
+    debug: bool = False,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    min_answers: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> List[float]:
+    """Query ``fetchers`` concurrently and return every price obtained.
+
+    ``semaphore`` bounds the number of fetcher calls running at once.
+    ``min_answers`` and ``deadline`` behave as in :func:`_fetch_prices`.
+    """
+    tasks = {
+        asyncio.ensure_future(_call_fetcher_async(f, ticker, ticker_type, semaphore)): f
+        for f in health.order(fetchers)
+        if health.acquire(f)
+    }
+    prices: List[float] = []
+    end = None if deadline is None else time.monotonic() + deadline
+    pending = set(tasks)
+    while pending and not _enough(prices, min_answers):
+        timeout = None if end is None else end - time.monotonic()
+        if timeout is not None and timeout <= 0:
+            break
+        done, pending = await asyncio.wait(
+            pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in done:
+            outcome = task.exception() or task.result()
+            _collect(ticker, tasks[task], outcome, prices, debug)
+    for task in pending:
+        # Keep abandoned calls alive so their latency is still recorded
+        _background_calls.add(task)
+        task.add_done_callback(_background_calls.discard)
+    return prices
+
+
+async def _refresh_price_async(
+    ticker: str,
+    fetchers: List[PriceFetcher],
+    ticker_type: Optional[str],
+    now: datetime,
+    debug: bool = False,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    min_answers: Optional[int] = None,
+    deadline: Optional[float] = None,
+    known: Sequence[float] = (),
+    store: bool = True,
+) -> Optional[Tuple[float, datetime]]:
+    """Coroutine counterpart of :func:`_refresh_price`."""
+    prices = list(known)
+    if not _enough(prices, min_answers):
+        fetchers = await asyncio.to_thread(_known_fetchers, ticker, fetchers, ticker_type, now)
+        prices += await _fetch_prices_async(
+            ticker,
+            fetchers,
+            ticker_type,
+            debug,
+            semaphore,
+            None if min_answers is None else min_answers - len(prices),
+            deadline,
+        )
+    if not prices:
+        return None
+    new_price = median(prices)
+    if store:
+        await asyncio.to_thread(
+            live_db.upsert_price,
+            ticker,
+            new_price,
+            now,
+            db_file=live_db.get_db_file(ticker_type),
+        )
+    return new_price, now
+
+
+async def _refresh_many_async(
+    symbols: List[str],
+    fetchers: List[PriceFetcher],
+    ticker_type: Optional[str],
+    now: datetime,
+    debug: bool,
+    semaphore: asyncio.Semaphore,
+    min_answers: Optional[int],
+    deadline: Optional[float],
+) -> Dict[str, Optional[Tuple[float, datetime]]]:
+    """Coroutine counterpart of :func:`_refresh_many`."""
+    batch, per_ticker = _split_batch(fetchers)
+    known = await _fetch_batches_async(symbols, batch, ticker_type, debug)
+    refreshed = await asyncio.gather(
+        *(
+            _async_refreshes.do(
+                (ticker_type, symbol),
+                lambda symbol=symbol: _refresh_price_async(
+                    symbol,
+                    per_ticker,
+                    ticker_type,
+                    now,
+                    debug,
+                    semaphore,
+                    min_answers,
+                    deadline,
+                    known.get(symbol, ()),
+                    store=False,
+                ),
+            )
+            for symbol in symbols
+        ),
+        return_exceptions=True,
+    )
+    results: Dict[str, Optional[Tuple[float, datetime]]] = {}
+    for symbol, result in zip(symbols, refreshed):
+        if isinstance(result, Exception):
+            if debug:
+                print(f"[DEBUG] {symbol}: refresh failed: {result}")
+            result = None
+        results[symbol] = result
+    await asyncio.to_thread(
+        _store_refreshed, symbols, results, live_db.get_db_file(ticker_type)
+    )
+    return results
+
+
+async def _revalidate_async(
+    symbols: List[str],
+    fetchers: List[PriceFetcher],
+    ticker_type: Optional[str],
+    now: datetime,
+    debug: bool,
+    semaphore: asyncio.Semaphore,
+    min_answers: Optional[int],
+    deadline: Optional[float],
+) -> None:
+    """Coroutine counterpart of :func:`_revalidate`."""
+    try:
+        await _refresh_many_async(
+            symbols, fetchers, ticker_type, now, debug, semaphore, min_answers, deadline
+        )
+    finally:
+        _release_revalidation(symbols, ticker_type)
+
+
+async def get_live_price_async(
+    ticker: str,
+    fetcher: Union[PriceFetcher, Iterable[PriceFetcher]],
+    lock_minutes: Optional[int] = None,
+    debug: bool = False,
+    ticker_type: Optional[str] = None,
+    min_answers: Optional[int] = None,
+    deadline: Optional[float] = None,
+    max_stale_minutes: int = 0,
+) -> Optional[Tuple[float, datetime]]:
+    """Asynchronous variant of :func:`get_live_price`.
+
+    Fetchers are awaited concurrently through
+    :meth:`PriceFetcher.get_price_async`, so no thread is held while waiting
+    for upstream sources.
+    """
+    if lock_minutes is None:
+        lock_minutes = get_lock_minutes(ticker_type, ticker)
+    db_file = live_db.get_db_file(ticker_type)
+    # Reads may be network round trips (PostgreSQL): keep them off the loop
+    record = await asyncio.to_thread(live_db.get_price, ticker, db_file=db_file)
+    now = datetime.utcnow()
+
+    if record and now - record[1] < timedelta(minutes=lock_minutes):
+        if debug:
+            print(f"[DEBUG] {ticker}: using cached price from DB")
+        return record
+
+    fetchers = _select_fetchers(fetcher, ticker_type)
+
+    def refresh() -> Awaitable[Optional[Tuple[float, datetime]]]:
+        return _refresh_price_async(
+            ticker, fetchers, ticker_type, now, debug, None, min_answers, deadline
+        )
+
+    if _servable_stale(record, now, max_stale_minutes):
+        if debug:
+            print(f"[DEBUG] {ticker}: returning stale price, refreshing in background")
+        _keep_background_task(
+            asyncio.ensure_future(_async_refreshes.do((ticker_type, ticker.upper()), refresh))
+        )
+        return record
+
+    result = await _async_refreshes.do((ticker_type, ticker.upper()), refresh)
+    if result is not None:
+        return result
+
+    # If fetching failed and we had an old price, return it
+    if debug and record is not None:
+        print(f"[DEBUG] {ticker}: fetch failed, returning cached price")
+    return record
+
+
+async def get_live_prices_async(
+    tickers: Iterable[str],
+    fetcher: Union[PriceFetcher, Iterable[PriceFetcher]],
+    lock_minutes: Optional[int] = None,
+    debug: bool = False,
+    ticker_type: Optional[str] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    min_answers: Optional[int] = None,
+    deadline: Optional[float] = None,
+    max_stale_minutes: int = 0,
+) -> Dict[str, Optional[Tuple[float, datetime]]]:
+    """Asynchronous variant of :func:`get_live_prices`.
+
+    At most ``max_workers`` fetcher calls of this batch run at once.
+    """
+    symbols = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+    db_file = live_db.get_db_file(ticker_type)
+    records = await asyncio.to_thread(live_db.get_prices, symbols, db_file=db_file)
+    now = datetime.utcnow()
+
+    results: Dict[str, Optional[Tuple[float, datetime]]] = {}
+    stale: List[str] = []
+    revalidate: List[str] = []
+    for symbol in symbols:
+        record = records.get(symbol)
+        lock = lock_minutes
+        if lock is None:
+            lock = get_lock_minutes(ticker_type, symbol)
+        if record and now - record[1] < timedelta(minutes=lock):
+            if debug:
+                print(f"[DEBUG] {symbol}: using cached price from DB")
+            results[symbol] = record
+        elif _servable_stale(record, now, max_stale_minutes):
+            if debug:
+                print(f"[DEBUG] {symbol}: returning stale price, refreshing in background")
+            results[symbol] = record
+            revalidate.append(symbol)
+        else:
+            stale.append(symbol)
+
+    fetchers = _select_fetchers(fetcher, ticker_type)
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+    claimed = _claim_revalidation(revalidate, ticker_type) if fetchers else []
+    if claimed:
+        # A single batch refresh for every price served stale
+        _keep_background_task(
+            asyncio.ensure_future(
+                _revalidate_async(
+                    claimed, fetchers, ticker_type, now, debug, semaphore, min_answers, deadline
+                )
+            )
+        )
+    if stale and fetchers:
+        results.update(
+            await _refresh_many_async(
+                stale, fetchers, ticker_type, now, debug, semaphore, min_answers, deadline
+            )
+        )
+
+    for symbol in stale:
+        if results.get(symbol) is None:
+            # If fetching failed, fall back to the stored price (if any)
+            if debug and symbol in records:
+                print(f"[DEBUG] {symbol}: fetch failed, returning cached price")
+            results[symbol] = records.get(symbol)
+
+    return {symbol: results[symbol] for symbol in symbols}
@@ -1,60 +1,113 @@
-from datetime import date
+import asyncio
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 
-from config import get_lock_minutes, get_server_host, get_server_port
-from fetchers import (
-    BancoPianoFetcher,
-    Data912Fetcher,
-    DolarApiFetcher,
-    DummyFetcher,
-    YFinanceFetcher,
+from config import (
+    get_fetch_settings,
+    get_scheduler_settings,
+    get_server_host,
+    get_server_port,
+    get_stale_minutes,
+    get_storage_settings,
+    get_tick_settings,
+    on_reload,
+    start_watching,
+    stop_watching,
 )
+from fetchers import registry
+from fetchers.http import close_async_client
 
+from scheduler import create_scheduler
+from storage import connection, historical
 from storage import live as live_db
-from storage import historical as historical_db
+from storage import ticks as ticks_db
 
-from .live import get_live_price
-from .history import get_historical_prices
+from .live import (
+    get_live_price_async,
+    get_live_prices_async,
+    get_refresh_stats,
+    health,
+    is_stale,
+)
+from .history import (
+    ARROW_MEDIA_TYPE,
+    arrow_available,
+    columns_to_arrow,
+    columns_to_json,
+    columns_to_rows,
+    get_historical_prices,
+    get_historical_series,
+)
 
-live_db.init_db()
-historical_db.init_db()
+storage_settings = get_storage_settings()
+connection.configure(
+    storage_settings["backend"],
+    dsn=storage_settings["postgres_dsn"],
+    pool_size=storage_settings["pool_size"],
+)
+live_db.SINGLE_DB = storage_settings["single_db"]
+live_db.COMPACT_TIMESTAMPS = historical.COMPACT_DATES = storage_settings["compact_dates"]
+# Tables are created on first use of each database (see storage.live.init_db)
 
 app = FastAPI()
 
-fetchers = []
-try:
-    if YFinanceFetcher is not None:
-        fetchers.append(YFinanceFetcher())
-except Exception:
-    pass
+fetch_settings: Dict[str, Any] = {}
+
+
+def apply_settings() -> None:
+    """Apply the settings that can change while the server runs.
+
+    Called at start-up and after every reload of ``config.yaml``; storage,
+    server and scheduler settings need a restart.
+    """
+    global fetch_settings
+    tick_settings = get_tick_settings()
+    ticks_db.ENABLED = tick_settings["enabled"]
+    ticks_db.RETENTION_DAYS = tick_settings["retention_days"]
+    previous, fetch_settings = fetch_settings, get_fetch_settings()
+    breaker = ("failure_threshold", "cooldown_seconds", "slow_call_seconds")
+    # Reconfiguring resets the collected statistics: only do it on changes
+    if any(previous.get(key) != fetch_settings[key] for key in breaker):
+        health.configure(**{key: fetch_settings[key] for key in breaker})
+
 
-try:
-    if Data912Fetcher is not None:
-        fetchers.append(Data912Fetcher())
-except Exception:
-    pass
+apply_settings()
+on_reload(apply_settings)
 
-try:
-    if DolarApiFetcher is not None:
-        fetchers.append(DolarApiFetcher())
-except Exception:
-    pass
+refresh_scheduler = None
 
-try:
-    if BancoPianoFetcher is not None:
-        fetchers.append(BancoPianoFetcher())
-except Exception:
-    pass
 
-if not fetchers:
-    fetchers.append(DummyFetcher())
+@app.on_event("startup")
+def start_scheduler() -> None:
+    global refresh_scheduler
+    start_watching()
+    if not get_scheduler_settings()["enabled"]:
+        return
+    refresh_scheduler = create_scheduler()
+    refresh_scheduler.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks() -> None:
+    if refresh_scheduler is not None:
+        refresh_scheduler.shutdown(wait=False)
+    stop_watching()
+    ticks_db.flush()
+    connection.close_connections()
+    await close_async_client()
 
 
 @app.get("/price/{ticker_type}/{ticker}")
-def price_with_type_endpoint(ticker_type: str, ticker: str):
-    result = get_live_price(
-        ticker, fetchers, lock_minutes=get_lock_minutes(), ticker_type=ticker_type
+async def price_with_type_endpoint(ticker_type: str, ticker: str):
+    result = await get_live_price_async(
+        ticker,
+        registry.fetchers_for(ticker_type),
+        ticker_type=ticker_type,
+        min_answers=fetch_settings["min_answers"],
+        deadline=fetch_settings["deadline_seconds"],
+        max_stale_minutes=get_stale_minutes(ticker_type),
     )
     if result is None:
         raise HTTPException(status_code=404, detail="Price not available")
@@ -63,17 +116,24 @@ def price_with_type_endpoint(ticker_type: str, ticker: str):
         "ticker": ticker.upper(),
         "price": price,
         "updated_at": updated_at.isoformat() + "Z",
+        "stale": is_stale(updated_at, ticker, ticker_type),
     }
 
 
 @app.get("/bonos/{ticker}")
-def bonos_endpoint(ticker: str):
-    return price_with_type_endpoint("bonos", ticker)
+async def bonos_endpoint(ticker: str):
+    return await price_with_type_endpoint("bonos", ticker)
 
 
 @app.get("/price/{ticker}")
-def price_endpoint(ticker: str):
-    result = get_live_price(ticker, fetchers, lock_minutes=get_lock_minutes())
+async def price_endpoint(ticker: str):
+    result = await get_live_price_async(
+        ticker,
+        registry.fetchers_for(),
+        min_answers=fetch_settings["min_answers"],
+        deadline=fetch_settings["deadline_seconds"],
+        max_stale_minutes=get_stale_minutes(),
+    )
     if result is None:
         raise HTTPException(status_code=404, detail="Price not available")
     price, updated_at = result
@@ -81,15 +141,146 @@ def price_endpoint(ticker: str):
         "ticker": ticker.upper(),
         "price": price,
         "updated_at": updated_at.isoformat() + "Z",
+        "stale": is_stale(updated_at, ticker),
     }
 
 
+@app.get("/batch")
+async def batch_endpoint(ticker: str, ticker_type: Optional[str] = None):
+    # Cada ticker puede indicar su propio tipo como ``tipo:TICKER``
+    by_type: Dict[Optional[str], List[str]] = {}
+    for item in ticker.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        item_type, _, symbol = item.rpartition(":")
+        by_type.setdefault(item_type or ticker_type, []).append(symbol)
+    if not by_type:
+        raise HTTPException(status_code=400, detail="No tickers requested")
+    # Read every stored price in one go; the calls below hit the cache
+    await asyncio.to_thread(
+        live_db.get_prices_by_type,
+        [(item_type, symbol) for item_type, symbols in by_type.items() for symbol in symbols],
+    )
+    batches = await asyncio.gather(
+        *(
+            get_live_prices_async(
+                symbols,
+                registry.fetchers_for(item_type),
+                ticker_type=item_type,
+                min_answers=fetch_settings["min_answers"],
+                deadline=fetch_settings["deadline_seconds"],
+                max_stale_minutes=get_stale_minutes(item_type),
+            )
+            for item_type, symbols in by_type.items()
+        )
+    )
+    prices = []
+    missing = []
+    for item_type, results in zip(by_type, batches):
+        for symbol, result in results.items():
+            if result is None:
+                missing.append(symbol)
+                continue
+            price, updated_at = result
+            prices.append(
+                {
+                    "ticker": symbol,
+                    "ticker_type": item_type,
+                    "price": price,
+                    "updated_at": updated_at.isoformat() + "Z",
+                    "stale": is_stale(updated_at, symbol, item_type),
+                }
+            )
+    return {"prices": prices, "missing": missing}
+
+
+# Valores aceptados por el parámetro ``periodo`` de /historial
+HISTORY_PERIODS = {"diario": None, "semanal": "weekly", "mensual": "monthly"}
+
+
 @app.get("/historial/{ticker}")
-def history_endpoint(ticker: str, desde: date, hasta: date):
-    history = get_historical_prices(ticker, desde, hasta)
-    if not history:
+def history_endpoint(
+    ticker: str,
+    desde: date,
+    hasta: date,
+    formato: str = "filas",
+    periodo: str = "diario",
+    retornos: bool = False,
+    media_movil: Optional[int] = None,
+):
+    if formato not in {"filas", "columnas", "arrow"}:
+        raise HTTPException(status_code=400, detail="Unknown format")
+    if formato == "arrow" and not arrow_available():
+        raise HTTPException(status_code=501, detail="Arrow format requires pyarrow")
+    if periodo not in HISTORY_PERIODS:
+        raise HTTPException(status_code=400, detail="Unknown period")
+    if media_movil is not None and media_movil < 1:
+        raise HTTPException(status_code=400, detail="media_movil must be positive")
+    plain = periodo == "diario" and not retornos and media_movil is None
+    if formato == "filas" and plain:
+        history = get_historical_prices(ticker, desde, hasta, registry.get_fetchers())
+        if not history:
+            raise HTTPException(status_code=404, detail="History not available")
+        return {"ticker": ticker.upper(), "history": history}
+    columns = get_historical_series(
+        ticker,
+        desde,
+        hasta,
+        registry.get_fetchers(),
+        period=HISTORY_PERIODS[periodo],
+        returns=retornos,
+        moving_average=media_movil,
+    )
+    if not len(columns["date"]):
         raise HTTPException(status_code=404, detail="History not available")
-    return {"ticker": ticker.upper(), "history": history}
+    if formato == "arrow":
+        return Response(content=columns_to_arrow(columns), media_type=ARROW_MEDIA_TYPE)
+    if formato == "filas":
+        return {"ticker": ticker.upper(), "history": columns_to_rows(columns)}
+    return {"ticker": ticker.upper(), "history": columns_to_json(columns)}
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+@app.get("/intradiario/{ticker}")
+def intraday_endpoint(
+    ticker: str,
+    ticker_type: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+):
+    # Por defecto, los ticks del día (UTC) hasta ahora
+    hasta = datetime.utcnow() if hasta is None else _naive_utc(hasta)
+    if desde is None:
+        desde = datetime.combine(hasta.date(), datetime.min.time())
+    ticks = ticks_db.get_ticks(ticker, _naive_utc(desde), hasta, ticker_type)
+    if not ticks:
+        raise HTTPException(status_code=404, detail="Ticks not available")
+    return {
+        "ticker": ticker.upper(),
+        "ticks": [
+            {"time": ts.isoformat() + "Z", "price": price} for ts, price in ticks
+        ],
+    }
+
+
+@app.get("/status")
+def status_endpoint():
+    return {
+        # Fetchers are imported on first use: only those loaded so far
+        "fetchers": [
+            registry.get_fetcher(name).__class__.__name__ for name in registry.loaded()
+        ],
+        "enabled_fetchers": registry.enabled_names(),
+        "refreshes": get_refresh_stats(),
+        "sources": health.stats(),
+        "live_cache": live_db.get_cache_stats(),
+    }
 
 
 if __name__ == "__main__":
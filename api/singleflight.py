@@ -0,0 +1,108 @@
+"""Coalescing of concurrent calls that compute the same result."""
+
+import asyncio
+import threading
+from concurrent.futures import Executor, Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Run at most one call per key at a time.
+
+    Callers asking for a key that is already being computed wait for the
+    in-flight call and share its result (or exception) instead of starting
+    a new one. Counters of executed and coalesced calls are kept for
+    monitoring.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def _claim(self, key: Hashable) -> Tuple[Future, bool]:
+        """Return the future for ``key`` and whether the caller must run it."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            self.calls += 1
+            return future, True
+
+    def _run(self, key: Hashable, future: Future, fn: Callable[[], Any]) -> None:
+        try:
+            result = fn()
+        except BaseException as exc:  # noqa: BLE001
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(exc)
+        else:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_result(result)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` for ``key`` in the calling thread unless already in flight."""
+        future, leader = self._claim(key)
+        if leader:
+            self._run(key, future, fn)
+        return future.result()
+
+    def submit(self, key: Hashable, fn: Callable[[], Any], executor: Executor) -> Future:
+        """Schedule ``fn`` for ``key`` on ``executor`` unless already in flight.
+
+        Returns a future shared by every caller coalesced on ``key``.
+        """
+        future, leader = self._claim(key)
+        if leader:
+            executor.submit(self._run, key, future, fn)
+        return future
+
+    def stats(self) -> Dict[str, int]:
+        """Return call counters and the number of calls currently in flight."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight),
+            }
+
+
+class AsyncSingleFlight:
+    """Coroutine counterpart of :class:`SingleFlight` for a single event loop."""
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``fn()`` for ``key`` unless a call for it is already running.
+
+        The shared call keeps running if one of its waiters is cancelled.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """Return call counters and the number of calls currently in flight."""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
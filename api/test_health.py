@@ -0,0 +1,118 @@
+"""Tests of the per-fetcher circuit breaker and latency ordering."""
+
+import pytest
+
+from fetchers import PriceFetcher
+
+from . import health as health_module
+from .health import HealthRegistry
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FastFetcher(PriceFetcher):
+    def get_price(self, ticker, ticker_type=None):
+        return 1.0
+
+    def get_history(self, ticker, start, end):
+        return []
+
+
+class SlowFetcher(FastFetcher):
+    pass
+
+
+class NewFetcher(FastFetcher):
+    pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(health_module.time, "monotonic", clock)
+    return clock
+
+
+def _open(registry, fetcher):
+    for _ in range(registry.failure_threshold):
+        assert registry.acquire(fetcher)
+        registry.record(fetcher, 0.1, failed=True)
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    registry = HealthRegistry(failure_threshold=3, cooldown_seconds=60)
+    fetcher = FastFetcher()
+    registry.record(fetcher, 0.1, failed=True)
+    registry.record(fetcher, 0.1, failed=False)
+    # A success resets the streak
+    registry.record(fetcher, 0.1, failed=True)
+    registry.record(fetcher, 0.1, failed=True)
+    assert registry.acquire(fetcher)
+    registry.record(fetcher, 0.1, failed=True)
+    assert not registry.acquire(fetcher)
+    assert registry.stats()["FastFetcher"]["open"]
+
+
+def test_slow_calls_count_as_failures(clock):
+    registry = HealthRegistry(failure_threshold=2, slow_call_seconds=5)
+    fetcher = FastFetcher()
+    registry.record(fetcher, 6.0, failed=False)
+    registry.record(fetcher, 6.0, failed=False)
+    assert not registry.acquire(fetcher)
+
+
+def test_single_trial_after_cooldown_closes_on_success(clock):
+    registry = HealthRegistry(failure_threshold=3, cooldown_seconds=60)
+    fetcher = FastFetcher()
+    _open(registry, fetcher)
+    clock.now += 59
+    assert not registry.acquire(fetcher)
+    clock.now += 1
+    assert registry.acquire(fetcher)
+    # Only one trial call is let through while it runs
+    assert not registry.acquire(fetcher)
+    registry.record(fetcher, 0.1, failed=False)
+    assert registry.acquire(fetcher)
+    assert registry.acquire(fetcher)
+    assert not registry.stats()["FastFetcher"]["open"]
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    registry = HealthRegistry(failure_threshold=3, cooldown_seconds=60)
+    fetcher = FastFetcher()
+    _open(registry, fetcher)
+    clock.now += 60
+    assert registry.acquire(fetcher)
+    registry.record(fetcher, 0.1, failed=True)
+    assert not registry.acquire(fetcher)
+    clock.now += 60
+    assert registry.acquire(fetcher)
+
+
+def test_order_puts_unmeasured_then_fastest_first(clock):
+    registry = HealthRegistry()
+    fast, slow, new = FastFetcher(), SlowFetcher(), NewFetcher()
+    registry.record(slow, 2.0, failed=False)
+    registry.record(fast, 0.2, failed=False)
+    registry.record(fast, 0.4, failed=False)
+    assert registry.order([slow, fast, new]) == [new, fast, slow]
+
+
+def test_configure_resets_the_statistics(clock):
+    registry = HealthRegistry(failure_threshold=3)
+    fetcher = FastFetcher()
+    _open(registry, fetcher)
+    registry.configure(failure_threshold=5)
+    assert registry.acquire(fetcher)
+    assert registry.stats()["FastFetcher"] == {
+        "calls": 0,
+        "latency_ms": None,
+        "error_rate": 0.0,
+        "open": False,
+    }
@@ -0,0 +1,94 @@
+"""Tests of the history gap filling and its coverage tracking."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from fetchers import PriceFetcher
+from storage import historical as historical_db
+
+from . import history
+
+
+class HistoryFetcher(PriceFetcher):
+    """Fetcher storing a bar for each weekday not in ``closed``."""
+
+    supports_history = True
+
+    def __init__(self, closed=()):
+        self.closed = set(closed)
+        self.calls = []
+
+    def get_price(self, ticker, ticker_type=None):
+        return None
+
+    def get_history(self, ticker, start, end):
+        self.calls.append((start, end))
+        rows = []
+        day = start
+        while day <= end:
+            if day.weekday() < 5 and day not in self.closed:
+                rows.append((ticker.upper(), day, 100.0, None, None))
+            day += timedelta(days=1)
+        historical_db.insert_records(rows)
+        return [(d, price) for _, d, price, _, _ in rows]
+
+
+@pytest.fixture(autouse=True)
+def history_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(historical_db, "DB_FILE", tmp_path / "historical.db")
+
+
+def _monday(weeks_ago):
+    today = datetime.utcnow().date()
+    return today - timedelta(days=today.weekday() + 7 * weeks_ago)
+
+
+def test_gaps_are_downloaded_once():
+    start = _monday(4)
+    end = start + timedelta(days=4)
+    fetcher = HistoryFetcher()
+    assert history.fill_history_gaps("GGAL", start, end, fetcher) == 1
+    assert history.fill_history_gaps("ggal", start, end, fetcher) == 0
+    # Only the days outside the covered range are requested
+    assert history.fill_history_gaps("GGAL", start, end + timedelta(days=7), fetcher) == 1
+    assert fetcher.calls == [(start, end), (end + timedelta(days=1), end + timedelta(days=7))]
+    assert historical_db.get_missing_ranges("GGAL", start, end + timedelta(days=7)) == []
+
+
+def test_settled_empty_ranges_are_covered():
+    # A market holiday and days before the listing answer empty
+    holiday = _monday(3)
+    fetcher = HistoryFetcher(closed={holiday})
+    assert history.fill_history_gaps("GGAL", holiday, holiday, fetcher) == 0
+    assert history.fill_history_gaps("GGAL", holiday, holiday, fetcher) == 0
+    assert fetcher.calls == [(holiday, holiday)]
+    assert historical_db.get_coverage("GGAL") == [(holiday, holiday)]
+
+
+def test_recent_empty_weekdays_are_asked_again():
+    today = datetime.utcnow().date()
+    day = today - timedelta(days=2)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    fetcher = HistoryFetcher(closed={day})
+    history.fill_history_gaps("GGAL", day, day, fetcher)
+    history.fill_history_gaps("GGAL", day, day, fetcher)
+    assert fetcher.calls == [(day, day), (day, day)]
+    assert historical_db.get_coverage("GGAL") == []
+
+
+def test_empty_weekends_are_covered():
+    saturday = _monday(0) - timedelta(days=2)
+    fetcher = HistoryFetcher()
+    history.fill_history_gaps("GGAL", saturday, saturday + timedelta(days=1), fetcher)
+    assert historical_db.get_coverage("GGAL") == [(saturday, saturday + timedelta(days=1))]
+
+
+def test_today_is_not_fetched_and_fill_locks_are_released():
+    today = datetime.utcnow().date()
+    fetcher = HistoryFetcher()
+    assert history.fill_history_gaps("GGAL", today, today, fetcher) == 0
+    history.fill_history_gaps("GGAL", today - timedelta(days=10), today, fetcher)
+    assert all(end < today for _, end in fetcher.calls)
+    assert history._fill_locks == {}
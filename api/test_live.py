@@ -0,0 +1,205 @@
+"""Tests of the live price lookups: stale-while-revalidate, batching and the
+negative cache.
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from fetchers import PriceFetcher, TickerNotFound
+from storage import live as live_db
+from storage import ticks
+
+from . import live
+from .health import HealthRegistry
+
+DB_FILES = (
+    "DEFAULT_DB_FILE",
+    "ACCIONES_DB_FILE",
+    "CEDEARS_DB_FILE",
+    "BONOS_DB_FILE",
+    "MONEDAS_DB_FILE",
+)
+
+
+class BatchFetcher(PriceFetcher):
+    """Fetcher pricing every ticker at ``price``, in batches."""
+
+    supported_ticker_types = (None, "bonos")
+    supports_batch = True
+
+    def __init__(self, price=2.0, release=None):
+        self.price = price
+        self.release = release
+        self.batches = []
+        self.single = []
+
+    def get_price(self, ticker, ticker_type=None):
+        self.single.append(ticker)
+        return self.price
+
+    def get_prices(self, tickers, ticker_type=None):
+        tickers = list(tickers)
+        self.batches.append(tickers)
+        if self.release is not None:
+            self.release.wait(5)
+        return {ticker: self.price for ticker in tickers}
+
+    def get_history(self, ticker, start, end):
+        return []
+
+
+class UnknownFetcher(PriceFetcher):
+    """Fetcher that does not know any ticker."""
+
+    supported_ticker_types = (None,)
+
+    def __init__(self):
+        self.asked = []
+
+    def get_price(self, ticker, ticker_type=None):
+        self.asked.append(ticker)
+        raise TickerNotFound(ticker)
+
+    def get_history(self, ticker, start, end):
+        return []
+
+
+@pytest.fixture(autouse=True)
+def live_store(tmp_path, monkeypatch):
+    for name in DB_FILES:
+        monkeypatch.setattr(live_db, name, tmp_path / f"{name.lower()}.db")
+    monkeypatch.setattr(ticks, "ENABLED", False)
+    monkeypatch.setattr(live, "health", HealthRegistry())
+    live_db.clear_cache()
+    yield
+    live_db.clear_cache()
+
+
+def _store(symbols, price, age_minutes, ticker_type=None):
+    updated_at = datetime.utcnow() - timedelta(minutes=age_minutes)
+    live_db.upsert_prices(
+        [(symbol, price, updated_at) for symbol in symbols],
+        db_file=live_db.get_db_file(ticker_type),
+    )
+
+
+def _wait_revalidated():
+    end = time.monotonic() + 5
+    while live._revalidating and time.monotonic() < end:
+        time.sleep(0.01)
+    assert not live._revalidating
+
+
+def _stored_prices(symbols, ticker_type=None):
+    live_db.clear_cache()
+    records = live_db.get_prices(symbols, db_file=live_db.get_db_file(ticker_type))
+    return {symbol: record[0] for symbol, record in records.items()}
+
+
+def test_stale_prices_are_served_then_revalidated_in_one_batch():
+    symbols = ["AL30", "GD30", "TX26"]
+    _store(symbols, 1.0, age_minutes=10, ticker_type="bonos")
+    fetcher = BatchFetcher()
+    results = live.get_live_prices(
+        symbols, fetcher, lock_minutes=5, ticker_type="bonos", max_stale_minutes=60
+    )
+    assert {symbol: price for symbol, (price, _) in results.items()} == dict.fromkeys(symbols, 1.0)
+    assert all(live.is_stale(at, symbol, lock_minutes=5) for symbol, (_, at) in results.items())
+    _wait_revalidated()
+    assert fetcher.batches == [symbols]
+    assert fetcher.single == []
+    assert _stored_prices(symbols, "bonos") == dict.fromkeys(symbols, 2.0)
+
+
+def test_prices_older_than_max_stale_are_refreshed_before_answering():
+    _store(["AL30"], 1.0, age_minutes=120)
+    _store(["GD30"], 1.0, age_minutes=10)
+    fetcher = BatchFetcher()
+    results = live.get_live_prices(["AL30", "GD30"], fetcher, lock_minutes=5, max_stale_minutes=60)
+    assert results["AL30"][0] == 2.0
+    assert results["GD30"][0] == 1.0
+    _wait_revalidated()
+    assert sorted(map(tuple, fetcher.batches)) == [("AL30",), ("GD30",)]
+
+
+def test_revalidation_in_flight_is_not_repeated():
+    _store(["AL30", "GD30"], 1.0, age_minutes=10)
+    release = threading.Event()
+    fetcher = BatchFetcher(release=release)
+    for _ in range(3):
+        live.get_live_prices(["AL30", "GD30"], fetcher, lock_minutes=5, max_stale_minutes=60)
+    release.set()
+    _wait_revalidated()
+    assert fetcher.batches == [["AL30", "GD30"]]
+
+
+def test_async_stale_prices_are_revalidated_in_one_batch():
+    symbols = ["AL30", "GD30"]
+    _store(symbols, 1.0, age_minutes=10)
+    fetcher = BatchFetcher()
+
+    async def main():
+        results = await live.get_live_prices_async(
+            symbols, fetcher, lock_minutes=5, max_stale_minutes=60
+        )
+        await asyncio.gather(*list(live._background_calls))
+        return results
+
+    results = asyncio.run(main())
+    assert [price for price, _ in results.values()] == [1.0, 1.0]
+    assert fetcher.batches == [symbols]
+    assert not live._revalidating
+    assert _stored_prices(symbols) == dict.fromkeys(symbols, 2.0)
+
+
+def _backdate_not_found(ticker, fetcher, minutes):
+    live_db.set_not_found(
+        ticker,
+        [fetcher.__class__.__name__],
+        datetime.utcnow() - timedelta(minutes=minutes),
+        db_file=live_db.get_db_file(None),
+    )
+
+
+def test_unknown_tickers_are_not_asked_again_until_the_mark_expires(monkeypatch):
+    monkeypatch.setattr(live, "_not_found_ttl", lambda: timedelta(minutes=60))
+    unknown = UnknownFetcher()
+    assert live.get_live_price("XX99", [unknown]) is None
+    assert live.get_live_price("XX99", [unknown]) is None
+    assert unknown.asked == ["XX99"]
+    _backdate_not_found("XX99", unknown, minutes=61)
+    live_db.clear_cache()
+    assert live.get_live_price("XX99", [unknown]) is None
+    assert unknown.asked == ["XX99", "XX99"]
+
+
+def test_not_found_marks_only_skip_the_fetcher_that_set_them(monkeypatch):
+    monkeypatch.setattr(live, "_not_found_ttl", lambda: timedelta(minutes=60))
+    unknown, known = UnknownFetcher(), BatchFetcher()
+    live.get_live_price("XX99", [unknown])
+    assert live.get_live_price("XX99", [unknown, known])[0] == 2.0
+    assert unknown.asked == ["XX99"]
+    assert known.single == ["XX99"]
+
+
+def test_expired_not_found_marks_are_deleted(monkeypatch):
+    monkeypatch.setattr(live, "_not_found_ttl", lambda: timedelta(minutes=60))
+    unknown = UnknownFetcher()
+    _backdate_not_found("OLD1", unknown, minutes=61)
+    live.get_live_price("XX99", [unknown])
+    live_db.clear_cache()
+    assert live_db.get_not_found("OLD1") == {}
+    assert set(live_db.get_not_found("XX99")) == {"UnknownFetcher"}
+
+
+def test_zero_not_found_ttl_disables_the_negative_cache(monkeypatch):
+    monkeypatch.setattr(live, "_not_found_ttl", lambda: timedelta(0))
+    unknown = UnknownFetcher()
+    live.get_live_price("XX99", [unknown])
+    live.get_live_price("XX99", [unknown])
+    assert unknown.asked == ["XX99", "XX99"]
+    assert live_db.get_not_found("XX99") == {}
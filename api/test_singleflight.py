@@ -0,0 +1,79 @@
+"""Tests of the coalescing of concurrent refreshes."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from .singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_do_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 42.0
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        leader = pool.submit(flight.do, "AL30", refresh)
+        assert started.wait(5)
+        followers = [pool.submit(flight.do, "AL30", refresh) for _ in range(4)]
+        # Followers block on the leader's future until it completes
+        while flight.stats()["coalesced"] < 4:
+            threading.Event().wait(0.01)
+        release.set()
+        assert [f.result(5) for f in [leader, *followers]] == [42.0] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_do_shares_exceptions_and_forgets_the_key():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("source down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("AL30", fail)
+    # A finished call is not reused
+    assert flight.do("AL30", lambda: 1.0) == 1.0
+    assert flight.stats()["calls"] == 2
+
+
+def test_submit_returns_the_in_flight_future():
+    flight = SingleFlight()
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = flight.submit("AL30", lambda: release.wait(5) and 1.0, pool)
+        second = flight.submit("AL30", lambda: 2.0, pool)
+        other = flight.submit("GD30", lambda: 3.0, pool)
+        assert second is first
+        release.set()
+        assert (first.result(5), other.result(5)) == (1.0, 3.0)
+
+
+def test_async_do_coalesces_and_survives_cancelled_waiters():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def refresh():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 42.0
+
+    async def main():
+        waiters = [asyncio.ensure_future(flight.do("AL30", refresh)) for _ in range(3)]
+        await asyncio.sleep(0)
+        waiters[0].cancel()
+        return await asyncio.gather(*waiters[1:])
+
+    assert asyncio.run(main()) == [42.0, 42.0]
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 1, "coalesced": 2, "in_flight": 0}
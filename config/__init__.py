@@ -1,27 +1,256 @@
-"""Utilities to load pymrkt configuration."""
+"""Utilities to load pymrkt configuration.
 
+``config.yaml`` is read and validated once and kept in memory, so getters do
+no file I/O. :func:`start_watching` re-reads it when its modification time
+changes (and on ``SIGHUP``); an invalid file is logged and the previous
+configuration stays in use.
+"""
+
+import logging
+import signal
+import threading
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import yaml
 
 CONFIG_PATH = Path(__file__).resolve().parent / "config.yaml"
 
+#: Seconds between checks of the modification time of ``config.yaml``
+WATCH_INTERVAL_SECONDS = 2.0
 
-def _load_config() -> Dict[str, Any]:
-    """Return configuration dictionary from ``config.yaml``."""
+logger = logging.getLogger(__name__)
+
+
+class ConfigError(ValueError):
+    """Raised when ``config.yaml`` holds an invalid value."""
+
+
+# Lock windows: (default minutes, by ticker_type, by ticker, by (ticker_type, ticker))
+LockWindows = Tuple[int, Dict[str, int], Dict[str, int], Dict[Tuple[str, str], int]]
+
+_config: Optional[Dict[str, Any]] = None
+_locks: LockWindows = (15, {}, {}, {})
+_mtime: Optional[int] = None
+_config_lock = threading.Lock()
+_listeners: List[Callable[[], None]] = []
+_watcher: Optional[threading.Thread] = None
+_stop_watching = threading.Event()
+
+
+def _number(
+    value: Any,
+    name: str,
+    cast: Callable[[Any], Any],
+    minimum: float,
+    optional: bool = False,
+) -> Any:
+    if value is None and optional:
+        return None
+    try:
+        number = cast(value)
+    except (TypeError, ValueError):
+        raise ConfigError(f"{name} must be a number, got {value!r}") from None
+    if number < minimum:
+        raise ConfigError(f"{name} must be at least {minimum}, got {value!r}")
+    return number
+
+
+def _section(cfg: Dict[str, Any], name: str) -> Dict[str, Any]:
+    section = cfg.get(name)
+    if section is None:
+        return {}
+    if not isinstance(section, dict):
+        raise ConfigError(f"{name} must be a mapping")
+    return section
+
+
+def _lock_windows(cfg: Dict[str, Any]) -> LockWindows:
+    """Validate the lock settings and return them ready for lookups."""
+    default = _number(cfg.get("lock_minutes", 15), "lock_minutes", int, 0)
+    overrides = _section(cfg, "lock_overrides")
+    by_type = {
+        str(ticker_type): _number(minutes, f"lock_overrides.ticker_types.{ticker_type}", int, 0)
+        for ticker_type, minutes in _section(overrides, "ticker_types").items()
+    }
+    by_ticker: Dict[str, int] = {}
+    by_pair: Dict[Tuple[str, str], int] = {}
+    for key, minutes in _section(overrides, "tickers").items():
+        minutes = _number(minutes, f"lock_overrides.tickers.{key}", int, 0)
+        # ``tipo:TICKER`` only applies to that ticker_type
+        ticker_type, _, ticker = str(key).rpartition(":")
+        if ticker_type:
+            by_pair[(ticker_type, ticker.upper())] = minutes
+        else:
+            by_ticker[ticker.upper()] = minutes
+    return default, by_type, by_ticker, by_pair
+
+
+def validate_config(cfg: Any) -> LockWindows:
+    """Check the values of a parsed ``config.yaml``; raise :class:`ConfigError`.
+
+    Returns the lock windows, which are pre-computed for fast lookups.
+    """
+    if not isinstance(cfg, dict):
+        raise ConfigError("config.yaml must be a mapping")
+    locks = _lock_windows(cfg)
+    for ticker_type, minutes in _section(cfg, "stale_while_revalidate").items():
+        _number(minutes, f"stale_while_revalidate.{ticker_type}", int, 0)
+    for name, enabled in _section(cfg, "fetchers").items():
+        if not isinstance(enabled, bool):
+            raise ConfigError(f"fetchers.{name} must be true or false, got {enabled!r}")
+    server = _section(cfg, "server")
+    _number(server.get("port", 8000), "server.port", int, 1)
+    fetch = _section(cfg, "fetch")
+    _number(fetch.get("min_answers"), "fetch.min_answers", int, 1, optional=True)
+    _number(fetch.get("deadline_seconds"), "fetch.deadline_seconds", float, 0, optional=True)
+    _number(fetch.get("not_found_ttl_minutes", 60), "fetch.not_found_ttl_minutes", int, 0)
+    breaker = _section(fetch, "breaker")
+    _number(breaker.get("failure_threshold", 3), "fetch.breaker.failure_threshold", int, 1)
+    _number(breaker.get("cooldown_seconds", 60), "fetch.breaker.cooldown_seconds", float, 0)
+    _number(breaker.get("slow_call_seconds", 5), "fetch.breaker.slow_call_seconds", float, 0)
+    scheduler = _section(cfg, "scheduler")
+    _number(scheduler.get("refresh_ahead_minutes", 1), "scheduler.refresh_ahead_minutes", int, 0)
+    storage = _section(cfg, "storage")
+    backend = storage.get("backend", "sqlite")
+    if backend not in ("sqlite", "postgres"):
+        raise ConfigError(f"storage.backend must be sqlite or postgres, got {backend!r}")
+    postgres = _section(storage, "postgres")
+    if backend == "postgres" and not postgres.get("dsn"):
+        raise ConfigError("storage.postgres.dsn is required with the postgres backend")
+    _number(postgres.get("pool_size", 10), "storage.postgres.pool_size", int, 1)
+    for name in ("single_db", "compact_dates"):
+        if not isinstance(storage.get(name, False), bool):
+            raise ConfigError(f"storage.{name} must be true or false, got {storage[name]!r}")
+    ticks = _section(cfg, "ticks")
+    _number(ticks.get("retention_days", 7), "ticks.retention_days", int, 0)
+    sources = cfg.get("sources") or []
+    if not isinstance(sources, list):
+        raise ConfigError("sources must be a list")
+    for index, source in enumerate(sources):
+        if not isinstance(source, dict):
+            raise ConfigError(f"sources[{index}] must be a mapping")
+        if not isinstance(source.get("tickers") or [], list):
+            raise ConfigError(f"sources[{index}].tickers must be a list")
+        _number(source.get("interval_minutes", 15), f"sources[{index}].interval_minutes", int, 1)
+    return locks
+
+
+def _read() -> Tuple[Dict[str, Any], LockWindows, Optional[int]]:
     try:
+        mtime = CONFIG_PATH.stat().st_mtime_ns
         with CONFIG_PATH.open("r", encoding="utf-8") as fh:
-            return yaml.safe_load(fh) or {}
+            cfg = yaml.safe_load(fh) or {}
     except FileNotFoundError:
-        return {}
+        cfg, mtime = {}, None
+    return cfg, validate_config(cfg), mtime
 
 
-def get_lock_minutes() -> int:
-    """Return the ``lock_minutes`` setting from the configuration file."""
-    cfg = _load_config()
-    return int(cfg.get("lock_minutes", 15))
+def _load_config() -> Dict[str, Any]:
+    """Return the configuration dictionary, reading ``config.yaml`` on first use."""
+    global _config, _locks, _mtime
+    cfg = _config
+    if cfg is None:
+        with _config_lock:
+            if _config is None:
+                _config, _locks, _mtime = _read()
+            cfg = _config
+    return cfg
+
+
+def reload_config(force: bool = False) -> bool:
+    """Re-read ``config.yaml`` if it changed since it was loaded.
+
+    An invalid file is logged and ignored. Returns whether a new
+    configuration was applied; callbacks registered with :func:`on_reload`
+    run after every successful reload.
+    """
+    global _config, _locks, _mtime
+    try:
+        mtime: Optional[int] = CONFIG_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    if not force and _config is not None and mtime == _mtime:
+        return False
+    try:
+        cfg, locks, mtime = _read()
+    except (ConfigError, yaml.YAMLError) as exc:
+        logger.warning("Ignoring invalid %s: %s", CONFIG_PATH, exc)
+        return False
+    with _config_lock:
+        _config, _locks, _mtime = cfg, locks, mtime
+    for callback in list(_listeners):
+        try:
+            callback()
+        except Exception:  # noqa: BLE001
+            logger.exception("Config reload callback failed")
+    return True
+
+
+def on_reload(callback: Callable[[], None]) -> None:
+    """Call ``callback`` after every configuration reload."""
+    _listeners.append(callback)
+
+
+def start_watching(interval: float = WATCH_INTERVAL_SECONDS) -> None:
+    """Reload ``config.yaml`` when it changes, from a background thread.
+
+    When called from the main thread, ``SIGHUP`` forces a reload as well.
+    """
+    global _watcher
+    _load_config()
+    if _watcher is not None and _watcher.is_alive():
+        return
+    _stop_watching.clear()
 
+    def watch() -> None:
+        while not _stop_watching.wait(interval):
+            reload_config()
+
+    _watcher = threading.Thread(target=watch, name="config-watcher", daemon=True)
+    _watcher.start()
+    if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGHUP, lambda signum, frame: reload_config(force=True))
+
+
+def stop_watching() -> None:
+    """Stop the thread started by :func:`start_watching`."""
+    global _watcher
+    _stop_watching.set()
+    if _watcher is not None:
+        _watcher.join()
+        _watcher = None
+
+
+def get_lock_minutes(ticker_type: Optional[str] = None, ticker: Optional[str] = None) -> int:
+    """Return the lock window in minutes for ``ticker`` of ``ticker_type``.
+
+    ``lock_overrides.tickers`` (``TICKER`` or ``tipo:TICKER``) take
+    precedence over ``lock_overrides.ticker_types``, which take precedence
+    over ``lock_minutes``.
+    """
+    _load_config()
+    default, by_type, by_ticker, by_pair = _locks
+    if ticker is not None:
+        symbol = ticker.upper()
+        if ticker_type is not None and (ticker_type, symbol) in by_pair:
+            return by_pair[(ticker_type, symbol)]
+        if symbol in by_ticker:
+            return by_ticker[symbol]
+    if ticker_type is not None and ticker_type in by_type:
+        return by_type[ticker_type]
+    return default
+
+
+def get_stale_minutes(ticker_type: Optional[str] = None) -> int:
+    """Return how many minutes old a price of ``ticker_type`` may be served stale.
+
+    Read from ``stale_while_revalidate`` (``default`` is the key for tickers
+    without a type); ``0`` disables stale-while-revalidate.
+    """
+    cfg = _load_config()
+    minutes = (cfg.get("stale_while_revalidate") or {}).get(ticker_type or "default")
+    return int(minutes or 0)
 
 
 def get_server_host() -> str:
@@ -38,9 +267,116 @@ def get_server_port() -> int:
     return int(server.get("port", 8000))
 
 
+def get_sources() -> List[Dict[str, Any]]:
+    """Return the enabled entries of the ``sources`` section.
+
+    Each entry is normalised to contain ``name``, ``ticker_type`` (``None``
+    when omitted), upper-cased ``tickers`` and ``interval_minutes``.
+    """
+    cfg = _load_config()
+    sources = []
+    for source in cfg.get("sources") or []:
+        if not source.get("enabled", True):
+            continue
+        sources.append(
+            {
+                "name": str(source.get("name", "")),
+                "ticker_type": source.get("ticker_type"),
+                "tickers": [str(t).upper() for t in source.get("tickers") or []],
+                "interval_minutes": int(source.get("interval_minutes", 15)),
+            }
+        )
+    return sources
+
+
+def get_scheduler_settings() -> Dict[str, Any]:
+    """Return the ``scheduler`` section with defaults applied."""
+    cfg = _load_config()
+    scheduler = cfg.get("scheduler", {})
+    return {
+        "enabled": bool(scheduler.get("enabled", False)),
+        "refresh_ahead_minutes": int(scheduler.get("refresh_ahead_minutes", 1)),
+    }
+
+
+def get_storage_settings() -> Dict[str, Any]:
+    """Return the ``storage`` section with defaults applied.
+
+    ``backend`` is ``"sqlite"`` unless set; ``postgres_dsn`` is ``None``
+    unless set.
+    """
+    cfg = _load_config()
+    storage = cfg.get("storage", {})
+    postgres = storage.get("postgres") or {}
+    dsn = postgres.get("dsn")
+    return {
+        "backend": str(storage.get("backend", "sqlite")),
+        "postgres_dsn": None if dsn is None else str(dsn),
+        "pool_size": int(postgres.get("pool_size", 10)),
+        "single_db": bool(storage.get("single_db", False)),
+        "compact_dates": bool(storage.get("compact_dates", False)),
+    }
+
+
+def get_tick_settings() -> Dict[str, Any]:
+    """Return the ``ticks`` section with defaults applied."""
+    cfg = _load_config()
+    ticks = cfg.get("ticks", {})
+    return {
+        "enabled": bool(ticks.get("enabled", True)),
+        "retention_days": int(ticks.get("retention_days", 7)),
+    }
+
+
+def get_fetch_settings() -> Dict[str, Any]:
+    """Return the ``fetch`` section with defaults applied.
+
+    ``min_answers`` and ``deadline_seconds`` are ``None`` unless set, meaning
+    "wait for every fetcher". ``not_found_ttl_minutes`` is ``0`` when the
+    negative cache of unknown tickers is disabled.
+    """
+    cfg = _load_config()
+    fetch = cfg.get("fetch", {})
+    breaker = fetch.get("breaker", {})
+
+    def optional(value: Any, cast: Any) -> Optional[Any]:
+        return None if value is None else cast(value)
+
+    return {
+        "min_answers": optional(fetch.get("min_answers"), int),
+        "deadline_seconds": optional(fetch.get("deadline_seconds"), float),
+        "not_found_ttl_minutes": int(fetch.get("not_found_ttl_minutes", 60) or 0),
+        "failure_threshold": int(breaker.get("failure_threshold", 3)),
+        "cooldown_seconds": float(breaker.get("cooldown_seconds", 60)),
+        "slow_call_seconds": float(breaker.get("slow_call_seconds", 5)),
+    }
+
+
+def get_fetcher_settings() -> Dict[str, bool]:
+    """Return the ``fetchers`` section: whether each named fetcher is enabled.
+
+    Fetchers not listed keep their default (see :mod:`fetchers.registry`).
+    """
+    cfg = _load_config()
+    return {str(name): enabled for name, enabled in (cfg.get("fetchers") or {}).items()}
+
+
 __all__ = [
+    "ConfigError",
+    "get_fetch_settings",
+    "get_fetcher_settings",
     "get_lock_minutes",
+    "get_scheduler_settings",
     "get_server_host",
+    "get_stale_minutes",
     "get_server_port",
+    "get_sources",
+    "get_storage_settings",
+    "get_tick_settings",
+    "on_reload",
+    "reload_config",
+    "start_watching",
+    "stop_watching",
+    "validate_config",
 ]
 
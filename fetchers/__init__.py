@@ -1,30 +1,40 @@
-"""Collection of available price fetchers."""
+"""Collection of available price fetchers.
 
-from .base import PriceFetcher
+The fetchers with heavy dependencies are imported on first access to their
+class (see :mod:`fetchers.registry`); an unavailable one is ``None``.
+"""
+
+from typing import Any, List
+
+from .base import PriceFetcher, TickerNotFound
 from .dummy_fetcher import DummyFetcher
 
-try:
-    from .dolarapi_fetcher import DolarApiFetcher
-except Exception:  # pragma: no cover - optional dependency
-    DolarApiFetcher = None
+# Class name -> registry name of the fetchers imported on first access
+_LAZY = {
+    "YFinanceFetcher": "yfinance",
+    "BancoPianoFetcher": "banco_piano",
+    "Data912Fetcher": "data912",
+    "DolarApiFetcher": "dolarapi",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from . import registry
+
+    value = registry.load_class(_LAZY[name])
+    globals()[name] = value
+    return value
 
-try:
-    from .data912_fetcher import Data912Fetcher
-except Exception:  # pragma: no cover - optional dependency
-    Data912Fetcher = None
 
-try:
-    from .banco_piano_fetcher import BancoPianoFetcher
-except Exception:  # pragma: no cover - optional dependency
-    BancoPianoFetcher = None
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + list(_LAZY))
 
-try:
-    from .yfinance_fetcher import YFinanceFetcher
-except Exception:  # pragma: no cover - optional dependency
-    YFinanceFetcher = None
 
 __all__ = [
     "PriceFetcher",
+    "TickerNotFound",
     "DummyFetcher",
     "YFinanceFetcher",
     "BancoPianoFetcher",
@@ -1,13 +1,15 @@
+import asyncio
 import io
 import logging
 import re
-import requests
 import pandas as pd
 import warnings
 from datetime import date
 from typing import List, Optional, Tuple
 
-from .base import PriceFetcher
+from .base import PriceFetcher, TickerNotFound
+from .http import get_text, get_text_async
+from .snapshot import Board, BoardSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -20,66 +22,122 @@ class BancoPianoFetcher(PriceFetcher):
 
     URL = "https://www.bancopiano.com.ar/Inversiones/Cotizaciones/Bonos/"
 
-    def __init__(self) -> None:
-        self._df = None
+    #: Seconds a downloaded table is reused before requesting it again
+    SNAPSHOT_TTL = 300
 
-    def _load_dataframe(self) -> None:
-        if self._df is not None:
-            return
+    # Columnas candidatas para el precio de referencia, en orden de preferencia
+    PRICE_COLUMN_PATTERNS = (
+        r"VENTA\s*T\+?2",
+        r"VENTA",
+        r"ÚLTIMO",
+        r"ULTIMO",
+    )
 
-        attempts = 0
-        while attempts < 3:
-            try:
-                resp = requests.get(self.URL)
-                resp.raise_for_status()
-                tables = pd.read_html(io.StringIO(resp.text))
-                self._df = tables[0] if tables else None
-                if self._df is not None and not self._df.empty:
+    def __init__(self, snapshot_ttl: float = SNAPSHOT_TTL) -> None:
+        self._snapshot = BoardSnapshot(
+            self._load_board, ttl=snapshot_ttl, async_loader=self._load_board_async
+        )
+
+    def _load_html(self) -> Optional[str]:
+        try:
+            return get_text(self.URL)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("Banco Piano request failed: %s", exc)
+            return None
+
+    async def _load_html_async(self) -> Optional[str]:
+        try:
+            return await get_text_async(self.URL)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("Banco Piano request failed: %s", exc)
+            return None
+
+    def _build_board(self, html: Optional[str]) -> Optional[Board]:
+        """Parse the bonds table and index it by symbol.
+
+        Each row is indexed by the full text of its first column and by every
+        word in it, so lookups are plain dictionary accesses. Rows without a
+        price (e.g. ``-`` for a bond not traded yet) map to ``None``.
+        """
+        if html is None:
+            return None
+        try:
+            tables = pd.read_html(io.StringIO(html))
+        except Exception:
+            return None
+        df = tables[0] if tables else None
+        if df is None or df.empty:
+            return None
+
+        # buscar columna con el precio de referencia ("Venta" o "Último")
+        venta_col = None
+        for pattern in self.PRICE_COLUMN_PATTERNS:
+            for col in df.columns:
+                if re.search(pattern, str(col), re.IGNORECASE):
+                    venta_col = col
                     break
-            except requests.RequestException:
-                # Connection error, retry
-                self._df = None
-            except Exception:
-                self._df = None
+            if venta_col is not None:
                 break
-            attempts += 1
+        if venta_col is None:
+            logger.debug("No se encontró columna de venta en la tabla")
+            return None
+
+        board: Board = {}
+        words: Board = {}
+
+        def add(index: Board, key: str, price: Optional[float]) -> None:
+            # The first priced row wins over rows without a price
+            if index.get(key) is None:
+                index[key] = price
+
+        for name, value in zip(df.iloc[:, 0].astype(str), df[venta_col].astype(str)):
+            try:
+                price: Optional[float] = float(value.replace(".", "").replace(",", "."))
+            except ValueError:
+                price = None
+            name = name.strip().upper()
+            add(board, name, price)
+            for word in re.split(r"[^0-9A-Z]+", name):
+                if word:
+                    add(words, word, price)
+        for word, price in words.items():
+            if word not in board:
+                board[word] = price
+        return board
+
+    def _load_board(self) -> Optional[Board]:
+        return self._build_board(self._load_html())
+
+    async def _load_board_async(self) -> Optional[Board]:
+        html = await self._load_html_async()
+        # Parsing the HTML table is CPU bound: keep it off the event loop
+        return await asyncio.to_thread(self._build_board, html)
+
+    def _lookup(self, board: Board, ticker: str) -> Optional[float]:
+        if not board:
+            return None
+        ticker = ticker.upper()
+        if ticker in board:
+            return board[ticker]
+        # Nombres que contienen el ticker sin ser una palabra completa
+        names = [name for name in board if ticker in name]
+        if not names:
+            logger.debug("No se encontró fila para el ticker %s", ticker)
+            raise TickerNotFound(ticker)
+        # Listado sin precio todavía: None, sin marcarlo como desconocido
+        return next((board[name] for name in names if board[name] is not None), None)
 
     def get_price(self, ticker: str, ticker_type: Optional[str] = None) -> Optional[float]:
         if ticker_type not in {None, "bonos"}:
             return None
-        self._load_dataframe()
-        if self._df is None or self._df.empty:
-            return None
-        ticker = ticker.upper()
-        try:
-            mask = self._df.iloc[:, 0].astype(str).str.contains(ticker, case=False, na=False)
-            row = self._df.loc[mask]
-            if row.empty:
-                logger.debug("No se encontró fila para el ticker %s", ticker)
-                return None
-            # buscar columna con el precio de referencia ("Venta" o "Último")
-            venta_col = None
-            patterns = [
-                r"VENTA\s*T\+?2",
-                r"VENTA",
-                r"ÚLTIMO",
-                r"ULTIMO",
-            ]
-            for pattern in patterns:
-                for col in self._df.columns:
-                    if re.search(pattern, str(col), re.IGNORECASE):
-                        venta_col = col
-                        break
-                if venta_col is not None:
-                    break
-            if venta_col is None:
-                logger.debug("No se encontró columna de venta en la tabla")
-                return None
-            value = str(row.iloc[0][venta_col])
-            value = value.replace(".", "").replace(",", ".")
-            return float(value)
-        except Exception:
+        return self._lookup(self._snapshot.get(), ticker)
+
+    async def get_price_async(
+        self, ticker: str, ticker_type: Optional[str] = None
+    ) -> Optional[float]:
+        if ticker_type not in {None, "bonos"}:
             return None
+        return self._lookup(await self._snapshot.get_async(), ticker)
 
     def get_history(self, ticker: str, start: date, end: date) -> List[Tuple[date, float]]:
         """Historical data not supported for this source."""
@@ -1,6 +1,15 @@
+import asyncio
 from abc import ABC, abstractmethod
 from datetime import date
-from typing import List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class TickerNotFound(LookupError):
+    """Raised by a fetcher whose source answered but does not list a ticker.
+
+    Unlike a ``None`` price (which may be a temporary failure), this lets
+    :mod:`api.live` stop asking that fetcher for the ticker for a while.
+    """
 
 
 class PriceFetcher(ABC):
@@ -14,21 +23,66 @@ class PriceFetcher(ABC):
     #: Tuple of supported ticker types. ``None`` means "no type provided".
     supported_ticker_types: tuple[Optional[str], ...] = (None,)
 
+    #: Whether :meth:`get_history` returns data (and stores it)
+    supports_history: bool = False
+
+    #: Whether :meth:`get_prices` prices several tickers in one request
+    supports_batch: bool = False
+
     @abstractmethod
     def get_price(self, ticker: str, ticker_type: Optional[str] = None) -> Optional[float]:
         """Return latest price for ``ticker`` or ``None`` if not available.
 
         ``ticker_type`` allows fetchers to adjust the query depending on the
         type of asset (e.g. ``"acciones"`` or ``"cedears"``). Unsupported
-        types should return ``None``.
+        types should return ``None``. Fetchers may raise
+        :class:`TickerNotFound` when the source is known not to list
+        ``ticker``.
         """
         raise NotImplementedError
 
+    async def get_price_async(
+        self, ticker: str, ticker_type: Optional[str] = None
+    ) -> Optional[float]:
+        """Asynchronous variant of :meth:`get_price`.
+
+        The default implementation runs :meth:`get_price` in a worker thread.
+        Fetchers backed by HTTP APIs should override it with a native
+        implementation using :func:`fetchers.http.get_async_client`.
+        """
+        return await asyncio.to_thread(self.get_price, ticker, ticker_type)
+
+    def get_prices(
+        self, tickers: Iterable[str], ticker_type: Optional[str] = None
+    ) -> Dict[str, float]:
+        """Return the latest price of several ``tickers``.
+
+        The result is keyed by the upper-cased ticker and omits tickers
+        without a price. The default implementation calls :meth:`get_price`
+        for each ticker; fetchers able to price many symbols in a single
+        request should override it and set :pyattr:`supports_batch`.
+        """
+        prices = {}
+        for ticker in tickers:
+            try:
+                price = self.get_price(ticker, ticker_type)
+            except TickerNotFound:
+                continue
+            if price is not None:
+                prices[ticker.upper()] = price
+        return prices
+
+    async def get_prices_async(
+        self, tickers: Iterable[str], ticker_type: Optional[str] = None
+    ) -> Dict[str, float]:
+        """Asynchronous variant of :meth:`get_prices`, run in a worker thread."""
+        return await asyncio.to_thread(self.get_prices, list(tickers), ticker_type)
+
     @abstractmethod
     def get_history(self, ticker: str, start: date, end: date) -> List[Tuple[date, float]]:
         """Return historical prices for ``ticker`` between ``start`` and ``end``.
 
-        Subclasses that do not implement historical queries should return an
+        Both bounds are inclusive. Subclasses that do not implement historical queries should return an
         empty list and issue a warning.
         """
         raise NotImplementedError
@@ -1,13 +1,15 @@
+import asyncio
 import logging
 from datetime import date, datetime
 from typing import List, Optional, Tuple
 
-import requests
 import warnings
 
 from storage import live as live_db
 
-from .base import PriceFetcher
+from .base import PriceFetcher, TickerNotFound
+from .http import get_json, get_json_async
+from .snapshot import Board, BoardSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -20,45 +22,96 @@ class Data912Fetcher(PriceFetcher):
 
     URL = "https://data912.com/live/arg_bonds"
 
-    def get_price(
-        self, ticker: str, ticker_type: Optional[str] = None
-    ) -> Optional[float]:
-        """Return last traded price for ``ticker`` using Data912.
+    #: Seconds a downloaded board is reused before requesting it again
+    SNAPSHOT_TTL = 60
 
-        All retrieved bonds are stored in ``live.bonos.db`` for reuse.
-        """
-        if ticker_type != "bonos":
-            return None
+    def __init__(self, snapshot_ttl: float = SNAPSHOT_TTL) -> None:
+        self._snapshot = BoardSnapshot(
+            self._load_board, ttl=snapshot_ttl, async_loader=self._load_board_async
+        )
 
-        try:
-            resp = requests.get(self.URL, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-        except Exception as exc:  # noqa: BLE001
-            logger.debug("Data912 request failed: %s", exc)
-            return None
+    def _parse_board(self, data: object) -> Optional[Board]:
+        """Build the board from the API response.
 
+        Listed bonds without a price yet (no trade today) map to ``None``.
+        """
         if not isinstance(data, list):
             return None
 
-        now = datetime.utcnow()
-        db_file = live_db.get_db_file("bonos")
-        result_price = None
+        board: Board = {}
 
         for item in data:
             symbol = item.get("symbol")
-            close = item.get("c")
-            if symbol is None or close is None:
+            if symbol is None:
                 continue
             try:
-                price = float(close)
+                price = float(item["c"])
             except Exception:  # noqa: BLE001
-                continue
-            live_db.upsert_price(symbol, price, timestamp=now, db_file=db_file)
-            if symbol == ticker:
-                result_price = price
+                price = None
+            board[str(symbol).upper()] = price
+        return board
+
+    @staticmethod
+    def _save_board(board: Optional[Board]) -> Optional[Board]:
+        """Store every price of ``board`` in ``live.bonos.db``."""
+        if board:
+            now = datetime.utcnow()
+            # Store the whole board in a single transaction
+            live_db.upsert_prices(
+                (
+                    (symbol, price, now)
+                    for symbol, price in board.items()
+                    if price is not None
+                ),
+                db_file=live_db.get_db_file("bonos"),
+            )
+        return board
+
+    def _load_board(self) -> Optional[Board]:
+        try:
+            data = get_json(self.URL)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("Data912 request failed: %s", exc)
+            return None
+        return self._save_board(self._parse_board(data))
 
-        return result_price
+    async def _load_board_async(self) -> Optional[Board]:
+        try:
+            data = await get_json_async(self.URL)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("Data912 request failed: %s", exc)
+            return None
+        # Writing the board (and its ticks) must not block the event loop
+        return await asyncio.to_thread(self._save_board, self._parse_board(data))
+
+    def get_price(
+        self, ticker: str, ticker_type: Optional[str] = None
+    ) -> Optional[float]:
+        """Return last traded price for ``ticker`` using Data912.
+
+        The board is downloaded at most once per :pyattr:`SNAPSHOT_TTL`
+        seconds and all retrieved bonds are stored in ``live.bonos.db`` for
+        reuse. Raises :class:`TickerNotFound` when a downloaded board does
+        not list ``ticker``; a listed bond without a price yields ``None``.
+        """
+        if ticker_type != "bonos":
+            return None
+        return self._lookup(self._snapshot.get(), ticker)
+
+    async def get_price_async(
+        self, ticker: str, ticker_type: Optional[str] = None
+    ) -> Optional[float]:
+        if ticker_type != "bonos":
+            return None
+        return self._lookup(await self._snapshot.get_async(), ticker)
+
+    @staticmethod
+    def _lookup(board: Board, ticker: str) -> Optional[float]:
+        ticker = ticker.upper()
+        # An empty board means the download failed
+        if board and ticker not in board:
+            raise TickerNotFound(ticker)
+        return board.get(ticker)
 
     def get_history(
         self, ticker: str, start: date, end: date
@@ -1,11 +1,11 @@
 import logging
 from typing import List, Optional, Tuple
 
-import requests
 import warnings
 from datetime import date
 
-from .base import PriceFetcher
+from .base import PriceFetcher, TickerNotFound
+from .http import get_json, get_json_async
 
 logger = logging.getLogger(__name__)
 
@@ -18,21 +18,40 @@ class DolarApiFetcher(PriceFetcher):
 
     URL = "https://dolarapi.com/v1/dolares/bolsa"
 
+    def _parse_price(self, data: dict) -> Optional[float]:
+        compra = data.get("compra")
+        venta = data.get("venta")
+        if compra is None or venta is None:
+            return None
+        avg = (float(compra) + float(venta)) / 2
+        return round(avg, 2)
+
+    def _check_ticker(self, ticker: str, ticker_type: Optional[str]) -> bool:
+        """Return whether to query the API; raise for unknown currencies."""
+        if ticker_type != "monedas":
+            return False
+        if ticker.upper() != "USD":
+            raise TickerNotFound(ticker)
+        return True
+
     def get_price(
         self, ticker: str, ticker_type: Optional[str] = None
     ) -> Optional[float]:
-        if ticker_type != "monedas" or ticker.upper() != "USD":
+        if not self._check_ticker(ticker, ticker_type):
+            return None
+        try:
+            return self._parse_price(get_json(self.URL))
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("dolarapi request failed: %s", exc)
+            return None
+
+    async def get_price_async(
+        self, ticker: str, ticker_type: Optional[str] = None
+    ) -> Optional[float]:
+        if not self._check_ticker(ticker, ticker_type):
             return None
         try:
-            resp = requests.get(self.URL, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-            compra = data.get("compra")
-            venta = data.get("venta")
-            if compra is None or venta is None:
-                return None
-            avg = (float(compra) + float(venta)) / 2
-            return round(avg, 2)
+            return self._parse_price(await get_json_async(self.URL))
         except Exception as exc:  # noqa: BLE001
             logger.debug("dolarapi request failed: %s", exc)
             return None
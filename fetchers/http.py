@@ -0,0 +1,203 @@
+"""Shared HTTP clients for fetchers.
+
+Every HTTP fetcher goes through the helpers in this module so that:
+
+* connections are pooled and kept alive between requests to the same host;
+* every request has a timeout (:data:`DEFAULT_TIMEOUT`);
+* transient failures (failed connections, 429 and 5xx answers) are retried
+  with exponential backoff, but a read timeout is not: a source that hangs
+  costs one :data:`DEFAULT_TIMEOUT`, not one per attempt;
+* sources that send ``ETag`` / ``Last-Modified`` headers are queried with
+  conditional requests, and a ``304 Not Modified`` answer reuses the body
+  received previously.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+except Exception:  # pragma: no cover - optional dependency
+    requests = None
+
+try:
+    import httpx
+except Exception:  # pragma: no cover - optional dependency
+    httpx = None
+
+#: Seconds to wait for any upstream source before giving up
+DEFAULT_TIMEOUT = 10
+#: Number of retries after the first attempt
+MAX_RETRIES = 3
+#: Delay before retry ``n`` is ``BACKOFF_FACTOR * 2 ** (n - 1)`` seconds
+BACKOFF_FACTOR = 0.5
+#: Status codes worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+_async_client: Optional["httpx.AsyncClient"] = None
+
+# Validators and body of the last successful answer per URL
+_validators: Dict[str, Tuple[Optional[str], Optional[str], str]] = {}
+_validators_lock = threading.Lock()
+
+
+def get_session() -> "requests.Session":
+    """Return the pooled session shared by every fetcher."""
+    global _session
+    if requests is None:
+        raise RuntimeError("requests is required for HTTP fetchers")
+    with _session_lock:
+        if _session is None:
+            # Read errors are not retried: the request may have hung
+            retry = Retry(
+                total=MAX_RETRIES,
+                connect=MAX_RETRIES,
+                read=0,
+                other=0,
+                status=MAX_RETRIES,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset({"GET", "HEAD"}),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def get_async_client() -> "httpx.AsyncClient":
+    """Return the pooled async client shared by every fetcher.
+
+    The client is created on first use and keeps connections alive between
+    requests to the same source.
+    """
+    global _async_client
+    if httpx is None:
+        raise RuntimeError("httpx is required for async fetchers")
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """Close the shared async client, if it was created."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def _conditional_headers(url: str) -> Dict[str, str]:
+    with _validators_lock:
+        cached = _validators.get(url)
+    headers = {}
+    if cached is not None:
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def _handle_response(url: str, status: int, headers: Any, text: str) -> Optional[str]:
+    """Return the body for ``url``, reusing the cached one on ``304``.
+
+    Returns ``None`` if a ``304`` arrives without a cached body.
+    """
+    if status == 304:
+        with _validators_lock:
+            cached = _validators.get(url)
+        return cached[2] if cached is not None else None
+    etag = headers.get("ETag")
+    last_modified = headers.get("Last-Modified")
+    with _validators_lock:
+        if etag or last_modified:
+            _validators[url] = (etag, last_modified, text)
+        else:
+            _validators.pop(url, None)
+    return text
+
+
+def get_text(url: str, timeout: float = DEFAULT_TIMEOUT) -> str:
+    """GET ``url`` through the shared session and return the body.
+
+    Raises ``requests.RequestException`` when the request ultimately fails.
+    """
+    session = get_session()
+    resp = session.get(url, timeout=timeout, headers=_conditional_headers(url))
+    if resp.status_code != 304:
+        resp.raise_for_status()
+    text = _handle_response(url, resp.status_code, resp.headers, resp.text)
+    if text is None:
+        # 304 without a cached body: ask for the full document
+        resp = session.get(url, timeout=timeout)
+        resp.raise_for_status()
+        text = _handle_response(url, resp.status_code, resp.headers, resp.text)
+    return text
+
+
+def get_json(url: str, timeout: float = DEFAULT_TIMEOUT) -> Any:
+    """GET ``url`` and decode its JSON body (see :func:`get_text`)."""
+    return json.loads(get_text(url, timeout=timeout))
+
+
+async def _get_with_retries(url: str, headers: Dict[str, str]) -> "httpx.Response":
+    """GET ``url``, retrying failed connections and 429/5xx answers.
+
+    Read timeouts are not retried, and no retry is scheduled later than
+    :data:`DEFAULT_TIMEOUT` seconds after the first attempt.
+    """
+    client = get_async_client()
+    deadline = time.monotonic() + DEFAULT_TIMEOUT
+    attempt = 0
+    while True:
+        try:
+            resp = await client.get(url, headers=headers)
+            error = None
+        except (httpx.ConnectError, httpx.ConnectTimeout) as exc:
+            resp, error = None, exc
+        if resp is not None and resp.status_code not in RETRY_STATUSES:
+            return resp
+        delay = BACKOFF_FACTOR * 2**attempt
+        if attempt >= MAX_RETRIES or time.monotonic() + delay >= deadline:
+            if error is not None:
+                raise error
+            return resp
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def get_text_async(url: str) -> str:
+    """Asynchronous variant of :func:`get_text` using the shared client.
+
+    Raises ``httpx.HTTPError`` when the request ultimately fails.
+    """
+    resp = await _get_with_retries(url, _conditional_headers(url))
+    if resp.status_code != 304:
+        resp.raise_for_status()
+    text = _handle_response(url, resp.status_code, resp.headers, resp.text)
+    if text is None:
+        resp = await _get_with_retries(url, {})
+        resp.raise_for_status()
+        text = _handle_response(url, resp.status_code, resp.headers, resp.text)
+    return text
+
+
+async def get_json_async(url: str) -> Any:
+    """Asynchronous variant of :func:`get_json`."""
+    return json.loads(await get_text_async(url))
@@ -0,0 +1,127 @@
+"""Registry of the price fetchers, imported lazily on first use.
+
+Fetcher modules pull in heavy dependencies (``yfinance``, ``pandas``...), so
+they are only imported when a request needs a fetcher for its ticker type.
+The ``fetchers`` section of ``config.yaml`` enables or disables each entry of
+:data:`FETCHERS`; changes apply to the next lookup without a restart.
+"""
+
+import importlib
+import logging
+import threading
+from typing import Dict, List, Optional, Set, Tuple, Type
+
+from config import get_fetcher_settings
+
+from .base import PriceFetcher
+
+logger = logging.getLogger(__name__)
+
+#: name -> (module, class, ticker types it supports, enabled by default)
+FETCHERS: Dict[str, Tuple[str, str, Tuple[Optional[str], ...], bool]] = {
+    "yfinance": ("fetchers.yfinance_fetcher", "YFinanceFetcher", (None, "acciones", "cedears"), True),
+    "data912": ("fetchers.data912_fetcher", "Data912Fetcher", ("bonos",), True),
+    "dolarapi": ("fetchers.dolarapi_fetcher", "DolarApiFetcher", ("monedas",), True),
+    "banco_piano": ("fetchers.banco_piano_fetcher", "BancoPianoFetcher", ("bonos",), True),
+    "dummy": ("fetchers.dummy_fetcher", "DummyFetcher", (None, "acciones", "cedears", "bonos"), False),
+}
+
+# Classes and instances by name; None once loading failed
+_classes: Dict[str, Optional[Type[PriceFetcher]]] = {}
+_instances: Dict[str, Optional[PriceFetcher]] = {}
+_lock = threading.RLock()
+# Unknown names already reported
+_unknown: Set[str] = set()
+
+
+def load_class(name: str) -> Optional[Type[PriceFetcher]]:
+    """Import and return the class of fetcher ``name``, or ``None`` if unavailable."""
+    with _lock:
+        if name not in _classes:
+            module, class_name, _, _ = FETCHERS[name]
+            try:
+                _classes[name] = getattr(importlib.import_module(module), class_name)
+            except Exception as exc:  # pragma: no cover - optional dependency
+                logger.warning("fetcher %s unavailable: %s", name, exc)
+                _classes[name] = None
+        return _classes[name]
+
+
+def get_fetcher(name: str) -> Optional[PriceFetcher]:
+    """Return the shared instance of fetcher ``name``, or ``None`` if unavailable."""
+    with _lock:
+        if name not in _instances:
+            fetcher_class = load_class(name)
+            instance = None
+            if fetcher_class is not None:
+                try:
+                    instance = fetcher_class()
+                except Exception as exc:
+                    logger.warning("fetcher %s could not start: %s", name, exc)
+            _instances[name] = instance
+        return _instances[name]
+
+
+def enabled_names() -> List[str]:
+    """Return the names of the fetchers enabled in ``config.yaml``."""
+    settings = get_fetcher_settings()
+    for name in settings:
+        if name not in FETCHERS and name not in _unknown:
+            _unknown.add(name)
+            logger.warning("unknown fetcher %r in config.yaml", name)
+    return [
+        name
+        for name, (_, _, _, default) in FETCHERS.items()
+        if settings.get(name, default)
+    ]
+
+
+def _available(names: List[str]) -> List[PriceFetcher]:
+    return [f for f in (get_fetcher(name) for name in names) if f is not None]
+
+
+def get_fetchers() -> List[PriceFetcher]:
+    """Return every enabled fetcher, importing them all.
+
+    Falls back to the dummy fetcher when none of them is available.
+    """
+    fetchers = _available(enabled_names())
+    if not fetchers:
+        dummy = get_fetcher("dummy")
+        fetchers = [dummy] if dummy is not None else []
+    return fetchers
+
+
+def fetchers_for(ticker_type: Optional[str] = None) -> List[PriceFetcher]:
+    """Return the enabled fetchers supporting ``ticker_type``.
+
+    Only the modules of those fetchers are imported. When all of them fail
+    to load, the rest are loaded too for the dummy fallback of
+    :func:`get_fetchers`.
+    """
+    names = [name for name in enabled_names() if ticker_type in FETCHERS[name][2]]
+    fetchers = _available(names)
+    if fetchers or not names:
+        return fetchers
+    return [
+        f
+        for f in get_fetchers()
+        if ticker_type in getattr(f, "supported_ticker_types", (None,))
+    ]
+
+
+def loaded() -> List[str]:
+    """Return the names of the fetchers instantiated so far."""
+    with _lock:
+        return [name for name, instance in _instances.items() if instance is not None]
+
+
+__all__ = [
+    "FETCHERS",
+    "enabled_names",
+    "fetchers_for",
+    "get_fetcher",
+    "get_fetchers",
+    "load_class",
+    "loaded",
+]
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+#: symbol -> price, ``None`` for listed symbols without a price
+Board = Dict[str, Optional[float]]
+
+
+class BoardSnapshot:
+    """Time-limited cache of a whole market board.
+
+    Some sources only publish the full board (every bond, every currency) in
+    a single response. ``BoardSnapshot`` downloads it at most once per
+    ``ttl`` seconds through ``loader``, which must return a ``symbol ->
+    price`` mapping (or ``None`` on failure); listed symbols without a price
+    may map to ``None``. Concurrent callers wait for a
+    single download instead of issuing their own.
+
+    Failed downloads produce an empty board that is retried after
+    ``retry_after`` seconds, so an outage never keeps serving old prices.
+
+    ``async_loader`` is the coroutine counterpart of ``loader`` used by
+    :meth:`get_async`. Both share a single download at a time, and the event
+    loop never waits on a download made by a thread.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Optional[Board]],
+        ttl: float = 60.0,
+        retry_after: float = 5.0,
+        async_loader: Optional[Callable[[], Awaitable[Optional[Board]]]] = None,
+    ) -> None:
+        self._loader = loader
+        self._async_loader = async_loader
+        self._async_lock: Optional[asyncio.Lock] = None
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._board: Board = {}
+        self._expires = 0.0
+        # Guards the board and its expiry; only held briefly
+        self._lock = threading.Lock()
+        # Held for the whole download, by sync and async callers alike
+        self._load_lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+
+    def _fresh(self) -> Optional[Board]:
+        """Return the board if it has not expired, else ``None``."""
+        with self._lock:
+            if time.monotonic() < self._expires:
+                return self._board
+        return None
+
+    def _store(self, board: Optional[Board]) -> Board:
+        with self._lock:
+            now = time.monotonic()
+            if board is None:
+                self._board = {}
+                self._expires = now + self.retry_after
+                self.loaded_at = None
+            else:
+                self._board = board
+                self._expires = now + self.ttl
+                self.loaded_at = time.time()
+            return self._board
+
+    def get(self) -> Board:
+        """Return the current board, downloading it again if expired."""
+        board = self._fresh()
+        if board is not None:
+            return board
+        with self._load_lock:
+            board = self._fresh()
+            if board is not None:
+                return board
+            try:
+                board = self._loader()
+            except Exception as exc:  # noqa: BLE001
+                logger.debug("Board download failed: %s", exc)
+                board = None
+            return self._store(board)
+
+    async def get_async(self) -> Board:
+        """Asynchronous variant of :meth:`get`.
+
+        Falls back to running ``loader`` in a worker thread when no
+        ``async_loader`` was given.
+        """
+        board = self._fresh()
+        if board is not None:
+            return board
+        if self._async_loader is None:
+            return await asyncio.to_thread(self.get)
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            board = self._fresh()
+            if board is not None:
+                return board
+            # A thread is downloading: wait for its board off the event loop
+            if not self._load_lock.acquire(blocking=False):
+                return await asyncio.to_thread(self.get)
+            try:
+                try:
+                    board = await self._async_loader()
+                except Exception as exc:  # noqa: BLE001
+                    logger.debug("Board download failed: %s", exc)
+                    board = None
+                return self._store(board)
+            finally:
+                self._load_lock.release()
+
+    def invalidate(self) -> None:
+        """Force the next :meth:`get` to download the board again."""
+        with self._lock:
+            self._expires = 0.0
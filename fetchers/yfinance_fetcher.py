@@ -1,11 +1,73 @@
-from datetime import date
-from typing import List, Optional, Tuple
+import threading
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+from typing import Any, ContextManager, Dict, Iterable, List, Optional, Tuple
 import warnings
 import yfinance as yf
 
-from .base import PriceFetcher
+from .base import PriceFetcher, TickerNotFound
 from storage import historical
 
+HistoryRow = Tuple[str, date, float, float, int]
+
+
+def _download_shares_state() -> bool:
+    """Whether ``yf.download`` keeps its results in module-global state."""
+    try:
+        from yfinance import multi
+    except Exception:  # pragma: no cover - unknown layout, assume the worst
+        return True
+    # Newer releases give each call its own context object
+    return not hasattr(multi, "_DownloadCtx")
+
+
+# Older ``yf.download`` releases collect results in module-global state reset
+# on each call, so concurrent downloads lose each other's data or wait
+# forever: those calls are serialized. Newer releases run them concurrently,
+# so price refreshes do not wait behind long history downloads
+_download_lock: ContextManager[Any] = (
+    threading.Lock() if _download_shares_state() else nullcontext()
+)
+
+
+def _frame_to_rows(ticker: str, frame) -> List[HistoryRow]:
+    """Convert a yfinance history frame into storage rows, column-wise.
+
+    Days without a close price are dropped; a missing adjusted close falls
+    back to the close and a missing volume to ``0``.
+    """
+    if frame is None or frame.empty or "Close" not in frame:
+        return []
+    frame = frame[frame["Close"].notna()]
+    close = frame["Close"].astype(float)
+    if "Adj Close" in frame:
+        adj_close = frame["Adj Close"].astype(float).fillna(close)
+    else:
+        adj_close = close
+    if "Volume" in frame:
+        volume = frame["Volume"].fillna(0).astype("int64").tolist()
+    else:
+        volume = [0] * len(frame)
+    symbol = ticker.upper()
+    return [
+        (symbol, d, price, adj, vol)
+        for d, price, adj, vol in zip(
+            frame.index.date, close.tolist(), adj_close.tolist(), volume
+        )
+    ]
+
+
+def _add_coverage(tickers: Iterable[str], start: date, end: date) -> None:
+    """Mark the closed days of ``[start, end]`` as downloaded for ``tickers``.
+
+    Today's bar may still change, so coverage stops at yesterday (UTC).
+    """
+    end = min(end, datetime.utcnow().date() - timedelta(days=1))
+    if start > end:
+        return
+    for ticker in tickers:
+        historical.add_coverage(ticker, start, end)
+
 
 class YFinanceFetcher(PriceFetcher):
     """Fetch prices using yfinance."""
@@ -13,43 +75,143 @@ class YFinanceFetcher(PriceFetcher):
     #: Admite acciones, CEDEARs y consultas sin tipo especificado
     supported_ticker_types = (None, "acciones", "cedears")
 
-    def get_price(self, ticker: str, ticker_type: Optional[str] = None) -> Optional[float]:
+    supports_history = True
+
+    supports_batch = True
+
+    @staticmethod
+    def _symbol(ticker: str, ticker_type: Optional[str]) -> str:
+        """Return the Yahoo symbol of ``ticker`` (``.BA`` for BYMA listings)."""
         if ticker_type in {"acciones", "cedears"}:
-            ticker = f"{ticker}.BA"
-        elif ticker_type not in {None, "acciones", "cedears"}:
+            return f"{ticker}.BA"
+        return ticker
+
+    def get_prices(
+        self, tickers: Iterable[str], ticker_type: Optional[str] = None
+    ) -> Dict[str, float]:
+        """Return the last price of several ``tickers`` with one download.
+
+        Reads the close of the current daily bar from the chart data of
+        ``yf.download``, much lighter than the ``info`` metadata, for every
+        symbol at once. Tickers without data are omitted.
+        """
+        if ticker_type not in self.supported_ticker_types:
+            return {}
+        symbols = {self._symbol(t.upper(), ticker_type): t.upper() for t in tickers}
+        if not symbols:
+            return {}
+        try:
+            with _download_lock:
+                frame = yf.download(
+                    list(symbols),
+                    period="5d",
+                    interval="1d",
+                    group_by="ticker",
+                    auto_adjust=False,
+                    threads=True,
+                    progress=False,
+                )
+        except Exception:
+            return {}
+        if frame is None or frame.empty:
+            return {}
+
+        prices: Dict[str, float] = {}
+        multi = frame.columns.nlevels > 1
+        for symbol, ticker in symbols.items():
+            if multi:
+                if symbol not in frame.columns.get_level_values(0):
+                    continue
+                sub = frame[symbol]
+            else:
+                sub = frame
+            if "Close" not in sub:
+                continue
+            close = sub["Close"].dropna()
+            if not close.empty:
+                prices[ticker] = float(close.iloc[-1])
+        return prices
+
+    def get_price(self, ticker: str, ticker_type: Optional[str] = None) -> Optional[float]:
+        if ticker_type not in self.supported_ticker_types:
             # Unsupported ticker type
             return None
+        price = self.get_prices([ticker], ticker_type).get(ticker.upper())
+        if price is not None:
+            return price
 
+        # Without chart data, the metadata tells unknown symbols apart
         try:
-            data = yf.Ticker(ticker)
-            price = data.info.get("regularMarketPrice")
-            return float(price) if price is not None else None
+            info = yf.Ticker(self._symbol(ticker, ticker_type)).info
         except Exception:
             return None
+        # Yahoo answers unknown symbols with an almost empty ``info``
+        if not info or "quoteType" not in info:
+            raise TickerNotFound(ticker)
+        price = info.get("regularMarketPrice")
+        return float(price) if price is not None else None
 
     def get_history(self, ticker: str, start: date, end: date) -> List[Tuple[date, float]]:
         """Retrieve and store historical prices for ``ticker`` from yfinance."""
 
         try:
-            history_df = yf.Ticker(ticker).history(start=start, end=end)
+            # yfinance treats ``end`` as exclusive
+            history_df = yf.Ticker(ticker).history(
+                start=start, end=end + timedelta(days=1)
+            )
         except Exception:
             warnings.warn("yfinance request for historical data failed", stacklevel=2)
             return []
 
-        results: List[Tuple[date, float]] = []
-        for idx, row in history_df.iterrows():
-            d = idx.date()
-            price = float(row.get("Close", float("nan")))
-            if price != price:  # NaN check
-                continue
-            adj_price = row.get("Adj Close")
-            volume = row.get("Volume")
-            historical.insert_record(
-                ticker,
-                d,
-                price,
-                float(adj_price) if adj_price == adj_price else price,
-                int(volume) if volume == volume else 0,
-            )
-            results.append((d, price))
+        rows = _frame_to_rows(ticker, history_df)
+        historical.insert_records(rows)
+        # An empty answer may be an upstream failure: only mark answered ranges
+        if rows:
+            _add_coverage([ticker], start, end)
+        return [(d, price) for _, d, price, _, _ in rows]
+
+    def get_histories(
+        self, tickers: Iterable[str], start: date, end: date
+    ) -> Dict[str, List[Tuple[date, float]]]:
+        """Retrieve and store historical prices for several tickers at once.
+
+        All symbols are requested with a single ``yf.download`` call and the
+        rows of every ticker are stored in one transaction. The result is
+        keyed by the upper-cased ticker, as ``yf.download`` names its columns.
+        """
+        symbols = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+        if not symbols:
+            return {}
+        try:
+            with _download_lock:
+                frame = yf.download(
+                    symbols,
+                    start=start,
+                    end=end + timedelta(days=1),
+                    group_by="ticker",
+                    auto_adjust=True,
+                    threads=True,
+                    progress=False,
+                )
+        except Exception:
+            warnings.warn("yfinance request for historical data failed", stacklevel=2)
+            return {}
+
+        rows: List[HistoryRow] = []
+        results: Dict[str, List[Tuple[date, float]]] = {}
+        multi = frame.columns.nlevels > 1
+        for symbol in symbols:
+            if multi:
+                if symbol not in frame.columns.get_level_values(0):
+                    results[symbol] = []
+                    continue
+                sub = frame[symbol]
+            else:
+                sub = frame
+            ticker_rows = _frame_to_rows(symbol, sub)
+            rows.extend(ticker_rows)
+            results[symbol] = [(d, price) for _, d, price, _, _ in ticker_rows]
+
+        historical.insert_records(rows)
+        _add_coverage([symbol for symbol, found in results.items() if found], start, end)
         return results
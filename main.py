@@ -1,57 +1,266 @@
-"""Minimal entry point for pymrkt."""
+"""Minimal entry point for pymrkt.
+
+Refreshes every ticker stored in the live databases, suitable for running
+from cron::
+
+    */15 * * * * cd /home/pi/pymrkt && python main.py --quiet
+"""
 
 import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
-from api import get_live_price
-from config import get_lock_minutes
-from fetchers import (
-    BancoPianoFetcher,
-    Data912Fetcher,
-    DolarApiFetcher,
-    DummyFetcher,
-    YFinanceFetcher,
-)
-from scripts import init_db
+from api.live import DEFAULT_MAX_WORKERS, get_live_prices, health, is_stale
+from config import get_storage_settings
+from fetchers import PriceFetcher, registry
+from storage import connection, historical
 from storage import live as live_db
+from storage import ticks as ticks_db
 
+#: Tickers refreshed per call to ``get_live_prices`` when every fetcher of
+#: the group prices them in a single request; the global deadline is checked
+#: between chunks
+CHUNK_SIZE = 50
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Run pymrkt")
-    parser.add_argument("--debug", action="store_true", help="Enable debug output")
-    args = parser.parse_args()
+Result = Optional[Tuple[float, datetime]]
+
+
+def configure_storage() -> None:
+    """Apply the storage settings; tables are created on first use."""
+    settings = get_storage_settings()
+    connection.configure(
+        settings["backend"], dsn=settings["postgres_dsn"], pool_size=settings["pool_size"]
+    )
+    live_db.SINGLE_DB = settings["single_db"]
+    live_db.COMPACT_TIMESTAMPS = historical.COMPACT_DATES = settings["compact_dates"]
+
+
+def build_fetchers(
+    tickers: Optional[List[Tuple[Optional[str], str]]] = None
+) -> List[PriceFetcher]:
+    """Return the enabled fetchers able to price ``tickers``.
 
-    init_db.main()
-    fetchers = []
-    try:
-        fetchers.append(YFinanceFetcher())
-    except Exception:
-        pass
-    try:
-        fetchers.append(Data912Fetcher())
-    except Exception:
-        pass
-    try:
-        fetchers.append(DolarApiFetcher())
-    except Exception:
-        pass
-    try:
-        fetchers.append(BancoPianoFetcher())
-    except Exception:
-        pass
-    if not fetchers:
-        fetchers.append(DummyFetcher())
-    lock_minutes = get_lock_minutes()
-
-    tickers = live_db.list_tickers()
-    for ticker in tickers:
-        result = get_live_price(
-            ticker, fetchers, lock_minutes=lock_minutes, debug=args.debug
+    Only the fetchers of the ticker types in ``(ticker_type, ticker)`` pairs
+    are imported; without ``tickers`` every enabled fetcher is (see
+    :mod:`fetchers.registry`).
+    """
+    if tickers is None:
+        return registry.get_fetchers()
+    fetchers: List[PriceFetcher] = []
+    for ticker_type in dict.fromkeys(ticker_type for ticker_type, _ in tickers):
+        for fetcher in registry.fetchers_for(ticker_type):
+            if fetcher not in fetchers:
+                fetchers.append(fetcher)
+    return fetchers
+
+
+def group_by_fetchers(
+    tickers: List[Tuple[Optional[str], str]], fetchers: List[PriceFetcher]
+) -> Dict[Tuple[str, ...], List[Tuple[Optional[str], str]]]:
+    """Group ``(ticker_type, ticker)`` pairs by the fetchers able to price them.
+
+    Tickers no fetcher supports are grouped under an empty key.
+    """
+    groups: Dict[Tuple[str, ...], List[Tuple[Optional[str], str]]] = {}
+    for ticker_type, ticker in tickers:
+        names = tuple(
+            f.__class__.__name__
+            for f in fetchers
+            if ticker_type in getattr(f, "supported_ticker_types", (None,))
         )
+        groups.setdefault(names, []).append((ticker_type, ticker))
+    return groups
+
+
+def _refresh_group(
+    pairs: List[Tuple[Optional[str], str]],
+    fetchers: List[PriceFetcher],
+    end: float,
+    lock_minutes: Optional[int],
+    max_workers: int,
+    debug: bool,
+) -> Dict[Tuple[Optional[str], str], Result]:
+    """Refresh ``pairs`` chunk by chunk until done or past ``end``.
+
+    Fetchers queried per ticker only wait until ``end``, so with any of them
+    in the group a chunk is one round of ``max_workers`` tickers. Pairs left
+    when the deadline passes are not in the result.
+    """
+    batched = all(getattr(f, "supports_batch", False) for f in fetchers)
+    size = CHUNK_SIZE if batched else max(1, max_workers)
+    by_type: Dict[Optional[str], List[str]] = {}
+    for ticker_type, ticker in pairs:
+        by_type.setdefault(ticker_type, []).append(ticker)
+    results: Dict[Tuple[Optional[str], str], Result] = {}
+    for ticker_type, tickers in by_type.items():
+        for i in range(0, len(tickers), size):
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return results
+            chunk = get_live_prices(
+                tickers[i : i + size],
+                fetchers,
+                lock_minutes=lock_minutes,
+                debug=debug,
+                ticker_type=ticker_type,
+                max_workers=max_workers,
+                deadline=remaining,
+            )
+            results.update(((ticker_type, ticker), result) for ticker, result in chunk.items())
+    return results
+
+
+def refresh_all(
+    fetchers: List[PriceFetcher],
+    deadline: float,
+    tickers: Optional[List[Tuple[Optional[str], str]]] = None,
+    lock_minutes: Optional[int] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    debug: bool = False,
+) -> Dict[Tuple[Optional[str], str], Result]:
+    """Refresh ``tickers`` within ``deadline`` seconds.
+
+    ``tickers`` are ``(ticker_type, ticker)`` pairs and default to every
+    ticker of every live database.
+
+    Each group of tickers sharing the same fetchers is refreshed in its own
+    thread, with at most ``max_workers`` fetcher calls at once per group.
+    No chunk starts after the deadline and fetchers are not waited for past
+    it; tickers never reached are reported with a missing key. Prices
+    within their lock window are not fetched unless ``lock_minutes`` is
+    ``0``.
+    """
+    end = time.monotonic() + deadline
+    if tickers is None:
+        tickers = live_db.list_all_tickers()
+    groups = group_by_fetchers(tickers, fetchers)
+    results: Dict[Tuple[Optional[str], str], Result] = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(groups))) as pool:
+        futures = [
+            pool.submit(
+                _refresh_group,
+                pairs,
+                [f for f in fetchers if f.__class__.__name__ in names],
+                end,
+                lock_minutes,
+                max_workers,
+                debug,
+            )
+            for names, pairs in groups.items()
+        ]
+        for future in futures:
+            results.update(future.result())
+    return results
+
+
+def summarize(
+    tickers: List[Tuple[Optional[str], str]],
+    results: Dict[Tuple[Optional[str], str], Result],
+    started: datetime,
+    lock_minutes: Optional[int] = None,
+) -> Dict[str, List[Tuple[Optional[str], str]]]:
+    """Classify ``tickers`` by the outcome of a run started at ``started``.
+
+    ``stale`` tickers kept an expired price because every fetcher failed and
+    ``skipped`` ones were not reached before the deadline.
+    """
+    outcome: Dict[str, List[Tuple[Optional[str], str]]] = {
+        "refreshed": [],
+        "fresh": [],
+        "stale": [],
+        "missing": [],
+        "skipped": [],
+    }
+    for ticker_type, ticker in tickers:
+        pair = (ticker_type, ticker)
+        if pair not in results:
+            outcome["skipped"].append(pair)
+            continue
+        result = results[pair]
         if result is None:
-            print(ticker, "N/A")
+            outcome["missing"].append(pair)
+        elif result[1] >= started:
+            outcome["refreshed"].append(pair)
+        elif is_stale(result[1], ticker, ticker_type, lock_minutes):
+            outcome["stale"].append(pair)
         else:
-            price, updated_at = result
-            print(ticker, price, updated_at.isoformat() + "Z")
+            outcome["fresh"].append(pair)
+    return outcome
+
+
+def print_summary(
+    outcome: Dict[str, List[Tuple[Optional[str], str]]], elapsed: float
+) -> None:
+    """Print throughput, per-source latency and failures of a refresh run."""
+    total = sum(len(pairs) for pairs in outcome.values())
+    done = total - len(outcome["skipped"])
+    print(
+        f"{total} tickers en {elapsed:.1f} s ({done / elapsed if elapsed else 0.0:.1f} tickers/s): "
+        f"{len(outcome['refreshed'])} actualizados, {len(outcome['fresh'])} vigentes, "
+        f"{len(outcome['stale'])} vencidos, {len(outcome['missing'])} sin precio, "
+        f"{len(outcome['skipped'])} sin procesar (deadline)"
+    )
+    for name, stats in sorted(health.stats().items()):
+        print(
+            f"  {name}: latencia {stats['latency_ms']} ms, errores {stats['error_rate']:.0%} "
+            f"(últimas {stats['calls']} llamadas){', circuito abierto' if stats['open'] else ''}"
+        )
+    for key, label in (("stale", "Vencidos"), ("missing", "Sin precio"), ("skipped", "Sin procesar")):
+        if outcome[key]:
+            print(f"{label}: " + ", ".join(f"{t}:{s}" if t else s for t, s in outcome[key]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Refresh every stored live price")
+    parser.add_argument("--debug", action="store_true", help="Enable debug output")
+    parser.add_argument(
+        "--force", action="store_true", help="Refresh prices still within their lock window"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="Concurrent fetcher calls per group of sources",
+    )
+    parser.add_argument(
+        "--deadline", type=float, default=120.0, help="Seconds for the whole run"
+    )
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    args = parser.parse_args()
+
+    configure_storage()
+    tickers = live_db.list_all_tickers()
+    fetchers = build_fetchers(tickers)
+
+    lock_minutes = 0 if args.force else None
+    started = datetime.utcnow().replace(microsecond=0)
+    start = time.monotonic()
+    results = refresh_all(
+        fetchers,
+        args.deadline,
+        tickers,
+        lock_minutes=lock_minutes,
+        max_workers=args.workers,
+        debug=args.debug,
+    )
+    elapsed = time.monotonic() - start
+    ticks_db.flush()
+
+    if not args.quiet:
+        for ticker_type, ticker in tickers:
+            result = results.get((ticker_type, ticker))
+            if result is None:
+                print(ticker, "N/A")
+            else:
+                price, updated_at = result
+                print(ticker, price, updated_at.isoformat() + "Z")
+    outcome = summarize(tickers, results, started, lock_minutes)
+    print_summary(outcome, elapsed)
+    # Non-zero exit status so cron reports incomplete runs
+    sys.exit(1 if outcome["stale"] or outcome["missing"] or outcome["skipped"] else 0)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,5 @@
+"""Background tasks that keep the live store fresh."""
+
+from .refresh import create_scheduler, refresh_source, source_fetchers
+
+__all__ = ["create_scheduler", "refresh_source", "source_fetchers"]
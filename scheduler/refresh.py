@@ -0,0 +1,128 @@
+"""Periodic refresh-ahead of the tickers configured in ``sources``."""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import get_lock_minutes, get_scheduler_settings, get_sources
+
+from api.live import get_live_prices
+from fetchers import PriceFetcher, registry
+from storage import ticks
+
+try:
+    from apscheduler.schedulers.background import BackgroundScheduler
+except Exception:  # pragma: no cover - optional dependency
+    BackgroundScheduler = None
+
+logger = logging.getLogger(__name__)
+
+
+def source_fetchers(source: Dict[str, Any]) -> List[PriceFetcher]:
+    """Return the fetchers polled for ``source``.
+
+    A ``name`` listed in :data:`fetchers.registry.FETCHERS` restricts the
+    source to that fetcher, if enabled; any other name polls every enabled
+    fetcher supporting its ticker type.
+    """
+    name = source["name"]
+    if name not in registry.FETCHERS:
+        return registry.fetchers_for(source["ticker_type"])
+    fetcher = registry.get_fetcher(name) if name in registry.enabled_names() else None
+    return [] if fetcher is None else [fetcher]
+
+
+def refresh_source(
+    source: Dict[str, Any],
+    fetchers: Optional[Iterable[PriceFetcher]] = None,
+    lock_minutes: Optional[int] = None,
+    refresh_ahead_minutes: int = 1,
+) -> Dict[str, Any]:
+    """Refresh the tickers of ``source`` that would expire before its next run.
+
+    A ticker is refreshed when its stored price is older than
+    ``lock_minutes - interval_minutes - refresh_ahead_minutes``, so requests
+    made between two runs always find a price inside the lock window.
+    ``lock_minutes`` defaults to the window configured for each ticker and
+    ``fetchers`` to :func:`source_fetchers`. Returns the source name and the
+    tickers that still have no price.
+    """
+    if fetchers is None:
+        fetchers = source_fetchers(source)
+        if not fetchers:
+            logger.warning("%s: fetcher disabled or unavailable", source["name"])
+            return {"source": source["name"], "missing": []}
+    by_threshold: Dict[int, List[str]] = {}
+    for ticker in source["tickers"]:
+        lock = lock_minutes
+        if lock is None:
+            lock = get_lock_minutes(source["ticker_type"], ticker)
+        threshold = max(0, lock - source["interval_minutes"] - refresh_ahead_minutes)
+        by_threshold.setdefault(threshold, []).append(ticker)
+    missing = []
+    for threshold, tickers in by_threshold.items():
+        results = get_live_prices(
+            tickers,
+            fetchers,
+            lock_minutes=threshold,
+            ticker_type=source["ticker_type"],
+        )
+        missing.extend(ticker for ticker, result in results.items() if result is None)
+    if missing:
+        logger.warning("%s: no price for %s", source["name"], ", ".join(missing))
+    return {"source": source["name"], "missing": missing}
+
+
+def create_scheduler(
+    fetchers: Optional[List[PriceFetcher]] = None,
+    sources: Optional[List[Dict[str, Any]]] = None,
+) -> "BackgroundScheduler":
+    """Return a (not yet started) scheduler with one job per source.
+
+    ``sources`` defaults to the enabled entries in ``config/config.yaml``
+    and ``fetchers`` to the ones each source needs (see
+    :func:`source_fetchers`), resolved on every run.
+    Each job runs every ``interval_minutes`` of its source and once right
+    after start-up. Two more jobs write buffered ticks every
+    ``ticks.FLUSH_SECONDS`` and compact old ticks daily.
+    """
+    if BackgroundScheduler is None:
+        raise RuntimeError("APScheduler is required to run the scheduler")
+    if sources is None:
+        sources = get_sources()
+    settings = get_scheduler_settings()
+
+    scheduler = BackgroundScheduler()
+    for index, source in enumerate(sources):
+        if not source["tickers"]:
+            continue
+        scheduler.add_job(
+            refresh_source,
+            "interval",
+            minutes=source["interval_minutes"],
+            args=(source, fetchers),
+            kwargs={"refresh_ahead_minutes": settings["refresh_ahead_minutes"]},
+            id=f"refresh:{index}:{source['name']}",
+            next_run_time=datetime.now(),
+            max_instances=1,
+            coalesce=True,
+        )
+    if ticks.ENABLED:
+        scheduler.add_job(
+            ticks.flush,
+            "interval",
+            seconds=ticks.FLUSH_SECONDS,
+            id="ticks:flush",
+            max_instances=1,
+            coalesce=True,
+        )
+        scheduler.add_job(
+            ticks.compact,
+            "interval",
+            hours=24,
+            id="ticks:compact",
+            next_run_time=datetime.now(),
+            max_instances=1,
+            coalesce=True,
+        )
+    return scheduler
@@ -0,0 +1,110 @@
+"""Benchmark the import cost of the pymrkt modules.
+
+Each module is imported in a fresh interpreter with ``-X importtime``, so
+nothing is shared between measurements::
+
+    python scripts/bench_startup.py
+    python scripts/bench_startup.py --runs 10 --top 5
+    python scripts/bench_startup.py api.server fetchers.yfinance_fetcher
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Set, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "config",
+    "storage.live",
+    "storage.historical",
+    "fetchers",
+    "fetchers.registry",
+    "fetchers.dolarapi_fetcher",
+    "fetchers.data912_fetcher",
+    "fetchers.banco_piano_fetcher",
+    "fetchers.yfinance_fetcher",
+    "api.live",
+    "api.history",
+    "scheduler",
+    "api.server",
+    "main",
+]
+
+#: Top-level packages of this project; the others are dependencies
+PROJECT = {"api", "config", "fetchers", "main", "scheduler", "scripts", "storage"}
+
+# import time: self [us] | cumulative | imported package
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _importtime(code: str) -> List[Tuple[int, int, str]]:
+    """Run ``code`` in a fresh interpreter; return ``(depth, cumulative us, name)``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    result = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            depth = (len(match.group(3)) - 1) // 2
+            result.append((depth, int(match.group(2)), match.group(4)))
+    return result
+
+
+def _import_once(module: str, startup: Set[str]) -> Tuple[int, Dict[str, int]]:
+    """Return the import time of ``module`` and of each dependency package.
+
+    Modules already imported by the interpreter start-up (``startup``) are
+    not counted. Times are cumulative, in microseconds.
+    """
+    total = 0
+    deps: Dict[str, int] = {}
+    for depth, cumulative, name in _importtime(f"import {module}"):
+        if depth == 0 and name not in startup:
+            total += cumulative
+        if name not in startup and "." not in name and name not in PROJECT:
+            deps[name] = max(deps.get(name, 0), cumulative)
+    return total, deps
+
+
+def bench(modules: List[str], runs: int, top: int) -> None:
+    startup = {name for _, _, name in _importtime("pass")}
+    print(f"median of {runs} runs, cumulative import time")
+    for module in modules:
+        try:
+            samples = [_import_once(module, startup) for _ in range(runs)]
+        except RuntimeError as exc:
+            print(f"  {module:<30} failed: {exc}")
+            continue
+        total = statistics.median(t for t, _ in samples)
+        print(f"  {module:<30} {total / 1000:>9.1f} ms")
+        names = {name for _, deps in samples for name in deps}
+        heaviest = sorted(
+            ((statistics.median(deps.get(name, 0) for _, deps in samples), name) for name in names),
+            reverse=True,
+        )[:top]
+        for cost, name in heaviest:
+            print(f"      {name:<26} {cost / 1000:>9.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=MODULES, help="Modules to import")
+    parser.add_argument("--runs", type=int, default=5, help="Imports per module")
+    parser.add_argument("--top", type=int, default=3, help="Heaviest dependencies shown")
+    args = parser.parse_args()
+    bench(args.modules, max(1, args.runs), args.top)
+
+
+if __name__ == "__main__":
+    main()
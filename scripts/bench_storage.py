@@ -0,0 +1,392 @@
+"""Benchmark the storage layer.
+
+Runs against temporary databases, so existing data is never touched::
+
+    python scripts/bench_storage.py live --ops 5000
+    python scripts/bench_storage.py history --rows 1000000
+    python scripts/bench_storage.py columnar --rows 1000000
+    python scripts/bench_storage.py timestamps --rows 1000000
+    python scripts/bench_storage.py ticks --tickers 1000 --minutes 390
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Iterator, List, Tuple, Union
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from storage import connection, historical, live, ticks, timestamps
+
+
+def _rate(label: str, ops: int, fn: Callable[[], None]) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    rate = ops / elapsed if elapsed else float("inf")
+    print(f"  {label:<28} {rate:>12,.0f} ops/s  ({elapsed:.3f}s)")
+    return rate
+
+
+def _connect_per_call_upsert(db_file: Path, ticker: str, price: float) -> None:
+    """Write path used before the shared connections: connect, commit, close."""
+    conn = sqlite3.connect(db_file)
+    conn.execute(
+        """
+        INSERT INTO prices (ticker, price, updated_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT(ticker) DO UPDATE SET price=excluded.price, updated_at=excluded.updated_at
+        """,
+        (ticker, price, datetime.utcnow().isoformat()),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _connect_per_call_get(db_file: Path, ticker: str) -> None:
+    """Read path used before the shared connections."""
+    conn = sqlite3.connect(db_file)
+    row = conn.execute(
+        "SELECT price, updated_at FROM prices WHERE ticker = ?", (ticker,)
+    ).fetchone()
+    conn.close()
+    if row:
+        datetime.fromisoformat(row[1])
+
+
+def bench_live(ops: int, tickers: int) -> None:
+    symbols = [f"T{i:05d}" for i in range(tickers)]
+    with tempfile.TemporaryDirectory() as tmp:
+        before = Path(tmp) / "before.db"
+        conn = sqlite3.connect(before)
+        conn.execute(
+            "CREATE TABLE prices (ticker TEXT PRIMARY KEY, price REAL NOT NULL, updated_at TEXT NOT NULL)"
+        )
+        conn.commit()
+        conn.close()
+        print("before (connection per call, rollback journal):")
+        _rate(
+            "upsert_price",
+            ops,
+            lambda: [
+                _connect_per_call_upsert(before, symbols[i % tickers], float(i))
+                for i in range(ops)
+            ],
+        )
+        _rate(
+            "get_price",
+            ops,
+            lambda: [_connect_per_call_get(before, symbols[i % tickers]) for i in range(ops)],
+        )
+
+        after = Path(tmp) / "after.db"
+        live._init_table(after)
+        print("after (shared connection, WAL):")
+        _rate(
+            "upsert_price",
+            ops,
+            lambda: [
+                live.upsert_price(symbols[i % tickers], float(i), db_file=after)
+                for i in range(ops)
+            ],
+        )
+        # One transaction per full board of ``tickers`` rows
+        boards = max(1, ops // tickers)
+        _rate(
+            "upsert_prices (bulk)",
+            boards * tickers,
+            lambda: [
+                live.upsert_prices(
+                    ((symbol, float(b), None) for symbol in symbols), db_file=after
+                )
+                for b in range(boards)
+            ],
+        )
+        # Measure disk reads, not the in-memory cache
+        _rate(
+            "get_price (uncached)",
+            ops,
+            lambda: [
+                (live.clear_cache(), live.get_price(symbols[i % tickers], db_file=after))
+                for i in range(ops)
+            ],
+        )
+        _rate(
+            "get_price (cached)",
+            ops,
+            lambda: [live.get_price(symbols[i % tickers], db_file=after) for i in range(ops)],
+        )
+        connection.close_connections()
+
+
+def _history_rows(
+    rows: int, tickers: int, compact: bool = False
+) -> Iterator[Tuple[str, Union[int, str], float, float, int]]:
+    """Yield ``rows`` synthetic daily records spread over ``tickers`` symbols.
+
+    Days are ISO strings, or day numbers when ``compact`` is set.
+    """
+    days = max(1, rows // tickers)
+    first = date(2000, 1, 1)
+    for t in range(tickers):
+        symbol = f"T{t:05d}"
+        for d in range(days):
+            price = 100.0 + d * 0.01
+            day = first + timedelta(days=d)
+            yield symbol, timestamps.to_day_number(day) if compact else day.isoformat(), price, price, 1000
+
+
+def _range_queries(queries: int, tickers: int, days: int) -> List[Tuple[str, date, date]]:
+    rng = random.Random(0)
+    first = date(2000, 1, 1)
+    result = []
+    for _ in range(queries):
+        start = rng.randrange(max(1, days - 250))
+        result.append(
+            (
+                f"T{rng.randrange(tickers):05d}",
+                first + timedelta(days=start),
+                first + timedelta(days=start + 250),
+            )
+        )
+    return result
+
+
+def bench_history(rows: int, tickers: int, queries: int) -> None:
+    days = max(1, rows // tickers)
+    ranges = _range_queries(queries, tickers, days)
+    with tempfile.TemporaryDirectory() as tmp:
+        before = Path(tmp) / "before.db"
+        conn = sqlite3.connect(before)
+        conn.execute(
+            """
+            CREATE TABLE history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ticker TEXT NOT NULL,
+                date TEXT NOT NULL,
+                price REAL NOT NULL,
+                adj_price REAL,
+                volume INTEGER
+            )
+            """
+        )
+        conn.executemany(
+            "INSERT INTO history (ticker, date, price, adj_price, volume) VALUES (?, ?, ?, ?, ?)",
+            _history_rows(rows, tickers),
+        )
+        conn.commit()
+        print(f"before (no index, {rows:,} rows):")
+
+        def legacy_queries() -> None:
+            for ticker, start, end in ranges:
+                conn.execute(
+                    """
+                    SELECT date, price, adj_price, volume
+                    FROM history
+                    WHERE ticker = ? AND date BETWEEN ? AND ?
+                    ORDER BY date ASC
+                    """,
+                    (ticker, start.isoformat(), end.isoformat()),
+                ).fetchall()
+
+        _rate("range query (250 days)", queries, legacy_queries)
+        conn.close()
+
+        historical.DB_FILE = Path(tmp) / "after.db"
+        historical.init_db()
+        with connection.transaction(historical.DB_FILE) as conn:
+            conn.executemany(
+                "INSERT INTO history (ticker, date, price, adj_price, volume) VALUES (?, ?, ?, ?, ?)",
+                _history_rows(rows, tickers, historical.COMPACT_DATES),
+            )
+        print(f"after ((ticker, date) primary key, WITHOUT ROWID, {rows:,} rows):")
+        _rate(
+            "range query (250 days)",
+            queries,
+            lambda: [historical.get_history(t, s, e) for t, s, e in ranges],
+        )
+        # Closing checkpoints the WAL, so the sizes include every row
+        connection.close_connections()
+        for label, path in (("before", before), ("after", historical.DB_FILE)):
+            print(f"  {label} size: {path.stat().st_size / 1e6:.1f} MB")
+
+
+def bench_columnar(rows: int, tickers: int, queries: int) -> None:
+    # Imported here so the other benchmarks do not need the fetcher deps
+    from api import history as history_api
+
+    days = max(1, rows // tickers)
+    ranges = _range_queries(queries, tickers, days)
+    with tempfile.TemporaryDirectory() as tmp:
+        historical.DB_FILE = Path(tmp) / "history.db"
+        historical.init_db()
+        with connection.transaction(historical.DB_FILE) as conn:
+            conn.executemany(
+                "INSERT INTO history (ticker, date, price, adj_price, volume) VALUES (?, ?, ?, ?, ?)",
+                _history_rows(rows, tickers, historical.COMPACT_DATES),
+            )
+        print(f"range query + serialisation (250 days, {rows:,} rows):")
+        _rate(
+            "rows (list of dicts, JSON)",
+            queries,
+            lambda: [
+                json.dumps(history_api.get_historical_prices(t, s, e)) for t, s, e in ranges
+            ],
+        )
+        _rate(
+            "columns (NumPy arrays only)",
+            queries,
+            lambda: [historical.get_history_columns(t, s, e) for t, s, e in ranges],
+        )
+        _rate(
+            "columns (column JSON)",
+            queries,
+            lambda: [
+                json.dumps(history_api.columns_to_json(historical.get_history_columns(t, s, e)))
+                for t, s, e in ranges
+            ],
+        )
+        if history_api.arrow_available():
+            _rate(
+                "columns (Arrow IPC)",
+                queries,
+                lambda: [
+                    history_api.columns_to_arrow(historical.get_history_columns(t, s, e))
+                    for t, s, e in ranges
+                ],
+            )
+        ticker, start, end = ranges[0]
+        sizes = {
+            "rows JSON": len(json.dumps(history_api.get_historical_prices(ticker, start, end))),
+            "column JSON": len(
+                json.dumps(history_api.columns_to_json(historical.get_history_columns(ticker, start, end)))
+            ),
+        }
+        if history_api.arrow_available():
+            sizes["Arrow IPC"] = len(
+                history_api.columns_to_arrow(historical.get_history_columns(ticker, start, end))
+            )
+        for label, size in sizes.items():
+            print(f"  {label} payload: {size:,} bytes")
+        connection.close_connections()
+
+
+def bench_timestamps(rows: int, tickers: int, queries: int) -> None:
+    days = max(1, rows // tickers)
+    ranges = _range_queries(queries, tickers, days)
+    symbols = [f"T{i:05d}" for i in range(tickers)]
+    compact_dates, compact_timestamps = historical.COMPACT_DATES, live.COMPACT_TIMESTAMPS
+    with tempfile.TemporaryDirectory() as tmp:
+        for compact in (False, True):
+            historical.COMPACT_DATES = live.COMPACT_TIMESTAMPS = compact
+            layout = "integer" if compact else "ISO text"
+            historical.DB_FILE = Path(tmp) / f"history-{layout}.db"
+            historical.init_db()
+            with connection.transaction(historical.DB_FILE) as conn:
+                conn.executemany(
+                    "INSERT INTO history (ticker, date, price, adj_price, volume) VALUES (?, ?, ?, ?, ?)",
+                    _history_rows(rows, tickers, compact),
+                )
+            live_db = Path(tmp) / f"live-{layout}.db"
+            live._init_table(live_db)
+            live.upsert_prices(((s, 1.0, None) for s in symbols), db_file=live_db)
+            connection.close_connections()
+
+            print(f"{layout} dates ({rows:,} history rows, {tickers:,} live prices):")
+            _rate(
+                "get_history (250 days)",
+                queries,
+                lambda: [historical.get_history(t, s, e) for t, s, e in ranges],
+            )
+            if historical.np is not None:
+                _rate(
+                    "get_history_columns (250d)",
+                    queries,
+                    lambda: [historical.get_history_columns(t, s, e) for t, s, e in ranges],
+                )
+
+            def read_board() -> None:
+                for _ in range(queries):
+                    live.clear_cache()
+                    live.get_prices(symbols, db_file=live_db)
+
+            _rate("get_prices (uncached board)", queries * tickers, read_board)
+            connection.close_connections()
+            print(f"  history size: {historical.DB_FILE.stat().st_size / 1e6:.1f} MB")
+            print(f"  live size: {live_db.stat().st_size / 1e3:.1f} kB")
+    historical.COMPACT_DATES, live.COMPACT_TIMESTAMPS = compact_dates, compact_timestamps
+
+
+def bench_ticks(tickers: int, minutes: int) -> None:
+    symbols = [f"T{i:05d}" for i in range(tickers)]
+    first = datetime(2024, 1, 2, 13, 30)
+    with tempfile.TemporaryDirectory() as tmp:
+        ticks.DB_FILE = Path(tmp) / "ticks.db"
+        historical.DB_FILE = Path(tmp) / "history.db"
+        historical.init_db()
+        print(f"{tickers:,} tickers refreshed every minute for {minutes} minutes:")
+
+        def record() -> None:
+            for m in range(minutes):
+                ts = first + timedelta(minutes=m)
+                ticks.record_ticks((symbol, 100.0 + m, ts) for symbol in symbols)
+            ticks.flush()
+
+        _rate("record_ticks", tickers * minutes, record)
+        end = first + timedelta(minutes=minutes)
+        _rate(
+            "get_ticks (full day)",
+            min(tickers, 200),
+            lambda: [ticks.get_ticks(s, first, end) for s in symbols[:200]],
+        )
+        connection.close_connections()
+        print(f"  ticks size: {ticks.DB_FILE.stat().st_size / 1e6:.1f} MB")
+        _rate("compact into daily bars", 1, lambda: ticks.compact(0, first.date() + timedelta(days=1)))
+        connection.close_connections()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark pymrkt storage")
+    sub = parser.add_subparsers(dest="command", required=True)
+    live_parser = sub.add_parser("live", help="live price reads/writes per second")
+    live_parser.add_argument("--ops", type=int, default=2000)
+    live_parser.add_argument("--tickers", type=int, default=200)
+    history_parser = sub.add_parser("history", help="historical range queries per second")
+    history_parser.add_argument("--rows", type=int, default=1_000_000)
+    history_parser.add_argument("--tickers", type=int, default=500)
+    history_parser.add_argument("--queries", type=int, default=200)
+    columnar_parser = sub.add_parser("columnar", help="row-wise vs columnar history reads")
+    columnar_parser.add_argument("--rows", type=int, default=1_000_000)
+    columnar_parser.add_argument("--tickers", type=int, default=500)
+    columnar_parser.add_argument("--queries", type=int, default=200)
+    timestamps_parser = sub.add_parser("timestamps", help="ISO text vs integer dates")
+    timestamps_parser.add_argument("--rows", type=int, default=1_000_000)
+    timestamps_parser.add_argument("--tickers", type=int, default=500)
+    timestamps_parser.add_argument("--queries", type=int, default=200)
+    ticks_parser = sub.add_parser("ticks", help="intraday tick log writes and reads")
+    ticks_parser.add_argument("--tickers", type=int, default=1000)
+    ticks_parser.add_argument("--minutes", type=int, default=390)
+    args = parser.parse_args()
+
+    if args.command == "live":
+        bench_live(args.ops, args.tickers)
+    elif args.command == "history":
+        bench_history(args.rows, args.tickers, args.queries)
+    elif args.command == "columnar":
+        bench_columnar(args.rows, args.tickers, args.queries)
+    elif args.command == "timestamps":
+        bench_timestamps(args.rows, args.tickers, args.queries)
+    elif args.command == "ticks":
+        bench_ticks(args.tickers, args.minutes)
+
+
+if __name__ == "__main__":
+    main()
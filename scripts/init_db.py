@@ -6,11 +6,18 @@ import sys
 # Ensure project root is in path
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from storage import live, historical
+from config import get_storage_settings
+from storage import connection, live, historical
 
 
 def main() -> None:
     print("Inicializando bases de datos...")
+    settings = get_storage_settings()
+    connection.configure(
+        settings["backend"], dsn=settings["postgres_dsn"], pool_size=settings["pool_size"]
+    )
+    live.SINGLE_DB = settings["single_db"]
+    live.COMPACT_TIMESTAMPS = historical.COMPACT_DATES = settings["compact_dates"]
     live.init_db()
     historical.init_db()
     print("Listo.")
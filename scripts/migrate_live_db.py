@@ -0,0 +1,46 @@
+"""Migrate the storage databases on purpose.
+
+By default the per-type live databases are copied into the single live
+database. ``--compact-dates`` instead rewrites the ISO text dates of the
+existing SQLite databases as integers (irreversible).
+"""
+
+import argparse
+import os
+import sys
+
+# Ensure project root is in path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from config import get_storage_settings
+from storage import connection, historical, live
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate the pymrkt databases")
+    parser.add_argument(
+        "--compact-dates",
+        action="store_true",
+        help="rewrite ISO text dates as integers (SQLite only, irreversible)",
+    )
+    args = parser.parse_args()
+
+    settings = get_storage_settings()
+    connection.configure(
+        settings["backend"], dsn=settings["postgres_dsn"], pool_size=settings["pool_size"]
+    )
+    live.SINGLE_DB = settings["single_db"]
+    if args.compact_dates:
+        print("Convirtiendo fechas ISO a enteros...")
+        migrated = live.migrate_timestamps()
+        if historical.migrate_dates():
+            migrated += 1
+        print(f"Listo: {migrated} bases migradas. Activá storage.compact_dates en config/config.yaml.")
+        return
+    print(f"Copiando precios a {live.SINGLE_DB_FILE}...")
+    copied = live.migrate_to_single_db()
+    print(f"Listo: {copied} precios. Activá storage.single_db en config/config.yaml.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""Database backends behind :mod:`storage.connection`.
+
+The storage modules write plain SQL with ``?`` placeholders against
+"database files" (``storage/live.db``, ``storage/historical.db``...). A
+backend decides what such a file is:
+
+* :class:`SQLiteBackend` opens the file itself, one connection per thread.
+* :class:`PostgresBackend` maps each file to a schema of one PostgreSQL
+  database (``live.bonos.db`` -> ``live_bonos``) reached through a
+  connection pool, so several API workers can share the same store.
+"""
+
+import re
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+# Imported by PostgresBackend, so SQLite deployments do not pay for it
+psycopg: Any = None
+ConnectionPool: Any = None
+
+DbFile = Union[str, Path]
+
+#: Pragmas applied to every new SQLite connection, in order
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    # WAL keeps the database consistent with NORMAL; only the last
+    # transactions may be lost on power failure
+    ("synchronous", "NORMAL"),
+    ("mmap_size", 64 * 1024 * 1024),
+    # Negative values are KiB: 8 MiB of page cache per connection
+    ("cache_size", -8192),
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),
+)
+
+
+def _upsert_sql(
+    table: str, columns: Sequence[str], key: Sequence[str], source: str, replace: bool
+) -> str:
+    names = ", ".join(columns)
+    updates = ", ".join(f"{c}=excluded.{c}" for c in columns if c not in key)
+    action = f"UPDATE SET {updates}" if replace and updates else "NOTHING"
+    return f"INSERT INTO {table} ({names}) {source} ON CONFLICT({', '.join(key)}) DO {action}"
+
+
+class StorageBackend(ABC):
+    """Operations the storage modules need besides plain SQL."""
+
+    #: Name used in ``config.yaml``
+    name = ""
+
+    @abstractmethod
+    def connection(self, db_file: DbFile) -> Any:
+        """Return an object with ``execute``/``executemany`` for ``db_file``.
+
+        Statements run outside :meth:`transaction` are committed on their own.
+        """
+
+    @abstractmethod
+    def transaction(self, db_file: DbFile) -> Iterator[Any]:
+        """Context manager yielding a connection inside a transaction."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Release the connections held for the calling thread or process."""
+
+    @abstractmethod
+    def table_columns(self, conn: Any, table: str) -> Dict[str, str]:
+        """Return ``{column: type}`` of ``table``, types as ``INTEGER``/``TEXT``/``REAL``."""
+
+    @abstractmethod
+    def list_tables(self, conn: Any, prefix: str) -> List[str]:
+        """Return the names of the tables starting with ``prefix``."""
+
+    @abstractmethod
+    def lock_table(self, conn: Any, table: str) -> None:
+        """Block other writers of ``table`` until the transaction of ``conn`` ends.
+
+        Must be the first statement of a :meth:`transaction` block.
+        """
+
+    @abstractmethod
+    def bulk_upsert(
+        self,
+        conn: Any,
+        table: str,
+        columns: Sequence[str],
+        key: Sequence[str],
+        rows: Iterable[Sequence[Any]],
+        replace: bool = True,
+    ) -> None:
+        """Insert ``rows``; rows whose ``key`` exists are updated if ``replace``.
+
+        For duplicated keys inside ``rows`` the last row wins.
+        """
+
+
+class SQLiteBackend(StorageBackend):
+    """One SQLite file per database, with a connection per thread.
+
+    Opening a connection per query dominates latency on slow storage (e.g.
+    the SD card of a Raspberry Pi), so each thread keeps its connections,
+    configured once with WAL journaling and :data:`PRAGMAS` so readers are
+    not blocked by writers.
+    """
+
+    name = "sqlite"
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    def _connections(self) -> Dict[str, sqlite3.Connection]:
+        conns = getattr(self._local, "connections", None)
+        if conns is None:
+            conns = {}
+            self._local.connections = conns
+        return conns
+
+    def connection(self, db_file: DbFile) -> sqlite3.Connection:
+        key = str(db_file)
+        conns = self._connections()
+        conn = conns.get(key)
+        if conn is None:
+            conn = sqlite3.connect(db_file)
+            for name, value in PRAGMAS:
+                conn.execute(f"PRAGMA {name}={value}")
+            conns[key] = conn
+        return conn
+
+    @contextmanager
+    def transaction(self, db_file: DbFile) -> Iterator[sqlite3.Connection]:
+        conn = self.connection(db_file)
+        with conn:
+            yield conn
+
+    def close(self) -> None:
+        conns = self._connections()
+        for conn in conns.values():
+            conn.close()
+        conns.clear()
+
+    def table_columns(self, conn: sqlite3.Connection, table: str) -> Dict[str, str]:
+        return {row[1]: row[2].upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+
+    def list_tables(self, conn: sqlite3.Connection, prefix: str) -> List[str]:
+        rows = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+            (prefix + "%",),
+        ).fetchall()
+        return [name for (name,) in rows]
+
+    def lock_table(self, conn: sqlite3.Connection, table: str) -> None:
+        # SQLite locks the whole database; the default BEGIN only takes the
+        # write lock at the first write, after the reads it should protect
+        conn.execute("BEGIN IMMEDIATE")
+
+    def bulk_upsert(self, conn, table, columns, key, rows, replace=True) -> None:
+        placeholders = ", ".join("?" for _ in columns)
+        conn.executemany(
+            _upsert_sql(table, columns, key, f"VALUES ({placeholders})", replace), rows
+        )
+
+
+# Column types of the SQLite schema and their PostgreSQL counterparts
+_PG_TYPES = (
+    (re.compile(r"\bWITHOUT ROWID\b", re.IGNORECASE), ""),
+    (re.compile(r"\bINTEGER\b"), "BIGINT"),
+    (re.compile(r"\bREAL\b"), "DOUBLE PRECISION"),
+)
+_PG_TYPE_NAMES = {
+    "bigint": "INTEGER",
+    "integer": "INTEGER",
+    "text": "TEXT",
+    "double precision": "REAL",
+}
+
+
+# ``coverage.end`` is a reserved word in PostgreSQL (SQL keywords are
+# written upper-case in the storage modules, column names lower-case)
+_PG_RESERVED_COLUMN = re.compile(r'(?<![\w"])end(?![\w"])')
+
+
+@lru_cache(maxsize=256)
+def _to_postgres(sql: str) -> str:
+    """Translate the SQLite dialect used by the storage modules."""
+    if sql.lstrip().upper().startswith("CREATE"):
+        for pattern, replacement in _PG_TYPES:
+            sql = pattern.sub(replacement, sql)
+    sql = _PG_RESERVED_COLUMN.sub('"end"', sql)
+    return sql.replace("?", "%s")
+
+
+class _Rows:
+    """Rows of a statement already run, used as a cursor by the callers."""
+
+    def __init__(self, rows: List[Tuple[Any, ...]]) -> None:
+        self._rows = rows
+
+    def fetchone(self) -> Any:
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self) -> List[Tuple[Any, ...]]:
+        return self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+class _PostgresConnection:
+    """A pooled connection speaking the SQLite dialect of the storage modules."""
+
+    def __init__(self, conn: "psycopg.Connection") -> None:
+        self.raw = conn
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> _Rows:
+        cursor = self.raw.execute(_to_postgres(sql), tuple(params))
+        return _Rows(cursor.fetchall() if cursor.description else [])
+
+    def executemany(self, sql: str, params: Iterable[Sequence[Any]]) -> None:
+        with self.raw.cursor() as cursor:
+            cursor.executemany(_to_postgres(sql), [tuple(p) for p in params])
+
+
+class _PostgresDatabase:
+    """Runs each statement on a connection borrowed from the pool."""
+
+    def __init__(self, pool: "ConnectionPool") -> None:
+        self._pool = pool
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> _Rows:
+        with self._pool.connection() as conn:
+            return _PostgresConnection(conn).execute(sql, params)
+
+    def executemany(self, sql: str, params: Iterable[Sequence[Any]]) -> None:
+        with self._pool.connection() as conn:
+            _PostgresConnection(conn).executemany(sql, params)
+
+
+class PostgresBackend(StorageBackend):
+    """Every database file is a schema of the PostgreSQL database at ``dsn``.
+
+    Each schema has its own pool of at most ``pool_size`` connections whose
+    ``search_path`` points to it, so the storage SQL needs no qualification.
+    """
+
+    name = "postgres"
+
+    def __init__(self, dsn: str, pool_size: int = 10) -> None:
+        global psycopg, ConnectionPool
+        if psycopg is None:
+            try:
+                import psycopg as _psycopg
+                from psycopg_pool import ConnectionPool as _ConnectionPool
+            except Exception:  # pragma: no cover - optional dependency
+                raise RuntimeError("psycopg and psycopg_pool are required for PostgreSQL") from None
+            psycopg, ConnectionPool = _psycopg, _ConnectionPool
+        self.dsn = dsn
+        self.pool_size = pool_size
+        self._pools: Dict[str, "ConnectionPool"] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def schema(db_file: DbFile) -> str:
+        """Return the schema holding ``db_file`` (``live.bonos.db`` -> ``live_bonos``)."""
+        return re.sub(r"\W", "_", Path(db_file).stem).lower()
+
+    def _pool(self, db_file: DbFile) -> "ConnectionPool":
+        schema = self.schema(db_file)
+        with self._lock:
+            pool = self._pools.get(schema)
+            if pool is None:
+                with psycopg.connect(self.dsn, autocommit=True) as conn:
+                    conn.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+                pool = ConnectionPool(
+                    self.dsn,
+                    min_size=1,
+                    max_size=self.pool_size,
+                    kwargs={"options": f"-c search_path={schema}"},
+                    open=True,
+                )
+                self._pools[schema] = pool
+            return pool
+
+    def connection(self, db_file: DbFile) -> _PostgresDatabase:
+        return _PostgresDatabase(self._pool(db_file))
+
+    @contextmanager
+    def transaction(self, db_file: DbFile) -> Iterator[_PostgresConnection]:
+        # The pool commits on normal exit and rolls back on errors
+        with self._pool(db_file).connection() as conn:
+            with conn.transaction():
+                yield _PostgresConnection(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
+
+    def table_columns(self, conn: Any, table: str) -> Dict[str, str]:
+        rows = conn.execute(
+            """
+            SELECT column_name, data_type FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = ?
+            ORDER BY ordinal_position
+            """,
+            (table,),
+        ).fetchall()
+        return {name: _PG_TYPE_NAMES.get(kind, kind.upper()) for name, kind in rows}
+
+    def list_tables(self, conn: Any, prefix: str) -> List[str]:
+        rows = conn.execute(
+            """
+            SELECT table_name FROM information_schema.tables
+            WHERE table_schema = current_schema() AND table_name LIKE ?
+            """,
+            (prefix + "%",),
+        ).fetchall()
+        return [name for (name,) in rows]
+
+    def lock_table(self, conn: Any, table: str) -> None:
+        # Conflicts with itself and with every write, not with plain reads
+        conn.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+
+    def bulk_upsert(self, conn, table, columns, key, rows, replace=True) -> None:
+        """Load ``rows`` with ``COPY`` into a temporary table, then merge them.
+
+        ``conn`` must come from :meth:`transaction`.
+        """
+        raw = conn.raw
+        names = ", ".join(columns)
+        staging = f"_bulk_{table}"
+        raw.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {table}) ON COMMIT DELETE ROWS")
+        raw.execute(f"ALTER TABLE {staging} ADD COLUMN IF NOT EXISTS _seq BIGSERIAL")
+        with raw.cursor() as cursor:
+            with cursor.copy(f"COPY {staging} ({names}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+        # Keep the last copy of each key, as successive upserts would
+        source = (
+            f"SELECT DISTINCT ON ({', '.join(key)}) {names} FROM {staging} "
+            f"ORDER BY {', '.join(key)}, _seq DESC"
+        )
+        raw.execute(_upsert_sql(table, columns, key, source, replace))
+        raw.execute(f"TRUNCATE {staging}")
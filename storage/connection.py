@@ -0,0 +1,110 @@
+"""Shared database connections for the storage modules.
+
+Every storage module goes through these helpers, which delegate to the
+active backend (see :mod:`storage.backends`). SQLite is used by default;
+:func:`configure` switches every module to PostgreSQL.
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from .backends import PRAGMAS, PostgresBackend, SQLiteBackend, StorageBackend
+
+_backend: StorageBackend = SQLiteBackend()
+
+
+def configure(backend: str = "sqlite", dsn: Optional[str] = None, pool_size: int = 10) -> None:
+    """Select the storage backend: ``"sqlite"`` or ``"postgres"`` (needs ``dsn``).
+
+    Connections of the previous backend held by the calling thread are
+    closed.
+    """
+    global _backend
+    if backend == "sqlite":
+        new_backend: StorageBackend = SQLiteBackend()
+    elif backend == "postgres":
+        if not dsn:
+            raise ValueError("PostgreSQL backend requires a dsn")
+        new_backend = PostgresBackend(dsn, pool_size=pool_size)
+    else:
+        raise ValueError(f"Unknown storage backend: {backend!r}")
+    _backend.close()
+    _backend = new_backend
+
+
+def get_backend() -> StorageBackend:
+    """Return the active backend."""
+    return _backend
+
+
+def get_connection(db_file: Union[str, Path]) -> Any:
+    """Return a connection to ``db_file`` (reused by the calling thread on SQLite)."""
+    return _backend.connection(db_file)
+
+
+@contextmanager
+def transaction(db_file: Union[str, Path]) -> Iterator[Any]:
+    """Yield a connection to ``db_file`` inside a transaction.
+
+    The transaction is committed when the block exits normally and rolled
+    back if it raises.
+    """
+    with _backend.transaction(db_file) as conn:
+        yield conn
+
+
+def close_connections() -> None:
+    """Close every connection opened by the calling thread (all pools on PostgreSQL)."""
+    _backend.close()
+
+
+def column_type(conn: Any, table: str, column: str) -> str:
+    """Return the declared type of ``table.column`` (``""`` if missing)."""
+    return _backend.table_columns(conn, table).get(column, "")
+
+
+def table_columns(conn: Any, table: str) -> Dict[str, str]:
+    """Return ``{column: type}`` of ``table`` (empty if it does not exist)."""
+    return _backend.table_columns(conn, table)
+
+
+def list_tables(conn: Any, prefix: str) -> List[str]:
+    """Return the tables whose name starts with ``prefix``."""
+    return _backend.list_tables(conn, prefix)
+
+
+def lock_table(conn: Any, table: str) -> None:
+    """Block other writers of ``table`` for the rest of the transaction.
+
+    Call it first in a :func:`transaction` block whose reads must not change
+    before its writes.
+    """
+    _backend.lock_table(conn, table)
+
+
+def bulk_upsert(
+    conn: Any,
+    table: str,
+    columns: Sequence[str],
+    key: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    replace: bool = True,
+) -> None:
+    """Insert many rows at once (``COPY`` on PostgreSQL); see :class:`StorageBackend`."""
+    _backend.bulk_upsert(conn, table, columns, key, rows, replace)
+
+
+__all__ = [
+    "PRAGMAS",
+    "bulk_upsert",
+    "close_connections",
+    "column_type",
+    "configure",
+    "get_backend",
+    "get_connection",
+    "list_tables",
+    "lock_table",
+    "table_columns",
+    "transaction",
+]
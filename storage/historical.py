@@ -1,43 +1,226 @@
 from pathlib import Path
 import sqlite3
-from datetime import date
-from typing import Optional, List, Tuple
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional, List, Set, Tuple
+
+from .connection import (
+    bulk_upsert,
+    column_type,
+    get_backend,
+    get_connection,
+    lock_table,
+    table_columns,
+    transaction,
+)
+from .timestamps import parse_date, to_day_number
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - optional dependency
+    np = None
 
 DB_FILE = Path(__file__).resolve().parent / "historical.db"
 
+#: Store days as INTEGER day numbers (days since 1970-01-01) instead of ISO
+#: text, set from ``storage.compact_dates`` in config.yaml. Only new
+#: databases are created that way; existing ones keep their layout until
+#: :func:`migrate_dates` is run (scripts/migrate_live_db.py)
+COMPACT_DATES = False
 
-def init_db() -> None:
-    """Create the historical prices table if it doesn't exist."""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ticker TEXT NOT NULL,
-            date TEXT NOT NULL,
-            price REAL NOT NULL,
-            adj_price REAL,
-            volume INTEGER
-        )
+# Whether each database file stores integer days, detected on first use
+_integer_layout: Dict[str, bool] = {}
+
+# (backend, database file) pairs whose tables exist, see :func:`_db_file`
+_initialized: Set[Tuple[Any, str]] = set()
+# Serialises table creation (on the first request) and migrations
+_init_lock = threading.RLock()
+
+# SQL expression turning an ISO date column into a day number
+_DAY_NUMBER_SQL = "CAST(julianday({}) - 2440587.5 AS INTEGER)"
+
+_CREATE_HISTORY = """
+    CREATE TABLE IF NOT EXISTS history (
+        ticker TEXT NOT NULL,
+        date {date_type} NOT NULL,
+        price REAL NOT NULL,
+        adj_price REAL,
+        volume INTEGER,
+        PRIMARY KEY (ticker, date)
+    ) WITHOUT ROWID
+"""
+
+# Date ranges (inclusive) already downloaded for each ticker
+_CREATE_COVERAGE = """
+    CREATE TABLE IF NOT EXISTS coverage (
+        ticker TEXT NOT NULL,
+        start {date_type} NOT NULL,
+        end {date_type} NOT NULL,
+        PRIMARY KEY (ticker, start)
+    ) WITHOUT ROWID
+"""
+
+
+def _date_type() -> str:
+    return "INTEGER" if COMPACT_DATES else "TEXT"
+
+
+def _day_sql(column: str) -> str:
+    return _DAY_NUMBER_SQL.format(column) if COMPACT_DATES else column
+
+
+def _migrate_legacy_history(conn: sqlite3.Connection) -> None:
+    """Move rows from the old ``id``-keyed table into the deduplicated one.
+
+    The old layout had no uniqueness on (ticker, date); for duplicated days
+    the most recently inserted row is kept.
+    """
+    conn.execute("BEGIN")
+    conn.execute("ALTER TABLE history RENAME TO history_legacy")
+    conn.execute(_CREATE_HISTORY.format(date_type=_date_type()))
+    conn.execute(
+        f"""
+        INSERT INTO history (ticker, date, price, adj_price, volume)
+        SELECT UPPER(ticker), {_day_sql("date")}, price, adj_price, volume
+        FROM history_legacy WHERE true
+        ORDER BY id
+        ON CONFLICT(ticker, date) DO UPDATE SET
+            price=excluded.price, adj_price=excluded.adj_price, volume=excluded.volume
         """
     )
-    conn.commit()
-    conn.close()
+    conn.execute("DROP TABLE history_legacy")
 
 
-def insert_record(ticker: str, d: date, price: float, adj_price: float, volume: int) -> None:
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute(
-        """
+def _migrate_dates(conn: sqlite3.Connection) -> None:
+    """Rewrite ISO text days of both tables as day numbers."""
+    conn.execute("BEGIN")
+    conn.execute("ALTER TABLE history RENAME TO history_text")
+    conn.execute(_CREATE_HISTORY.format(date_type="INTEGER"))
+    conn.execute(
+        f"""
         INSERT INTO history (ticker, date, price, adj_price, volume)
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (ticker.upper(), d.isoformat(), price, adj_price, volume),
+        SELECT ticker, {_DAY_NUMBER_SQL.format("date")}, price, adj_price, volume
+        FROM history_text
+        """
     )
-    conn.commit()
-    conn.close()
+    conn.execute("DROP TABLE history_text")
+    if column_type(conn, "coverage", "start"):
+        conn.execute("ALTER TABLE coverage RENAME TO coverage_text")
+        conn.execute(_CREATE_COVERAGE.format(date_type="INTEGER"))
+        conn.execute(
+            f"""
+            INSERT INTO coverage (ticker, start, end)
+            SELECT ticker, {_DAY_NUMBER_SQL.format("start")}, {_DAY_NUMBER_SQL.format("end")}
+            FROM coverage_text
+            """
+        )
+        conn.execute("DROP TABLE coverage_text")
+
+
+def init_db() -> None:
+    """Create the historical prices table if it doesn't exist.
+
+    Rows are keyed by (ticker, date). Databases created with the former
+    layout (an autoincrement ``id`` and no uniqueness) are migrated in
+    place; ISO text dates are kept until :func:`migrate_dates` is run.
+    """
+    # The layout is read under the lock, so a migration never runs twice
+    with _init_lock:
+        with transaction(DB_FILE) as conn:
+            columns = table_columns(conn, "history")
+            if "id" in columns:
+                _migrate_legacy_history(conn)
+            elif not columns:
+                conn.execute(_CREATE_HISTORY.format(date_type=_date_type()))
+            date_type = column_type(conn, "history", "date")
+            conn.execute(_CREATE_COVERAGE.format(date_type=date_type))
+        _integer_layout.pop(str(DB_FILE), None)
+        _initialized.add((get_backend(), str(DB_FILE)))
+
+
+def migrate_dates() -> bool:
+    """Rewrite the ISO text days of :data:`DB_FILE` as day numbers.
+
+    The migration is in place and irreversible. Only SQLite databases can
+    be migrated. Returns ``False`` when there was nothing to rewrite.
+    """
+    if get_backend().name != "sqlite":
+        raise RuntimeError("Date migration is only supported on SQLite")
+    if not Path(DB_FILE).exists():
+        return False
+    with _init_lock:
+        with transaction(DB_FILE) as conn:
+            if column_type(conn, "history", "date") != "TEXT":
+                return False
+            _migrate_dates(conn)
+        _integer_layout.pop(str(DB_FILE), None)
+    return True
+
+
+def _db_file() -> Path:
+    """Return :data:`DB_FILE`, running :func:`init_db` on its first use."""
+    key = (get_backend(), str(DB_FILE))
+    if key not in _initialized:
+        with _init_lock:
+            if key not in _initialized:
+                init_db()
+    return DB_FILE
+
+
+def _day(d: date):
+    """Return ``d`` in the layout of the current database."""
+    key = str(DB_FILE)
+    compact = _integer_layout.get(key)
+    if compact is None:
+        kind = column_type(get_connection(_db_file()), "history", "date")
+        if not kind:
+            compact = COMPACT_DATES
+        else:
+            compact = _integer_layout[key] = kind == "INTEGER"
+    return to_day_number(d) if compact else d.isoformat()
+
+
+def insert_record(ticker: str, d: date, price: float, adj_price: float, volume: int) -> None:
+    """Insert or replace the record of ``ticker`` for day ``d``."""
+    with transaction(_db_file()) as conn:
+        conn.execute(
+            """
+            INSERT INTO history (ticker, date, price, adj_price, volume)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(ticker, date) DO UPDATE SET
+                price=excluded.price, adj_price=excluded.adj_price, volume=excluded.volume
+            """,
+            (ticker.upper(), _day(d), price, adj_price, volume),
+        )
+
+
+def insert_records(
+    rows: Iterable[Tuple[str, date, float, Optional[float], Optional[int]]],
+    replace: bool = True,
+) -> int:
+    """Insert or replace many ``(ticker, date, price, adj_price, volume)`` rows.
+
+    All rows are written in a single transaction (``executemany`` on
+    SQLite, ``COPY`` on PostgreSQL). With
+    ``replace=False`` days already stored are left untouched. Returns the
+    number of rows given.
+    """
+    params = [
+        (ticker.upper(), _day(d), price, adj_price, volume)
+        for ticker, d, price, adj_price, volume in rows
+    ]
+    if not params:
+        return 0
+    with transaction(_db_file()) as conn:
+        bulk_upsert(
+            conn,
+            "history",
+            ("ticker", "date", "price", "adj_price", "volume"),
+            ("ticker", "date"),
+            params,
+            replace=replace,
+        )
+    return len(params)
 
 
 def get_history(ticker: str, start: date, end: date) -> List[Tuple[date, float, Optional[float], Optional[int]]]:
@@ -46,25 +229,116 @@ def get_history(ticker: str, start: date, end: date) -> List[Tuple[date, float,
     Results are ordered by date ascending and include price, adjusted price and
     volume when available.
     """
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute(
+    rows = get_connection(_db_file()).execute(
         """
         SELECT date, price, adj_price, volume
         FROM history
         WHERE ticker = ? AND date BETWEEN ? AND ?
         ORDER BY date ASC
         """,
-        (ticker.upper(), start.isoformat(), end.isoformat()),
-    )
-    rows = c.fetchall()
-    conn.close()
+        (ticker.upper(), _day(start), _day(end)),
+    ).fetchall()
     return [
         (
-            date.fromisoformat(row[0]),
+            parse_date(row[0]),
             float(row[1]),
             float(row[2]) if row[2] is not None else None,
             int(row[3]) if row[3] is not None else None,
         )
         for row in rows
     ]
+
+
+def get_history_columns(ticker: str, start: date, end: date) -> Dict[str, "np.ndarray"]:
+    """Return the history of ``ticker`` between ``start`` and ``end`` as columns.
+
+    The result maps ``date`` (``datetime64[D]``), ``price`` and ``adj_price``
+    (``float64``, missing adjusted prices as ``NaN``) and ``volume``
+    (``int64``, missing volumes as ``0``) to NumPy arrays ordered by date.
+    No Python object is built per row besides the raw SQLite tuples.
+    """
+    if np is None:
+        raise RuntimeError("numpy is required for columnar history queries")
+    rows = get_connection(_db_file()).execute(
+        """
+        SELECT date, price, adj_price, volume
+        FROM history
+        WHERE ticker = ? AND date BETWEEN ? AND ?
+        ORDER BY date ASC
+        """,
+        (ticker.upper(), _day(start), _day(end)),
+    ).fetchall()
+    if not rows:
+        return {
+            "date": np.array([], dtype="datetime64[D]"),
+            "price": np.array([], dtype=np.float64),
+            "adj_price": np.array([], dtype=np.float64),
+            "volume": np.array([], dtype=np.int64),
+        }
+    dates, prices, adj_prices, volumes = zip(*rows)
+    volume = np.array(volumes, dtype=np.float64)
+    return {
+        # Day numbers and ISO strings both convert directly
+        "date": np.array(dates, dtype="datetime64[D]"),
+        "price": np.array(prices, dtype=np.float64),
+        # ``None`` becomes NaN when building float arrays
+        "adj_price": np.array(adj_prices, dtype=np.float64),
+        "volume": np.nan_to_num(volume, nan=0.0).astype(np.int64),
+    }
+
+
+def get_coverage(ticker: str) -> List[Tuple[date, date]]:
+    """Return the date ranges already fetched for ``ticker``, in order."""
+    rows = get_connection(_db_file()).execute(
+        "SELECT start, end FROM coverage WHERE ticker = ? ORDER BY start",
+        (ticker.upper(),),
+    ).fetchall()
+    return [(parse_date(s), parse_date(e)) for s, e in rows]
+
+
+def get_missing_ranges(ticker: str, start: date, end: date) -> List[Tuple[date, date]]:
+    """Return the sub-ranges of ``[start, end]`` not covered for ``ticker``."""
+    missing = []
+    cursor = start
+    for cov_start, cov_end in get_coverage(ticker):
+        if cov_end < cursor:
+            continue
+        if cov_start > end:
+            break
+        if cov_start > cursor:
+            missing.append((cursor, cov_start - timedelta(days=1)))
+        cursor = max(cursor, cov_end + timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        missing.append((cursor, end))
+    return missing
+
+
+def add_coverage(ticker: str, start: date, end: date) -> None:
+    """Mark ``[start, end]`` as fetched for ``ticker``.
+
+    Overlapping and adjacent ranges are merged so each ticker keeps a short
+    list of disjoint ranges.
+    """
+    ticker = ticker.upper()
+    # Detect the day layout before locking, as it may need another connection
+    _day(start)
+    with transaction(_db_file()) as conn:
+        # The ranges read below cannot change before they are replaced
+        lock_table(conn, "coverage")
+        rows = conn.execute(
+            "SELECT start, end FROM coverage WHERE ticker = ?", (ticker,)
+        ).fetchall()
+        ranges = [(parse_date(s), parse_date(e)) for s, e in rows]
+        merged: List[Tuple[date, date]] = []
+        for cov_start, cov_end in sorted(ranges + [(start, end)]):
+            if merged and cov_start <= merged[-1][1] + timedelta(days=1):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], cov_end))
+            else:
+                merged.append((cov_start, cov_end))
+        conn.execute("DELETE FROM coverage WHERE ticker = ?", (ticker,))
+        conn.executemany(
+            "INSERT INTO coverage (ticker, start, end) VALUES (?, ?, ?)",
+            [(ticker, _day(s), _day(e)) for s, e in merged],
+        )
@@ -1,7 +1,13 @@
 import sqlite3
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Tuple, Union
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple, Union
+
+from . import ticks
+from .cache import TTLCache
+from .connection import column_type, get_backend, get_connection, transaction
+from .timestamps import from_epoch_seconds, parse_datetime, to_epoch_seconds
 
 BASE_PATH = Path(__file__).resolve().parent
 
@@ -11,6 +17,60 @@ CEDEARS_DB_FILE = BASE_PATH / "live.cedears.db"
 BONOS_DB_FILE = BASE_PATH / "live.bonos.db"
 MONEDAS_DB_FILE = BASE_PATH / "live.monedas.db"
 
+#: Keep every ticker type in :data:`SINGLE_DB_FILE`, keyed by
+#: ``(ticker_type, ticker)``, instead of one file per type. The per-type
+#: paths of :func:`get_db_file` keep working as identifiers
+SINGLE_DB = False
+SINGLE_DB_FILE = BASE_PATH / "live.all.db"
+
+#: Ticker types with their own live database
+TICKER_TYPES = (None, "acciones", "cedears", "bonos", "monedas")
+
+# SQLite limits the number of bound parameters per statement
+_MAX_QUERY_PARAMS = 500
+
+#: Maximum number of prices kept in memory across all live databases
+CACHE_MAX_SIZE = 4096
+#: Seconds a cached price is trusted before it is read again from disk
+CACHE_TTL_SECONDS = 60
+
+# Hot cache of stored rows keyed by (database file, ticker). Every write
+# through this module updates it, so entries only go stale when another
+# process writes to the same database.
+_cache = TTLCache(max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL_SECONDS)
+# "Not found" marks keyed like ``_cache``; tickers without marks are cached
+# too (as an empty mapping) so known tickers cost no extra query
+_not_found_cache = TTLCache(max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL_SECONDS)
+
+#: Store ``updated_at`` as INTEGER epoch seconds instead of ISO text, set
+#: from ``storage.compact_dates`` in config.yaml. Only new databases are
+#: created that way; existing ones keep their layout until
+#: :func:`migrate_timestamps` is run (scripts/migrate_live_db.py)
+COMPACT_TIMESTAMPS = False
+
+# Whether each database file stores integer timestamps, detected on first use
+_integer_layout: Dict[str, bool] = {}
+
+# (backend, database file) pairs whose tables exist, see :func:`_ensure_tables`
+_initialized: Set[Tuple[Any, str]] = set()
+# Serialises table creation (on the first request) and migrations
+_init_lock = threading.RLock()
+
+
+def _cache_key(ticker: str, db_file: Union[str, Path]) -> Hashable:
+    return str(db_file), ticker.upper()
+
+
+def clear_cache() -> None:
+    """Drop every price and "not found" mark kept in the in-memory cache."""
+    _cache.clear()
+    _not_found_cache.clear()
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Return hit/miss counters of the in-memory price cache."""
+    return _cache.stats()
+
 
 def get_db_file(ticker_type: Optional[str] = None) -> Path:
     """Return the database file corresponding to ``ticker_type``."""
@@ -25,64 +85,303 @@ def get_db_file(ticker_type: Optional[str] = None) -> Path:
     return DEFAULT_DB_FILE
 
 
-def _init_table(db_file: Union[str, Path]) -> None:
-    conn = sqlite3.connect(db_file)
-    c = conn.cursor()
-    c.execute(
-        """
+def _key_columns(single: bool) -> str:
+    return "ticker_type, ticker" if single else "ticker"
+
+
+def _create_table(conn: sqlite3.Connection, timestamp_type: str, single: bool = False) -> None:
+    if single:
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS prices (
+                ticker_type TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                price REAL NOT NULL,
+                updated_at {timestamp_type} NOT NULL,
+                PRIMARY KEY (ticker_type, ticker)
+            ) WITHOUT ROWID
+            """
+        )
+        return
+    conn.execute(
+        f"""
         CREATE TABLE IF NOT EXISTS prices (
             ticker TEXT PRIMARY KEY,
             price REAL NOT NULL,
-            updated_at TEXT NOT NULL
+            updated_at {timestamp_type} NOT NULL
         )
         """
     )
-    conn.commit()
-    conn.close()
+
+
+def _create_not_found_table(conn: sqlite3.Connection, single: bool = False) -> None:
+    ticker_type = "ticker_type TEXT NOT NULL," if single else ""
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS not_found (
+            {ticker_type}
+            ticker TEXT NOT NULL,
+            fetcher TEXT NOT NULL,
+            checked_at INTEGER NOT NULL,
+            PRIMARY KEY ({_key_columns(single)}, fetcher)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def _migrate_timestamps(conn: sqlite3.Connection, single: bool = False) -> None:
+    """Rewrite ISO text ``updated_at`` values as epoch seconds."""
+    columns = _key_columns(single)
+    conn.execute("BEGIN")
+    conn.execute("ALTER TABLE prices RENAME TO prices_text")
+    _create_table(conn, "INTEGER", single)
+    conn.execute(
+        f"""
+        INSERT INTO prices ({columns}, price, updated_at)
+        SELECT {columns}, price, CAST(strftime('%s', updated_at) AS INTEGER)
+        FROM prices_text
+        """
+    )
+    conn.execute("DROP TABLE prices_text")
+
+
+def _ticker_type_of(db_file: Union[str, Path]) -> Tuple[bool, Optional[str]]:
+    """Return whether ``db_file`` is one of :func:`get_db_file`, and its type."""
+    key = str(db_file)
+    for ticker_type in TICKER_TYPES:
+        if key == str(get_db_file(ticker_type)):
+            return True, ticker_type
+    return False, None
+
+
+def _location(db_file: Union[str, Path]) -> Tuple[Union[str, Path], Optional[str]]:
+    """Return the file actually holding ``db_file`` and its ticker type key.
+
+    The key is ``None`` for per-type files and the ticker type (``""`` for
+    the default one) inside :data:`SINGLE_DB_FILE`.
+    """
+    if SINGLE_DB:
+        known, ticker_type = _ticker_type_of(db_file)
+        if known:
+            _ensure_tables(SINGLE_DB_FILE, single=True)
+            return SINGLE_DB_FILE, ticker_type or ""
+    _ensure_tables(db_file)
+    return db_file, None
+
+
+def _where(scope: Optional[str]) -> Tuple[str, Tuple[str, ...]]:
+    """Return the ticker type condition and parameters for ``scope``."""
+    if scope is None:
+        return "", ()
+    return "ticker_type = ? AND ", (scope,)
+
+
+def _upsert_sql(scope: Optional[str]) -> str:
+    columns = _key_columns(scope is not None)
+    placeholders = "?, ?, ?, ?" if scope is not None else "?, ?, ?"
+    return f"""
+        INSERT INTO prices ({columns}, price, updated_at)
+        VALUES ({placeholders})
+        ON CONFLICT({columns}) DO UPDATE SET price=excluded.price, updated_at=excluded.updated_at
+    """
+
+
+def _init_table(db_file: Union[str, Path], single: bool = False) -> None:
+    with _init_lock:
+        with transaction(db_file) as conn:
+            if not column_type(conn, "prices", "updated_at"):
+                _create_table(conn, "INTEGER" if COMPACT_TIMESTAMPS else "TEXT", single)
+            _create_not_found_table(conn, single)
+        _integer_layout.pop(str(db_file), None)
+        _initialized.add((get_backend(), str(db_file)))
+
+
+def _ensure_tables(db_file: Union[str, Path], single: bool = False) -> None:
+    """Create the tables of ``db_file`` on its first use by this process."""
+    key = (get_backend(), str(db_file))
+    if key in _initialized:
+        return
+    with _init_lock:
+        if key not in _initialized:
+            _init_table(db_file, single)
+
+
+def _uses_integer(db_file: Union[str, Path]) -> bool:
+    key = str(db_file)
+    compact = _integer_layout.get(key)
+    if compact is None:
+        kind = column_type(get_connection(db_file), "prices", "updated_at")
+        if not kind:
+            return COMPACT_TIMESTAMPS
+        compact = _integer_layout[key] = kind == "INTEGER"
+    return compact
+
+
+def _encode(db_file: Union[str, Path], timestamp: datetime) -> Tuple[Union[int, str], datetime]:
+    """Return the stored form of ``timestamp`` and the value read back later."""
+    if _uses_integer(db_file):
+        return to_epoch_seconds(timestamp), timestamp.replace(microsecond=0)
+    return timestamp.isoformat(), timestamp
 
 
 def init_db() -> None:
-    """Create the live price tables if they don't exist."""
-    for db in [
-        DEFAULT_DB_FILE,
-        ACCIONES_DB_FILE,
-        CEDEARS_DB_FILE,
-        BONOS_DB_FILE,
-        MONEDAS_DB_FILE,
-    ]:
-        _init_table(db)
+    """Create the live price tables if they don't exist.
+
+    With :data:`SINGLE_DB` only :data:`SINGLE_DB_FILE` is created. Calling it
+    is optional: each database is also initialised on its first use.
+    """
+    if SINGLE_DB:
+        _init_table(SINGLE_DB_FILE, single=True)
+        return
+    for ticker_type in TICKER_TYPES:
+        _init_table(get_db_file(ticker_type))
 
 
 def get_price(
     ticker: str, db_file: Optional[Union[str, Path]] = None
 ) -> Optional[Tuple[float, datetime]]:
-    """Return price and timestamp for ticker if available."""
+    """Return price and timestamp for ticker if available.
+
+    Recently read or written prices are served from memory.
+    """
     if db_file is None:
         db_file = DEFAULT_DB_FILE
-    conn = sqlite3.connect(db_file)
-    c = conn.cursor()
-    c.execute(
-        "SELECT price, updated_at FROM prices WHERE ticker = ?",
-        (ticker.upper(),),
-    )
-    row = c.fetchone()
-    conn.close()
+    key = _cache_key(ticker, db_file)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+    path, scope = _location(db_file)
+    where, params = _where(scope)
+    row = get_connection(path).execute(
+        f"SELECT price, updated_at FROM prices WHERE {where}ticker = ?",
+        params + (ticker.upper(),),
+    ).fetchone()
     if row:
         price, ts = row
-        return price, datetime.fromisoformat(ts)
+        record = (price, parse_datetime(ts))
+        _cache.set(key, record)
+        return record
     return None
 
 
+def get_prices(
+    tickers: Iterable[str], db_file: Optional[Union[str, Path]] = None
+) -> Dict[str, Tuple[float, datetime]]:
+    """Return price and timestamp for every stored ticker in ``tickers``.
+
+    Cached prices are served from memory and the rest are read with a
+    single connection. The result is keyed by the upper-cased ticker and
+    omits tickers that are not stored.
+    """
+    if db_file is None:
+        db_file = DEFAULT_DB_FILE
+    result: Dict[str, Tuple[float, datetime]] = {}
+    symbols = []
+    for ticker in dict.fromkeys(t.upper() for t in tickers):
+        cached = _cache.get(_cache_key(ticker, db_file))
+        if cached is not None:
+            result[ticker] = cached
+        else:
+            symbols.append(ticker)
+    if not symbols:
+        return result
+    path, scope = _location(db_file)
+    where, params = _where(scope)
+    conn = get_connection(path)
+    for i in range(0, len(symbols), _MAX_QUERY_PARAMS):
+        chunk = symbols[i : i + _MAX_QUERY_PARAMS]
+        placeholders = ", ".join("?" for _ in chunk)
+        rows = conn.execute(
+            f"SELECT ticker, price, updated_at FROM prices WHERE {where}ticker IN ({placeholders})",
+            params + tuple(chunk),
+        ).fetchall()
+        for ticker, price, ts in rows:
+            record = (price, parse_datetime(ts))
+            _cache.set(_cache_key(ticker, db_file), record)
+            result[ticker] = record
+    return result
+
+
 def list_tickers(db_file: Optional[Union[str, Path]] = None) -> List[str]:
     """Return all tickers currently stored in the database."""
     if db_file is None:
         db_file = DEFAULT_DB_FILE
-    conn = sqlite3.connect(db_file)
-    c = conn.cursor()
-    c.execute("SELECT ticker FROM prices")
-    tickers = [r[0] for r in c.fetchall()]
-    conn.close()
-    return tickers
+    path, scope = _location(db_file)
+    if scope is None:
+        rows = get_connection(path).execute("SELECT ticker FROM prices").fetchall()
+    else:
+        rows = get_connection(path).execute(
+            "SELECT ticker FROM prices WHERE ticker_type = ?", (scope,)
+        ).fetchall()
+    return [r[0] for r in rows]
+
+
+def list_all_tickers() -> List[Tuple[Optional[str], str]]:
+    """Return every stored ``(ticker_type, ticker)`` across all live databases."""
+    if SINGLE_DB:
+        _ensure_tables(SINGLE_DB_FILE, single=True)
+        rows = get_connection(SINGLE_DB_FILE).execute(
+            "SELECT ticker_type, ticker FROM prices ORDER BY ticker_type, ticker"
+        ).fetchall()
+        return [(ticker_type or None, ticker) for ticker_type, ticker in rows]
+    return [
+        (ticker_type, ticker)
+        for ticker_type in TICKER_TYPES
+        for ticker in sorted(list_tickers(get_db_file(ticker_type)))
+    ]
+
+
+def get_prices_by_type(
+    tickers: Iterable[Tuple[Optional[str], str]]
+) -> Dict[Tuple[Optional[str], str], Tuple[float, datetime]]:
+    """Return price and timestamp of ``(ticker_type, ticker)`` pairs of any type.
+
+    With :data:`SINGLE_DB` every uncached pair is read in one query; otherwise
+    each ticker type is read with :func:`get_prices`. The result is keyed by
+    the requested ticker type and upper-cased ticker and omits pairs that are
+    not stored.
+    """
+    requested = dict.fromkeys((ticker_type, t.upper()) for ticker_type, t in tickers)
+    if not SINGLE_DB:
+        by_type: Dict[Optional[str], List[str]] = {}
+        for ticker_type, ticker in requested:
+            by_type.setdefault(ticker_type, []).append(ticker)
+        return {
+            (ticker_type, ticker): record
+            for ticker_type, symbols in by_type.items()
+            for ticker, record in get_prices(symbols, get_db_file(ticker_type)).items()
+        }
+
+    result: Dict[Tuple[Optional[str], str], Tuple[float, datetime]] = {}
+    # Requested pairs by their (scope, ticker) key inside the single database
+    pending: Dict[Tuple[str, str], List[Tuple[Optional[str], str]]] = {}
+    for ticker_type, ticker in requested:
+        db_file = get_db_file(ticker_type)
+        cached = _cache.get(_cache_key(ticker, db_file))
+        if cached is not None:
+            result[(ticker_type, ticker)] = cached
+        else:
+            scope = _location(db_file)[1]
+            pending.setdefault((scope, ticker), []).append((ticker_type, ticker))
+    keys = list(pending)
+    conn = get_connection(SINGLE_DB_FILE)
+    step = _MAX_QUERY_PARAMS // 2
+    for i in range(0, len(keys), step):
+        chunk = keys[i : i + step]
+        placeholders = ", ".join("(?, ?)" for _ in chunk)
+        rows = conn.execute(
+            f"""
+            SELECT ticker_type, ticker, price, updated_at FROM prices
+            WHERE (ticker_type, ticker) IN (VALUES {placeholders})
+            """,
+            [value for key in chunk for value in key],
+        ).fetchall()
+        for scope, ticker, price, ts in rows:
+            record = (price, parse_datetime(ts))
+            for ticker_type, symbol in pending[(scope, ticker)]:
+                _cache.set(_cache_key(symbol, get_db_file(ticker_type)), record)
+                result[(ticker_type, symbol)] = record
+    return result
 
 
 def upsert_price(
@@ -96,15 +395,174 @@ def upsert_price(
         timestamp = datetime.utcnow()
     if db_file is None:
         db_file = DEFAULT_DB_FILE
-    conn = sqlite3.connect(db_file)
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO prices (ticker, price, updated_at)
-        VALUES (?, ?, ?)
-        ON CONFLICT(ticker) DO UPDATE SET price=excluded.price, updated_at=excluded.updated_at
-        """,
-        (ticker.upper(), price, timestamp.isoformat()),
-    )
-    conn.commit()
-    conn.close()
+    path, scope = _location(db_file)
+    _, params = _where(scope)
+    stored, timestamp = _encode(path, timestamp)
+    with transaction(path) as conn:
+        conn.execute(_upsert_sql(scope), params + (ticker.upper(), price, stored))
+    _cache.set(_cache_key(ticker, db_file), (float(price), timestamp))
+    logged, ticker_type = _ticker_type_of(db_file)
+    if logged:
+        ticks.record_ticks([(ticker, price, timestamp)], ticker_type)
+
+
+def upsert_prices(
+    rows: Iterable[Tuple[str, float, Optional[datetime]]],
+    db_file: Optional[Union[str, Path]] = None,
+) -> int:
+    """Insert or update many ``(ticker, price, timestamp)`` rows at once.
+
+    All rows are written in a single transaction. A ``None`` timestamp means
+    "now". Returns the number of rows written.
+    """
+    if db_file is None:
+        db_file = DEFAULT_DB_FILE
+    now = datetime.utcnow()
+    records = {}
+    for ticker, price, timestamp in rows:
+        # Later rows for the same ticker win, as with successive upserts
+        records[ticker.upper()] = (float(price), timestamp or now)
+    if not records:
+        return 0
+    path, scope = _location(db_file)
+    _, prefix = _where(scope)
+    params = []
+    for ticker, (price, timestamp) in records.items():
+        stored, timestamp = _encode(path, timestamp)
+        records[ticker] = (price, timestamp)
+        params.append(prefix + (ticker, price, stored))
+    with transaction(path) as conn:
+        conn.executemany(_upsert_sql(scope), params)
+    for ticker, record in records.items():
+        _cache.set(_cache_key(ticker, db_file), record)
+    logged, ticker_type = _ticker_type_of(db_file)
+    if logged:
+        ticks.record_ticks(
+            ((ticker, price, ts) for ticker, (price, ts) in records.items()), ticker_type
+        )
+    return len(records)
+
+
+def get_not_found(
+    ticker: str, db_file: Optional[Union[str, Path]] = None
+) -> Dict[str, datetime]:
+    """Return when each fetcher last reported ``ticker`` as unknown.
+
+    The result maps fetcher names to naive UTC timestamps and is served from
+    memory once read.
+    """
+    if db_file is None:
+        db_file = DEFAULT_DB_FILE
+    key = _cache_key(ticker, db_file)
+    cached = _not_found_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+    path, scope = _location(db_file)
+    where, params = _where(scope)
+    rows = get_connection(path).execute(
+        f"SELECT fetcher, checked_at FROM not_found WHERE {where}ticker = ?",
+        params + (ticker.upper(),),
+    ).fetchall()
+    marks = {fetcher: from_epoch_seconds(ts) for fetcher, ts in rows}
+    _not_found_cache.set(key, marks)
+    return dict(marks)
+
+
+def set_not_found(
+    ticker: str,
+    fetchers: Iterable[str],
+    timestamp: Optional[datetime] = None,
+    db_file: Optional[Union[str, Path]] = None,
+    expire_before: Optional[datetime] = None,
+) -> None:
+    """Record that ``fetchers`` (by name) do not know ``ticker``.
+
+    Marks of any ticker older than ``expire_before`` are deleted in the same
+    transaction, so the table only holds marks still in use.
+    """
+    if timestamp is None:
+        timestamp = datetime.utcnow()
+    if db_file is None:
+        db_file = DEFAULT_DB_FILE
+    names = list(fetchers)
+    if not names:
+        return
+    marks = get_not_found(ticker, db_file)
+    checked_at = to_epoch_seconds(timestamp)
+    path, scope = _location(db_file)
+    _, prefix = _where(scope)
+    columns = _key_columns(scope is not None)
+    with transaction(path) as conn:
+        if expire_before is not None:
+            conn.execute(
+                "DELETE FROM not_found WHERE checked_at < ?",
+                (to_epoch_seconds(expire_before),),
+            )
+        conn.executemany(
+            f"""
+            INSERT INTO not_found ({columns}, fetcher, checked_at)
+            VALUES ({", ".join("?" * (len(prefix) + 3))})
+            ON CONFLICT({columns}, fetcher) DO UPDATE SET checked_at=excluded.checked_at
+            """,
+            [prefix + (ticker.upper(), name, checked_at) for name in names],
+        )
+    for name in names:
+        marks[name] = from_epoch_seconds(checked_at)
+    _not_found_cache.set(_cache_key(ticker, db_file), marks)
+
+
+def migrate_timestamps() -> int:
+    """Rewrite the ISO text ``updated_at`` of the existing databases as epoch seconds.
+
+    The migration is in place and irreversible; files already using integer
+    timestamps, or not created yet, are skipped. Only SQLite databases can
+    be migrated. Returns the number of databases rewritten.
+    """
+    if get_backend().name != "sqlite":
+        raise RuntimeError("Timestamp migration is only supported on SQLite")
+    files = [(get_db_file(ticker_type), False) for ticker_type in TICKER_TYPES]
+    files.append((SINGLE_DB_FILE, True))
+    migrated = 0
+    with _init_lock:
+        for db_file, single in files:
+            if not Path(db_file).exists():
+                continue
+            with transaction(db_file) as conn:
+                if column_type(conn, "prices", "updated_at") != "TEXT":
+                    continue
+                _migrate_timestamps(conn, single)
+            _integer_layout.pop(str(db_file), None)
+            migrated += 1
+    clear_cache()
+    return migrated
+
+
+def migrate_to_single_db() -> int:
+    """Copy the prices of every per-type database into :data:`SINGLE_DB_FILE`.
+
+    Prices already in the single database are only replaced by newer ones,
+    so the copy can be repeated. The per-type files are left untouched.
+    Returns the number of prices copied.
+    """
+    _init_table(SINGLE_DB_FILE, single=True)
+    params = []
+    for ticker_type in TICKER_TYPES:
+        conn = get_connection(get_db_file(ticker_type))
+        if not column_type(conn, "prices", "updated_at"):
+            continue
+        for ticker, price, ts in conn.execute("SELECT ticker, price, updated_at FROM prices"):
+            stored, _ = _encode(SINGLE_DB_FILE, parse_datetime(ts))
+            params.append((ticker_type or "", ticker, price, stored))
+    with transaction(SINGLE_DB_FILE) as conn:
+        conn.executemany(
+            """
+            INSERT INTO prices (ticker_type, ticker, price, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(ticker_type, ticker) DO UPDATE SET
+                price=excluded.price, updated_at=excluded.updated_at
+            WHERE excluded.updated_at > prices.updated_at
+            """,
+            params,
+        )
+    clear_cache()
+    return len(params)
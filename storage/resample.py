@@ -0,0 +1,81 @@
+"""Vectorised aggregations over columnar history.
+
+The functions operate on the column dictionaries returned by
+:func:`storage.historical.get_history_columns` and never loop over rows in
+Python.
+"""
+
+from typing import Dict
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - optional dependency
+    np = None
+
+Columns = Dict[str, "np.ndarray"]
+
+#: Periods accepted by :func:`resample_ohlc`
+PERIODS = ("weekly", "monthly")
+
+
+def _period_keys(dates: "np.ndarray", period: str) -> "np.ndarray":
+    if period == "weekly":
+        # Day 0 (1970-01-01) is a Thursday: shift so weeks start on Monday
+        return (dates.astype("datetime64[D]").astype(np.int64) + 3) // 7
+    if period == "monthly":
+        return dates.astype("datetime64[M]").astype(np.int64)
+    raise ValueError(f"Unknown period: {period!r}")
+
+
+def resample_ohlc(columns: Columns, period: str) -> Columns:
+    """Aggregate daily ``columns`` into weekly or monthly candles.
+
+    Each candle is labelled with its first trading day and carries ``open``,
+    ``high``, ``low`` and ``close`` prices, the last ``adj_close`` and the
+    summed ``volume``. ``columns`` must be ordered by date.
+    """
+    dates = columns["date"]
+    if not len(dates):
+        empty = np.array([], dtype=np.float64)
+        return {
+            "date": dates,
+            "open": empty,
+            "high": empty,
+            "low": empty,
+            "close": empty,
+            "adj_close": empty,
+            "volume": columns["volume"],
+        }
+    keys = _period_keys(dates, period)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+    price = columns["price"]
+    adj_price = columns["adj_price"]
+    return {
+        "date": dates[starts],
+        "open": price[starts],
+        "high": np.maximum.reduceat(price, starts),
+        "low": np.minimum.reduceat(price, starts),
+        "close": price[ends],
+        "adj_close": np.where(np.isnan(adj_price[ends]), price[ends], adj_price[ends]),
+        "volume": np.add.reduceat(columns["volume"], starts),
+    }
+
+
+def returns(values: "np.ndarray") -> "np.ndarray":
+    """Simple returns of ``values``; the first element is ``NaN``."""
+    result = np.full(len(values), np.nan)
+    if len(values) > 1:
+        result[1:] = values[1:] / values[:-1] - 1.0
+    return result
+
+
+def moving_average(values: "np.ndarray", window: int) -> "np.ndarray":
+    """Trailing mean of ``window`` elements; the first ``window - 1`` are ``NaN``."""
+    if window < 1:
+        raise ValueError("window must be positive")
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        cumsum = np.cumsum(np.r_[0.0, values])
+        result[window - 1 :] = (cumsum[window:] - cumsum[:-window]) / window
+    return result
@@ -0,0 +1,118 @@
+"""Tests of the storage backends.
+
+The PostgreSQL tests only run when ``PYMRKT_TEST_POSTGRES_DSN`` points to a
+database they may create schemas in::
+
+    PYMRKT_TEST_POSTGRES_DSN=postgresql://localhost/pymrkt_test python -m pytest storage
+"""
+
+import os
+import uuid
+
+import pytest
+
+from .backends import PostgresBackend, SQLiteBackend, _to_postgres
+
+POSTGRES_DSN = os.environ.get("PYMRKT_TEST_POSTGRES_DSN")
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def backend(request, tmp_path):
+    """Yield ``(backend, db_file)`` with an empty ``prices`` table."""
+    if request.param == "sqlite":
+        store = SQLiteBackend()
+        db_file = tmp_path / "test.db"
+    else:
+        if not POSTGRES_DSN:
+            pytest.skip("PYMRKT_TEST_POSTGRES_DSN is not set")
+        store = PostgresBackend(POSTGRES_DSN, pool_size=2)
+        db_file = f"test_{uuid.uuid4().hex}.db"
+    with store.transaction(db_file) as conn:
+        conn.execute(
+            "CREATE TABLE prices (ticker TEXT PRIMARY KEY, price REAL, updated_at INTEGER)"
+        )
+    yield store, db_file
+    if request.param == "postgres":
+        with store.transaction(db_file) as conn:
+            conn.execute(f'DROP SCHEMA "{store.schema(db_file)}" CASCADE')
+    store.close()
+
+
+def _prices(store, db_file):
+    rows = store.connection(db_file).execute(
+        "SELECT ticker, price FROM prices ORDER BY ticker"
+    ).fetchall()
+    return [tuple(row) for row in rows]
+
+
+def test_bulk_upsert_last_row_wins(backend):
+    store, db_file = backend
+    columns, key = ("ticker", "price", "updated_at"), ("ticker",)
+    with store.transaction(db_file) as conn:
+        store.bulk_upsert(conn, "prices", columns, key, [("AL30", 1.0, 1), ("GD30", 2.0, 1)])
+    with store.transaction(db_file) as conn:
+        store.bulk_upsert(
+            conn,
+            "prices",
+            columns,
+            key,
+            [("AL30", 3.0, 2), ("AL30", 4.0, 3), ("TX26", 5.0, 2), ("TX26", 6.0, 3)],
+        )
+    assert _prices(store, db_file) == [("AL30", 4.0), ("GD30", 2.0), ("TX26", 6.0)]
+
+
+def test_bulk_upsert_without_replace_keeps_rows(backend):
+    store, db_file = backend
+    columns, key = ("ticker", "price", "updated_at"), ("ticker",)
+    with store.transaction(db_file) as conn:
+        store.bulk_upsert(conn, "prices", columns, key, [("AL30", 1.0, 1)])
+    with store.transaction(db_file) as conn:
+        store.bulk_upsert(
+            conn, "prices", columns, key, [("AL30", 2.0, 2), ("GD30", 3.0, 2)], replace=False
+        )
+    assert _prices(store, db_file) == [("AL30", 1.0), ("GD30", 3.0)]
+
+
+def test_transaction_rolls_back_on_error(backend):
+    store, db_file = backend
+    with store.transaction(db_file) as conn:
+        conn.execute(
+            "INSERT INTO prices (ticker, price, updated_at) VALUES (?, ?, ?)", ("AL30", 1.0, 1)
+        )
+    with pytest.raises(RuntimeError):
+        with store.transaction(db_file) as conn:
+            conn.execute("UPDATE prices SET price = ? WHERE ticker = ?", (2.0, "AL30"))
+            conn.execute(
+                "INSERT INTO prices (ticker, price, updated_at) VALUES (?, ?, ?)", ("GD30", 3.0, 1)
+            )
+            raise RuntimeError("boom")
+    assert _prices(store, db_file) == [("AL30", 1.0)]
+
+
+def test_table_columns_use_sqlite_type_names(backend):
+    store, db_file = backend
+    conn = store.connection(db_file)
+    assert store.table_columns(conn, "prices") == {
+        "ticker": "TEXT",
+        "price": "REAL",
+        "updated_at": "INTEGER",
+    }
+    assert store.list_tables(conn, "pri") == ["prices"]
+
+
+def test_to_postgres_quotes_coverage_end():
+    sql = "SELECT start, end FROM coverage WHERE ticker = ? AND end >= ?"
+    assert _to_postgres(sql) == (
+        'SELECT start, "end" FROM coverage WHERE ticker = %s AND "end" >= %s'
+    )
+    # Identifiers containing "end" and already quoted ones are left alone
+    assert _to_postgres('SELECT "end", end_date, legend FROM t') == (
+        'SELECT "end", end_date, legend FROM t'
+    )
+
+
+def test_to_postgres_translates_create_statements():
+    sql = "CREATE TABLE coverage (ticker TEXT, start INTEGER, end INTEGER, r REAL) WITHOUT ROWID"
+    assert _to_postgres(sql) == (
+        'CREATE TABLE coverage (ticker TEXT, start BIGINT, "end" BIGINT, r DOUBLE PRECISION) '
+    )
@@ -0,0 +1,81 @@
+"""Tests of the coverage ranges of the historical store."""
+
+import os
+import threading
+import uuid
+from datetime import date, timedelta
+
+import pytest
+
+from . import connection, historical
+
+POSTGRES_DSN = os.environ.get("PYMRKT_TEST_POSTGRES_DSN")
+
+DAY = date(2024, 1, 1)
+
+
+@pytest.fixture(params=["sqlite", "postgres"], autouse=True)
+def history_db(request, tmp_path, monkeypatch):
+    if request.param == "sqlite":
+        monkeypatch.setattr(historical, "DB_FILE", tmp_path / "historical.db")
+    else:
+        if not POSTGRES_DSN:
+            pytest.skip("PYMRKT_TEST_POSTGRES_DSN is not set")
+        connection.configure("postgres", POSTGRES_DSN, pool_size=8)
+        monkeypatch.setattr(historical, "DB_FILE", tmp_path / f"test_{uuid.uuid4().hex}.db")
+    historical.init_db()
+    yield
+    if request.param == "postgres":
+        backend = connection.get_backend()
+        with connection.transaction(historical.DB_FILE) as conn:
+            conn.execute(f'DROP SCHEMA "{backend.schema(historical.DB_FILE)}" CASCADE')
+        connection.configure("sqlite")
+
+
+def _days(first, last):
+    return DAY + timedelta(days=first), DAY + timedelta(days=last)
+
+
+def test_add_coverage_merges_overlapping_and_adjacent_ranges():
+    historical.add_coverage("ggal", *_days(0, 4))
+    historical.add_coverage("GGAL", *_days(10, 14))
+    historical.add_coverage("GGAL", *_days(5, 6))
+    historical.add_coverage("GGAL", *_days(12, 20))
+    assert historical.get_coverage("GGAL") == [_days(0, 6), _days(10, 20)]
+    assert historical.get_missing_ranges("GGAL", *_days(0, 25)) == [_days(7, 9), _days(21, 25)]
+
+
+def test_concurrent_add_coverage_keeps_every_range():
+    # Disjoint, non-adjacent ranges: none of them may be lost
+    ranges = [_days(3 * i, 3 * i + 1) for i in range(16)]
+    barrier = threading.Barrier(len(ranges))
+
+    def add(bounds):
+        barrier.wait()
+        historical.add_coverage("GGAL", *bounds)
+
+    threads = [threading.Thread(target=add, args=(bounds,)) for bounds in ranges]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert historical.get_coverage("GGAL") == ranges
+
+
+def test_text_dates_are_only_migrated_on_request(monkeypatch):
+    historical.insert_records([("GGAL", DAY, 100.0, 99.0, 1000)])
+    historical.add_coverage("GGAL", *_days(0, 4))
+    monkeypatch.setattr(historical, "COMPACT_DATES", True)
+    if connection.get_backend().name != "sqlite":
+        with pytest.raises(RuntimeError):
+            historical.migrate_dates()
+        return
+    historical._initialized.clear()
+    historical.init_db()
+    conn = connection.get_connection(historical.DB_FILE)
+    assert connection.column_type(conn, "history", "date") == "TEXT"
+    assert historical.migrate_dates()
+    assert connection.column_type(conn, "history", "date") == "INTEGER"
+    assert not historical.migrate_dates()
+    assert historical.get_history("GGAL", DAY, DAY) == [(DAY, 100.0, 99.0, 1000)]
+    assert historical.get_coverage("GGAL") == [_days(0, 4)]
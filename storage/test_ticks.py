@@ -0,0 +1,66 @@
+"""Tests of the intraday tick store and its compaction into daily bars."""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from . import historical, ticks
+
+TODAY = date(2024, 3, 20)
+
+
+@pytest.fixture(autouse=True)
+def tick_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(ticks, "DB_FILE", tmp_path / "ticks.db")
+    monkeypatch.setattr(historical, "DB_FILE", tmp_path / "historical.db")
+    monkeypatch.setattr(ticks, "ENABLED", True)
+    monkeypatch.setattr(ticks, "RETENTION_DAYS", 7)
+    ticks.flush()
+
+
+def _at(day: date, hour: int) -> datetime:
+    return datetime(day.year, day.month, day.day, hour)
+
+
+def _closes(ticker, start, end):
+    return [(d, price) for d, price, _, _ in historical.get_history(ticker, start, end)]
+
+
+def test_flush_writes_ticks_without_compacting():
+    old = TODAY - timedelta(days=30)
+    ticks.record_ticks([("AAPL", 170.0, _at(old, 15)), ("AAPL", 171.0, _at(old, 16))])
+    assert ticks.flush() == 2
+    assert list(ticks._partitions()) == [old]
+    assert ticks.get_ticks("aapl", _at(old, 0), _at(old, 23)) == [
+        (_at(old, 15), 170.0),
+        (_at(old, 16), 171.0),
+    ]
+
+
+def test_compact_keeps_days_inside_retention():
+    kept = TODAY - timedelta(days=7)
+    dropped = TODAY - timedelta(days=8)
+    ticks.record_ticks([("AAPL", 170.0, _at(kept, 15)), ("AAPL", 168.0, _at(dropped, 15))])
+    assert ticks.compact(today=TODAY) == 1
+    assert list(ticks._partitions()) == [kept]
+    assert _closes("AAPL", dropped, kept) == [(dropped, 168.0)]
+
+
+def test_compact_stores_the_last_untyped_tick_as_close():
+    day = TODAY - timedelta(days=10)
+    ticks.record_ticks([("AAPL", 170.0, _at(day, 14)), ("AAPL", 172.0, _at(day, 20))])
+    # A tick of the same symbol priced in ARS must not reach the USD history
+    ticks.record_ticks([("AAPL", 15000.0, _at(day, 21))], "cedears")
+    ticks.record_ticks([("GGAL", 3000.0, _at(day, 21))], "acciones")
+    ticks.compact(today=TODAY)
+    assert _closes("AAPL", day, day) == [(day, 172.0)]
+    assert _closes("GGAL", day, day) == []
+    assert ticks._partitions() == {}
+
+
+def test_compact_does_not_replace_downloaded_days():
+    day = TODAY - timedelta(days=10)
+    historical.insert_records([("AAPL", day, 169.5, 169.0, 1000)])
+    ticks.record_ticks([("AAPL", 172.0, _at(day, 20))])
+    ticks.compact(today=TODAY)
+    assert _closes("AAPL", day, day) == [(day, 169.5)]
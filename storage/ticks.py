@@ -0,0 +1,199 @@
+"""Append-only log of every live price fetched (intraday ticks).
+
+Ticks are partitioned by UTC day into one ``ticks_YYYYMMDD`` table each, so
+retention drops whole tables instead of deleting rows. Writes are buffered
+in memory and flushed in a single transaction once :data:`FLUSH_SIZE` ticks
+are pending or the oldest one waited :data:`FLUSH_SECONDS`; readers flush
+first, so they always see every recorded tick.
+
+:func:`compact` rolls partitions older than :data:`RETENTION_DAYS` into daily
+bars of :mod:`storage.historical` and drops them. It never runs on the
+request path: the scheduler runs it daily (see :mod:`scheduler.refresh`).
+"""
+
+import atexit
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import historical
+from .connection import get_connection, list_tables, transaction
+from .timestamps import from_epoch_seconds, to_epoch_seconds
+
+DB_FILE = Path(__file__).resolve().parent / "ticks.db"
+
+#: Record ticks at all (see :func:`record_ticks`)
+ENABLED = True
+#: Days of ticks kept before :func:`compact` rolls them into daily bars
+RETENTION_DAYS = 7
+#: Pending ticks that trigger a flush
+FLUSH_SIZE = 500
+#: Seconds the oldest pending tick may wait before a flush
+FLUSH_SECONDS = 5.0
+
+_PARTITION = re.compile(r"^ticks_(\d{8})$")
+
+# Pending (ticker_type, ticker, epoch seconds, price) rows
+_buffer: List[Tuple[str, str, int, float]] = []
+_buffer_since = 0.0
+_buffer_lock = threading.Lock()
+# Serialises flushes so a reader waits for writes already in progress
+_flush_lock = threading.Lock()
+# Whether flush() is registered to run at exit
+_atexit_registered = False
+
+
+def _partition(day: date) -> str:
+    return f"ticks_{day:%Y%m%d}"
+
+
+def _partitions() -> Dict[date, str]:
+    result = {}
+    for name in list_tables(get_connection(DB_FILE), "ticks_"):
+        match = _PARTITION.match(name)
+        if match:
+            result[datetime.strptime(match.group(1), "%Y%m%d").date()] = name
+    return result
+
+
+def record_ticks(
+    rows: Iterable[Tuple[str, float, datetime]], ticker_type: Optional[str] = None
+) -> None:
+    """Queue ``(ticker, price, timestamp)`` ticks; timestamps are naive UTC."""
+    global _atexit_registered, _buffer_since
+    if not ENABLED:
+        return
+    ticks = [
+        (ticker_type or "", ticker.upper(), to_epoch_seconds(ts), float(price))
+        for ticker, price, ts in rows
+    ]
+    if not ticks:
+        return
+    with _buffer_lock:
+        if not _atexit_registered:
+            # Ticks still buffered when the process exits are not lost
+            atexit.register(flush)
+            _atexit_registered = True
+        if not _buffer:
+            _buffer_since = time.monotonic()
+        _buffer.extend(ticks)
+        due = (
+            len(_buffer) >= FLUSH_SIZE
+            or time.monotonic() - _buffer_since >= FLUSH_SECONDS
+        )
+    if due:
+        flush()
+
+
+def flush() -> int:
+    """Write every pending tick; returns how many were written."""
+    global _buffer
+    with _flush_lock:
+        with _buffer_lock:
+            pending, _buffer = _buffer, []
+        if not pending:
+            return 0
+        by_day: Dict[date, List[Tuple[str, str, int, float]]] = {}
+        for tick in pending:
+            by_day.setdefault(from_epoch_seconds(tick[2]).date(), []).append(tick)
+        with transaction(DB_FILE) as conn:
+            for day, ticks in by_day.items():
+                table = _partition(day)
+                # Inserting in key order keeps B-tree page writes local
+                ticks.sort()
+                conn.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        ticker_type TEXT NOT NULL,
+                        ticker TEXT NOT NULL,
+                        ts INTEGER NOT NULL,
+                        price REAL NOT NULL,
+                        PRIMARY KEY (ticker_type, ticker, ts)
+                    ) WITHOUT ROWID
+                    """
+                )
+                conn.executemany(
+                    f"""
+                    INSERT INTO {table} (ticker_type, ticker, ts, price)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(ticker_type, ticker, ts) DO UPDATE SET price=excluded.price
+                    """,
+                    ticks,
+                )
+        return len(pending)
+
+
+def get_ticks(
+    ticker: str,
+    start: datetime,
+    end: datetime,
+    ticker_type: Optional[str] = None,
+) -> List[Tuple[datetime, float]]:
+    """Return the ``(timestamp, price)`` ticks of ``ticker`` in ``[start, end]``."""
+    flush()
+    partitions = _partitions()
+    conn = get_connection(DB_FILE)
+    result = []
+    day = start.date()
+    while day <= end.date():
+        table = partitions.get(day)
+        if table is not None:
+            rows = conn.execute(
+                f"""
+                SELECT ts, price FROM {table}
+                WHERE ticker_type = ? AND ticker = ? AND ts BETWEEN ? AND ?
+                ORDER BY ts
+                """,
+                (
+                    ticker_type or "",
+                    ticker.upper(),
+                    to_epoch_seconds(start),
+                    to_epoch_seconds(end),
+                ),
+            ).fetchall()
+            result.extend((from_epoch_seconds(ts), price) for ts, price in rows)
+        day += timedelta(days=1)
+    return result
+
+
+def compact(retention_days: Optional[int] = None, today: Optional[date] = None) -> int:
+    """Roll partitions older than ``retention_days`` into daily history bars.
+
+    The last untyped tick of each day becomes the close stored in
+    :mod:`storage.historical`, without replacing days already downloaded
+    from a history source. Typed ticks are only dropped: the history is
+    keyed by the bare ticker, in the currency of the untyped source, while
+    an ``acciones`` or ``cedears`` tick of the same symbol is priced in ARS.
+    Returns the number of partitions dropped.
+    """
+    if retention_days is None:
+        retention_days = RETENTION_DAYS
+    if today is None:
+        today = datetime.utcnow().date()
+    cutoff = today - timedelta(days=retention_days)
+    flush()
+    dropped = 0
+    for day, table in sorted(_partitions().items()):
+        if day >= cutoff:
+            continue
+        rows = get_connection(DB_FILE).execute(
+            f"""
+            SELECT ticker, price FROM {table}
+            WHERE ticker_type = '' AND (ticker, ts) IN (
+                SELECT ticker, MAX(ts) FROM {table}
+                WHERE ticker_type = ''
+                GROUP BY ticker
+            )
+            """
+        ).fetchall()
+        historical.insert_records(
+            ((ticker, day, price, None, None) for ticker, price in rows),
+            replace=False,
+        )
+        with transaction(DB_FILE) as conn:
+            conn.execute(f"DROP TABLE {table}")
+        dropped += 1
+    return dropped
@@ -0,0 +1,44 @@
+"""Conversion between Python dates and their compact INTEGER storage.
+
+Timestamps are stored as whole seconds since the Unix epoch and days as the
+number of days since 1970-01-01, both in UTC. Readers accept the former ISO
+text values as well, so databases in either layout can be read.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Union
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+
+
+def to_epoch_seconds(value: datetime) -> int:
+    """Return naive UTC ``value`` as whole seconds since the epoch."""
+    return int((value - _EPOCH).total_seconds())
+
+
+def from_epoch_seconds(value: int) -> datetime:
+    return _EPOCH + timedelta(seconds=value)
+
+
+def to_day_number(value: date) -> int:
+    """Return ``value`` as days since 1970-01-01."""
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def from_day_number(value: int) -> date:
+    return date.fromordinal(value + _EPOCH_ORDINAL)
+
+
+def parse_datetime(value: Union[int, str]) -> datetime:
+    """Decode a stored timestamp in either layout."""
+    if isinstance(value, int):
+        return from_epoch_seconds(value)
+    return datetime.fromisoformat(value)
+
+
+def parse_date(value: Union[int, str]) -> date:
+    """Decode a stored day in either layout."""
+    if isinstance(value, int):
+        return from_day_number(value)
+    return date.fromisoformat(value)